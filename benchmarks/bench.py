@@ -0,0 +1,290 @@
+"""
+Offline benchmarks for scraping, parsing, template generation and uploads.
+
+The judges are pointed at saved copies of their pages (benchmarks/fixtures)
+served from a local server, and uploads go to a fake GitHub API, so the
+numbers only measure this code. Results are written as JSON so that runs
+can be compared.
+
+Usage:
+    python3 -m cp_helper.benchmarks.bench [-o results.json] [--quick]
+    python3 -m cp_helper.benchmarks.bench --compare old.json new.json
+"""
+
+
+import atexit
+import os
+import shutil
+import tempfile
+
+# keep the benchmarks away from the real cache and the request budgets;
+# this has to happen before the judges are imported
+_TMP = tempfile.mkdtemp(prefix='cp_helper_bench_')
+atexit.register(shutil.rmtree, _TMP, True)
+os.environ['CP_HELPER_CACHE_DIR'] = os.path.join(_TMP, 'cache')
+os.environ['CP_HELPER_HTTP_THROTTLE'] = '0'
+
+import argparse
+import contextlib
+from datetime import datetime
+import io
+import json
+import platform
+import statistics
+import sys
+import time
+from typing import Callable
+
+from ..judges import judge, parsing
+from ..judges.atcoder import AtCoder
+from ..judges.boj import Boj
+from ..judges.cache import http_cache
+from ..judges.codeforces import Codeforces
+from ..judges.cses import Cses
+from ..judges.dmoj import Dmoj
+from ..judges.github import sync_solutions, upload_solutions
+from ..judges.judge import Judge, scrape_html
+from ..judges.kattis import Kattis
+from .servers import FakeGitHub, FixtureServer
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+PARSE_JUDGES: list[tuple[str, type[Judge]]] = [
+    ('atcoder', AtCoder),
+    ('boj', Boj),
+    ('codeforces', Codeforces),
+    ('cses', Cses),
+    ('dmoj', Dmoj),
+    ('kattis', Kattis),
+]
+
+CONTEST_PROBLEMS = 8
+# pretend every judge is this far away
+LATENCY = 0.05  # seconds
+
+
+def measure(fn: Callable[[], None], iterations: int) -> dict:
+    times = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return dict(
+        iterations=iterations,
+        median=statistics.median(times),
+        min=min(times),
+        mean=statistics.fmean(times),
+    )
+
+
+def available_parsers() -> list[str]:
+    parsers = ['html.parser']
+    try:
+        import lxml
+        parsers.append('lxml')
+    except ImportError:
+        pass
+    return parsers
+
+
+def bench_parsing(results: dict, iterations: int) -> None:
+    default = parsing.HTML_PARSER
+    for name, cls in PARSE_JUDGES:
+        with open(os.path.join(FIXTURES, f'{name}_problem.html')) as f:
+            html = f.read()
+        for parser in available_parsers():
+            parsing.HTML_PARSER = parser
+            r = measure(lambda: cls.get_sample_data(html), iterations)
+            r['bytes'] = len(html.encode())
+            r['mb_per_s'] = r['bytes'] / r['median'] / 1e6
+            results[f'parse.{name}.{parser}'] = r
+    parsing.HTML_PARSER = default
+
+
+def bench_scrape(results: dict, server: FixtureServer, iterations: int) -> None:
+    url = f'{server.url}/codeforces_problem.html'
+    results['scrape_html.network'] = measure(
+        lambda: scrape_html(url, max_age=0), iterations)
+    scrape_html(url)
+    results['scrape_html.cached'] = measure(lambda: scrape_html(url), iterations)
+
+
+def bench_templates(results: dict, server: FixtureServer, iterations: int) -> None:
+    counter = iter(range(10 ** 9))
+
+    def write_one():
+        k = next(counter)
+        Codeforces.write_template(
+            f'9999{k}', link=f'{server.url}/codeforces_problem.html?k={k}')
+
+    results['write_template'] = measure(write_one, iterations)
+
+    for parallel in [False, True]:
+        def contest():
+            http_cache.clear()
+            k = next(counter)
+            links = [
+                f'{server.url}/codeforces_problem.html?k={k}&p={i}'
+                for i in range(CONTEST_PROBLEMS)
+            ]
+            Codeforces.make_contest_files(
+                f'{k}_',
+                num_problems=CONTEST_PROBLEMS,
+                links=links,
+                parallel=parallel,
+            )
+
+        mode = 'parallel' if parallel else 'serial'
+        r = measure(contest, max(1, iterations // 10))
+        r['problems'] = CONTEST_PROBLEMS
+        r['latency'] = server.latency
+        results[f'make_contest_files.{mode}'] = r
+
+
+def bench_upload(results: dict, iterations: int, files=20) -> None:
+    with FakeGitHub() as github:
+        judge.GITHUB_API_URL = github.url
+        for k in range(files):
+            directory = f'upload{k}'
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f'{directory}.cpp'), 'w') as f:
+                f.write(f'// solution {k}\n' * 50)
+        solutions = [
+            (Codeforces, os.path.join(f'upload{k}', f'upload{k}.cpp'))
+            for k in range(files)
+        ]
+
+        before = github.requests
+        r = measure(
+            lambda: upload_solutions(solutions, delete_local=False),
+            iterations,
+        )
+        r['files'] = files
+        r['requests'] = (github.requests - before) // iterations
+        results['upload_solutions'] = r
+
+        before = github.requests
+        r = measure(
+            lambda: [Codeforces.upload_solution(file, delete_local=False)
+                     for _, file in solutions],
+            max(1, iterations // 5),
+        )
+        r['files'] = files
+        r['requests'] = (github.requests - before) // max(1, iterations // 5)
+        results['upload_solution.each'] = r
+
+
+def bench_sync(results: dict, iterations: int, files=200) -> None:
+    with FakeGitHub() as github:
+        judge.GITHUB_API_URL = github.url
+        for k in range(files):
+            directory = os.path.join('sync', f'sync{k}')
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, f'sync{k}.cpp'), 'w') as f:
+                f.write(f'// solution {k}\n' * 50)
+        sync_solutions(Codeforces, ['sync'])
+
+        before = github.requests
+        r = measure(lambda: sync_solutions(Codeforces, ['sync']), iterations)
+        r['files'] = files
+        r['requests'] = (github.requests - before) // iterations
+        results['sync_solutions.unchanged'] = r
+
+        counter = iter(range(10 ** 9))
+
+        def change_one():
+            with open(os.path.join('sync', 'sync0', 'sync0.cpp'), 'a') as f:
+                f.write(f'// change {next(counter)}\n')
+            sync_solutions(Codeforces, ['sync'])
+
+        before = github.requests
+        r = measure(change_one, iterations)
+        r['files'] = files
+        r['requests'] = (github.requests - before) // iterations
+        results['sync_solutions.one_changed'] = r
+
+
+def run(quick=False) -> dict:
+    iterations = 5 if quick else 50
+    results: dict = dict()
+    workdir = os.path.join(_TMP, 'work')
+    os.makedirs(workdir)
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            bench_parsing(results, iterations)
+            with FixtureServer(FIXTURES) as server:
+                bench_scrape(results, server, iterations)
+            with FixtureServer(FIXTURES, latency=LATENCY) as server:
+                bench_templates(results, server, iterations)
+            bench_upload(results, iterations)
+            bench_sync(results, iterations)
+    finally:
+        os.chdir(cwd)
+    return dict(
+        meta=dict(
+            time=datetime.now().isoformat(timespec='seconds'),
+            python=platform.python_version(),
+            platform=platform.platform(),
+            parsers=available_parsers(),
+            quick=quick,
+        ),
+        results=results,
+    )
+
+
+def print_results(data: dict) -> None:
+    width = max(len(name) for name in data['results'])
+    for name, r in data['results'].items():
+        extra = ''
+        if 'mb_per_s' in r:
+            extra = f'  {r["mb_per_s"]:.2f} MB/s'
+        if 'requests' in r:
+            extra = f'  {r["requests"]} requests'
+        print(f'{name:<{width}}  {r["median"] * 1000:>10.3f} ms{extra}', file=sys.stderr)
+
+
+def compare(old_file: str, new_file: str) -> None:
+    with open(old_file) as f:
+        old = json.load(f)['results']
+    with open(new_file) as f:
+        new = json.load(f)['results']
+    width = max(len(name) for name in new)
+    print(f'{"benchmark":<{width}}  {"old (ms)":>10}  {"new (ms)":>10}  ratio')
+    for name, r in new.items():
+        if name not in old:
+            print(f'{name:<{width}}  {"":>10}  {r["median"] * 1000:>10.3f}')
+            continue
+        ratio = r['median'] / old[name]['median']
+        print(f'{name:<{width}}  {old[name]["median"] * 1000:>10.3f}  '
+              f'{r["median"] * 1000:>10.3f}  {ratio:.2f}x')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-o', '--output', help='write the JSON results here '
+                        '(default: standard output)')
+    parser.add_argument('--quick', action='store_true', help='fewer iterations')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'),
+                        help='compare two result files instead of running')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    data = run(quick=args.quick)
+    print_results(data)
+    text = json.dumps(data, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Benchmark of templates/fastio.py against input = sys.stdin.readline.
+
+Each case is a whole Python process reading a generated input (10^6 tokens
+by default) the way a solution would, with the fast I/O code pasted in
+front exactly as in a new template. The times include interpreter startup,
+which is shown separately.
+
+Usage: python3 -m cp_helper.benchmarks.fastio_bench [-n 1000000] [-r 5]
+"""
+
+
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from ..judges.judge import get_template
+
+
+TOKENS = 10 ** 6
+REPEATS = 5
+
+# (name, input shape, code); the code gets the sum of the integers
+CASES = [
+    ('readline, one per line', 'lines', '''
+input = sys.stdin.readline
+n = int(input())
+s = sum(int(input()) for _ in range(n))
+'''),
+    ('fastio read_int, one per line', 'lines', '''
+n = read_int()
+s = sum(read_int() for _ in range(n))
+'''),
+    ('readline, pairs per line', 'pairs', '''
+input = sys.stdin.readline
+n = int(input())
+s = 0
+for _ in range(n // 2):
+    a, b = map(int, input().split())
+    s += a + b
+'''),
+    ('fastio read_int, pairs per line', 'pairs', '''
+n = read_int()
+s = 0
+for _ in range(n // 2):
+    a, b = read_int(), read_int()
+    s += a + b
+'''),
+    ('readline, one line', 'line', '''
+input = sys.stdin.readline
+n = int(input())
+s = sum(map(int, input().split()))
+'''),
+    ('fastio read_ints, one line', 'line', '''
+n = read_int()
+s = sum(read_ints(n))
+'''),
+    ('fastio ints(), one line', 'line', '''
+n = read_int()
+s = sum(ints())
+'''),
+    ('fastio read_int_array, one line', 'line', '''
+n = read_int()
+s = int(read_int_array().sum())
+'''),
+    ('print, one per line', 'lines', '''
+input = sys.stdin.readline
+n = int(input())
+for _ in range(n):
+    print(input().strip())
+s = 0
+'''),
+    ('fastio write, one per line', 'lines', '''
+n = read_int()
+for _ in range(n):
+    write(read_str())
+s = 0
+'''),
+]
+
+
+def fastio_prelude() -> str:
+    """The template with main() dropped: imports and the fast I/O code."""
+    template = get_template('.py')
+    return template[:template.index('def main():')]
+
+
+def has_numpy() -> bool:
+    res = subprocess.run([sys.executable, '-c', 'import numpy'],
+                         stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return res.returncode == 0
+
+
+def make_input(shape: str, n: int, path: str) -> None:
+    rng = random.Random(0)
+    values = [str(rng.randint(-10 ** 9, 10 ** 9)) for _ in range(n)]
+    with open(path, 'w') as f:
+        f.write(f'{n}\n')
+        if shape == 'pairs':
+            values = [f'{a} {b}' for a, b in zip(values[::2], values[1::2])]
+        f.write((' ' if shape == 'line' else '\n').join(values))
+        f.write('\n')
+
+
+def time_process(command: list[str], input_file: str, repeats: int) -> float:
+    times = []
+    for _ in range(repeats):
+        with open(input_file, 'rb') as f:
+            start = time.perf_counter()
+            subprocess.run(command, stdin=f, stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def run(n=TOKENS, repeats=REPEATS) -> dict:
+    prelude = fastio_prelude()
+    numpy = has_numpy()
+    results = dict()
+    with tempfile.TemporaryDirectory(prefix='cp_helper_fastio_') as d:
+        inputs = dict()
+        for shape in ['lines', 'pairs', 'line']:
+            inputs[shape] = os.path.join(d, shape)
+            make_input(shape, n, inputs[shape])
+        results['startup'] = time_process([sys.executable, '-c', 'pass'],
+                                          inputs['line'], repeats)
+        for name, shape, code in CASES:
+            if 'read_int_array' in code and not numpy:
+                continue
+            script = prelude + code + 'sys.stderr.write(str(s))\n'
+            results[name] = time_process([sys.executable, '-c', script],
+                                         inputs[shape], repeats)
+    return dict(tokens=n, repeats=repeats, numpy=numpy, results=results)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('-n', '--tokens', type=int, default=TOKENS)
+    parser.add_argument('-r', '--repeats', type=int, default=REPEATS)
+    parser.add_argument('-o', '--output', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    data = run(args.tokens, args.repeats)
+    width = max(len(name) for name in data['results'])
+    for name, seconds in data['results'].items():
+        print(f'{name:<{width}}  {seconds * 1000:>9.1f} ms')
+    if not data['numpy']:
+        print('(NumPy is not installed, so read_int_array was skipped)')
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            f.write(json.dumps(data, indent=2) + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,171 @@
+"""
+Local stand-ins for the judges and the GitHub API, so that benchmarks never
+touch the network.
+"""
+
+
+import base64
+import hashlib
+import http.server
+import json
+import os
+import threading
+import time
+
+
+class _Server:
+    handler: type[http.server.BaseHTTPRequestHandler]
+
+    def __init__(self):
+        self.requests = 0
+        self.lock = threading.Lock()
+        server = self
+
+        class Handler(self.handler):
+            owner = server
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f'http://127.0.0.1:{self.httpd.server_address[1]}'
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def count_request(self) -> None:
+        with self.lock:
+            self.requests += 1
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class _FixtureHandler(http.server.BaseHTTPRequestHandler):
+    owner: 'FixtureServer'
+
+    def do_GET(self):
+        self.owner.count_request()
+        time.sleep(self.owner.latency)
+        name = os.path.basename(self.path.split('?')[0])
+        path = os.path.join(self.owner.directory, name)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        with open(path, 'rb') as f:
+            body = f.read()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class FixtureServer(_Server):
+    """Serves the saved pages in directory, each after latency seconds."""
+    handler = _FixtureHandler
+
+    def __init__(self, directory: str, latency=0.0):
+        self.directory = directory
+        self.latency = latency
+        super().__init__()
+
+
+class _GitHubHandler(http.server.BaseHTTPRequestHandler):
+    owner: 'FakeGitHub'
+
+    def _send(self, code: int, data: dict) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _json(self) -> dict:
+        length = int(self.headers.get('Content-Length', 0))
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def do_GET(self):
+        self.owner.count_request()
+        parts = self.path.split('?')[0].strip('/').split('/')
+        # repos/<owner>/<repo>/...
+        if len(parts) == 3:
+            self._send(200, dict(default_branch='main'))
+        elif parts[3:5] == ['git', 'ref']:
+            self._send(200, dict(object=dict(sha=self.owner.head)))
+        elif parts[3:5] == ['git', 'commits']:
+            tree = self.owner.commits.get(parts[5])
+            self._send(200, dict(sha=parts[5], tree=dict(sha=tree)))
+        elif parts[3:5] == ['git', 'trees']:
+            tree = [
+                dict(path=path, mode='100644', type='blob', sha=sha)
+                for path, sha in self.owner.files.items()
+            ]
+            self._send(200, dict(sha=self.owner.commits[self.owner.head], tree=tree,
+                                 truncated=False))
+        elif parts[3] == 'contents':
+            path = '/'.join(parts[4:])
+            if path in self.owner.files:
+                self._send(200, dict(sha=self.owner.files[path]))
+            else:
+                self._send(404, dict(message='Not Found'))
+        else:
+            self._send(404, dict(message='Not Found'))
+
+    def do_POST(self):
+        self.owner.count_request()
+        data = self._json()
+        if self.path.endswith('/git/trees'):
+            for entry in data['tree']:
+                content = entry['content'].encode()
+                blob = b'blob %d\0' % len(content) + content
+                self.owner.files[entry['path']] = hashlib.sha1(blob).hexdigest()
+            sha = self.owner.new_sha()
+            self._send(201, dict(sha=sha))
+        elif self.path.endswith('/git/commits'):
+            sha = self.owner.new_sha()
+            self.owner.commits[sha] = data['tree']
+            self._send(201, dict(sha=sha))
+        else:
+            self._send(404, dict(message='Not Found'))
+
+    def do_PATCH(self):
+        self.owner.count_request()
+        data = self._json()
+        self.owner.head = data['sha']
+        self._send(200, dict(object=dict(sha=data['sha'])))
+
+    def do_PUT(self):
+        # contents API: one commit per file
+        self.owner.count_request()
+        data = self._json()
+        parts = self.path.strip('/').split('/')
+        path = '/'.join(parts[4:])
+        content = base64.b64decode(data['content'])
+        self.owner.files[path] = hashlib.sha1(b'blob %d\0' % len(content) + content).hexdigest()
+        parent, sha = self.owner.head, self.owner.new_sha()
+        self.owner.commits[sha] = self.owner.new_sha()
+        self.owner.head = sha
+        self._send(201, dict(content=dict(sha=self.owner.files[path]),
+                             commit=dict(sha=sha, parents=[dict(sha=parent)])))
+
+
+class FakeGitHub(_Server):
+    """Just enough of the contents and Git Data APIs for uploading."""
+    handler = _GitHubHandler
+
+    def __init__(self):
+        self.counter = 0
+        self.commits = {'0' * 40: '1' * 40}  # commit -> tree
+        self.head = '0' * 40
+        self.files: dict[str, str] = dict()  # path -> blob sha
+        super().__init__()
+
+    def new_sha(self) -> str:
+        with self.lock:
+            self.counter += 1
+            return hashlib.sha1(str(self.counter).encode()).hexdigest()
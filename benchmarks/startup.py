@@ -0,0 +1,95 @@
+"""
+Guard for startup time: every command pays for its imports before doing
+anything, so importing the judges must stay cheap.
+
+For each entry point, measures how much importing it adds to a bare
+interpreter start, and checks that none of the heavy dependencies get
+imported along with it. Exits with status 1 if anything is over budget.
+
+Usage: python3 -m cp_helper.benchmarks.startup [--budget 100] [-n 10]
+"""
+
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+PACKAGE = __package__.split('.')[0]
+# the directory containing the package
+PACKAGE_PARENT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BUDGET = 100.0  # milliseconds on top of a bare interpreter
+
+ENTRY_POINTS = [
+    'judges',
+    'judges.judge',
+    'judges.atcoder',
+    'judges.boj',
+    'judges.codeforces',
+    'judges.cses',
+    'judges.dmoj',
+    'judges.fhc',
+    'judges.kattis',
+    'judges.usaco',
+    'judges.github',
+    'judges.prefetch',
+    'judges.bulk',
+    'snippets',
+]
+
+# none of these should be imported until they are used
+HEAVY_MODULES = ['requests', 'bs4', 'lxml', 'send2trash', 'dotenv']
+
+
+def run_python(code: str) -> float:
+    env = dict(os.environ, PYTHONPATH=PACKAGE_PARENT)
+    start = time.perf_counter()
+    subprocess.run([sys.executable, '-c', code], env=env, check=True)
+    return time.perf_counter() - start
+
+
+def heavy_imports(module: str) -> list[str]:
+    code = (
+        f'import sys, json, {module}; '
+        f'print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))'
+    )
+    env = dict(os.environ, PYTHONPATH=PACKAGE_PARENT)
+    res = subprocess.run([sys.executable, '-c', code], env=env, check=True,
+                         capture_output=True, text=True)
+    return json.loads(res.stdout)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--budget', type=float, default=BUDGET,
+                        help='milliseconds each import may add')
+    parser.add_argument('-n', '--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    baseline = statistics.median(run_python('pass') for _ in range(args.runs))
+    print(f'bare interpreter: {baseline * 1000:.1f} ms')
+    ok = True
+    for entry in ENTRY_POINTS:
+        module = f'{PACKAGE}.{entry}'
+        elapsed = statistics.median(
+            run_python(f'import {module}') for _ in range(args.runs))
+        extra = (elapsed - baseline) * 1000
+        heavy = heavy_imports(module)
+        status = 'ok'
+        if extra > args.budget:
+            status = 'OVER BUDGET'
+            ok = False
+        if heavy:
+            status = f'imports {", ".join(heavy)}'
+            ok = False
+        print(f'{module:<32} +{extra:6.1f} ms  {status}')
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
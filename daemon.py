@@ -0,0 +1,408 @@
+"""
+A long-lived cp-helper process, so that commands don't pay for interpreter
+startup, imports, TLS handshakes and template loading every time.
+
+The daemon owns the requests sessions (and so their connection pools) and
+the judge registry, and listens on a Unix socket. The client half of this
+module only uses the standard library, so it starts quickly; if no daemon
+is running, it runs the command itself.
+
+Usage:
+    python3 -m cp_helper.daemon start
+    python3 -m cp_helper.daemon template codeforces 1700A
+    python3 -m cp_helper.daemon download codeforces 1700
+    python3 -m cp_helper.daemon contest kattis '' A B C
+    python3 -m cp_helper.daemon run 1700A/1700A.cpp
+    python3 -m cp_helper.daemon profile 1700A/1700A.cpp --input in2
+    python3 -m cp_helper.daemon upload codeforces 1700A/1700A.cpp 1700B/1700B.cpp
+    python3 -m cp_helper.daemon sync codeforces ~/cp/codeforces
+    python3 -m cp_helper.daemon stop
+
+Protocol: the client sends one JSON line {"argv": [...], "cwd": ...}. The
+daemon answers with JSON lines: {"out": text} or {"err": text} for output,
+{"prompt": text} when a command asks a question (the client answers with
+{"answer": text}), and finally {"exit": status}.
+"""
+
+
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+
+PACKAGE = __package__ or 'cp_helper'
+
+SOCKET_PATH = os.getenv('CP_HELPER_SOCKET') or os.path.join(
+    os.getenv('XDG_RUNTIME_DIR') or '/tmp',
+    f'cp_helper-{os.getuid()}.sock',
+)
+START_TIMEOUT = 10.0  # seconds to wait for a new daemon to come up
+
+
+# ---------------------------------------------------------------- commands
+# shared by the daemon and by the client when there is no daemon
+
+
+def build_parser():
+    import argparse
+
+    parser = argparse.ArgumentParser(prog=f'python3 -m {PACKAGE}.daemon')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('template', help='write the template for one problem')
+    p.add_argument('judge')
+    p.add_argument('problem_id')
+    p.add_argument('suffix', nargs='?', default=None)
+    p.add_argument('--lang', default=None)
+    p.add_argument('--link', default=None)
+
+    p = sub.add_parser('download', help='download a whole contest')
+    p.add_argument('judge')
+    p.add_argument('contest_id')
+
+    p = sub.add_parser('contest', help='make the files for a contest')
+    p.add_argument('judge')
+    p.add_argument('prefix')
+    p.add_argument('suffixes', nargs='+',
+                   help='problem ID suffixes, or just the number of problems')
+
+    p = sub.add_parser('run', help='run a solution on its samples')
+    p.add_argument('source')
+    p.add_argument('--timeout', type=float, default=None)
+
+    p = sub.add_parser('profile', help='profile a solution on one of its samples')
+    p.add_argument('source')
+    p.add_argument('--input', default='in1')
+    p.add_argument('--top', type=int, default=None)
+    p.add_argument('--tool', choices=['auto', 'perf', 'gprof'], default='auto')
+
+    p = sub.add_parser('bundle', help='make a single file to submit')
+    p.add_argument('source')
+    p.add_argument('-o', '--output', default=None)
+    p.add_argument('--keep-unused', action='store_true')
+
+    p = sub.add_parser('upload', help='upload solutions in one commit')
+    p.add_argument('judge')
+    p.add_argument('files', nargs='+')
+    p.add_argument('--keep', action='store_true', help="don't delete the local files")
+
+    p = sub.add_parser('sync', help='upload new and changed solutions')
+    p.add_argument('judge')
+    p.add_argument('directories', nargs='+')
+    p.add_argument('-n', '--dry-run', action='store_true')
+
+    sub.add_parser('start', help='start the daemon in the background')
+    sub.add_parser('serve', help='run the daemon in the foreground')
+    sub.add_parser('stop', help='stop the daemon')
+    sub.add_parser('ping', help='check whether the daemon is running')
+    return parser
+
+
+def run_command(args) -> int:
+    from .judges import get_judge
+
+    if args.command == 'template':
+        get_judge(args.judge).write_template(
+            args.problem_id, suffix=args.suffix, link=args.link, lang=args.lang)
+    elif args.command == 'download':
+        judge = get_judge(args.judge)
+        if not judge.supports_contests:
+            print(f'{judge.name} contests cannot be downloaded')
+            return 1
+        if not judge.download_contest(args.contest_id):
+            return 1
+    elif args.command == 'contest':
+        judge = get_judge(args.judge)
+        if len(args.suffixes) == 1 and args.suffixes[0].isdigit():
+            judge.make_contest_files(args.prefix, num_problems=int(args.suffixes[0]))
+        else:
+            judge.make_contest_files(args.prefix, problem_id_suffixes=args.suffixes)
+    elif args.command == 'run':
+        from .runner import samples
+        kwargs = dict() if args.timeout is None else dict(timeout=args.timeout)
+        results = samples.run_samples(args.source, **kwargs)
+        if results is None:
+            return 1
+        samples.print_results(results)
+        return 0 if all(r.verdict in ['OK', '??'] for r in results) else 1
+    elif args.command == 'profile':
+        from .runner import profiler
+        input_file = os.path.join(os.path.dirname(os.path.abspath(args.source)), args.input)
+        if not os.path.isfile(input_file):
+            print(f'{input_file} does not exist')
+            return 1
+        profile = profiler.profile_solution(args.source, input_file, args.tool)
+        if profile is None:
+            return 1
+        top = profiler.DEFAULT_TOP if args.top is None else args.top
+        profiler.write_profile(profile, args.source, input_file, top)
+    elif args.command == 'bundle':
+        from .runner import bundle
+        text, stats = bundle.bundle(args.source, drop_unused=not args.keep_unused)
+        if args.output is None:
+            sys.stdout.write(text)
+        else:
+            from .judges.cache import atomic_write_text
+            atomic_write_text(args.output, text)
+        print(f'bundled {stats.files} files; dropped {stats.dropped} of {stats.sections} '
+              f'library sections; {stats.size} bytes', file=sys.stderr)
+    elif args.command == 'upload':
+        from .judges.github import upload_solutions
+        judge = get_judge(args.judge)
+        ok = upload_solutions([(judge, file) for file in args.files],
+                              delete_local=not args.keep)
+        return 0 if ok else 1
+    elif args.command == 'sync':
+        from .judges.github import sync_solutions
+        ok = sync_solutions(get_judge(args.judge), args.directories,
+                            dry_run=args.dry_run)
+        return 0 if ok else 1
+    return 0
+
+
+# ------------------------------------------------------------------ daemon
+
+
+class _Connection:
+    def __init__(self, sock: socket.socket):
+        self.rfile = sock.makefile('r')
+        self.wfile = sock.makefile('w')
+        # a command's worker threads print too; a prompt holds it until
+        # the answer comes
+        self.lock = threading.RLock()
+
+    def send(self, **message) -> None:
+        with self.lock:
+            self.wfile.write(json.dumps(message) + '\n')
+            self.wfile.flush()
+
+    def receive(self) -> dict:
+        line = self.rfile.readline()
+        if not line:
+            raise EOFError
+        return json.loads(line)
+
+
+def serve() -> int:
+    import builtins
+    import contextlib
+    import io
+
+    from . import tracing
+    from .judges import JUDGES, get_judge
+    from .judges.judge import get_session, get_template, get_web_page_session, SOURCE_EXTENSIONS
+
+    # warm everything up front; this is the whole point
+    for name in JUDGES:
+        get_judge(name)
+    get_session()
+    get_web_page_session()
+    for ext in SOURCE_EXTENSIONS:
+        get_template(ext)
+    tracing.flush()  # the warm-up gets a trace of its own
+
+    # commands print and ask questions; send all of that to the client of
+    # the command that is running, from any thread, since commands run one
+    # at a time and their worker threads (downloads, uploads) print too.
+    # Anything else goes to the log.
+    active = dict(conn=None, isatty=False)
+    original_stdout, original_stderr = sys.stdout, sys.stderr
+    original_input = builtins.input
+
+    class Router(io.TextIOBase):
+        def __init__(self, key, fallback):
+            self.key = key
+            self.fallback = fallback
+
+        def write(self, s):
+            conn = active['conn']
+            if conn is None:
+                return self.fallback.write(s)
+            conn.send(**{self.key: s})
+            return len(s)
+
+        def flush(self):
+            if active['conn'] is None:
+                self.fallback.flush()
+
+        def isatty(self):
+            return active['isatty']
+
+    def routed_input(prompt=''):
+        conn = active['conn']
+        if conn is None:
+            return original_input(prompt)
+        with conn.lock:
+            conn.send(prompt=str(prompt))
+            return conn.receive()['answer']
+
+    sys.stdout = Router('out', original_stdout)
+    sys.stderr = Router('err', original_stderr)
+    builtins.input = routed_input
+
+    # commands depend on the working directory, which is per process
+    command_lock = threading.Lock()
+    parser = build_parser()
+    if os.path.exists(SOCKET_PATH):
+        os.remove(SOCKET_PATH)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    # only we can connect, from the moment the socket exists
+    umask = os.umask(0o177)
+    try:
+        server.bind(SOCKET_PATH)
+    finally:
+        os.umask(umask)
+    server.listen()
+    stopping = threading.Event()
+
+    def handle(sock: socket.socket) -> None:
+        conn = _Connection(sock)
+        try:
+            request = conn.receive()
+            argv = request['argv']
+            if argv[:1] == ['ping']:
+                conn.send(exit=0)
+                return
+            if argv[:1] == ['stop']:
+                # let a running command finish; the lock is never released,
+                # so nothing starts after it
+                command_lock.acquire()
+                stopping.set()
+                conn.send(out='daemon stopped\n')
+                conn.send(exit=0)
+                # wake up accept()
+                with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as wake:
+                    wake.connect(SOCKET_PATH)
+                return
+            with command_lock:
+                active['isatty'] = request.get('isatty', False)
+                active['conn'] = conn
+                os.chdir(request['cwd'])
+                try:
+                    with tracing.span('command', argv=' '.join(argv)):
+                        status = run_command(parser.parse_args(argv))
+                except SystemExit as e:
+                    status = e.code if isinstance(e.code, int) else 1
+                except Exception as e:
+                    print(f'error: {e!r}', file=sys.stderr)
+                    status = 1
+                finally:
+                    tracing.flush()  # to this client, one trace per command
+                    active['conn'] = None
+            conn.send(exit=status)
+        except (EOFError, OSError, ValueError, KeyError):
+            pass
+        finally:
+            sock.close()
+
+    print(f'cp-helper daemon listening on {SOCKET_PATH}', file=original_stderr)
+    try:
+        while not stopping.is_set():
+            sock, _ = server.accept()
+            if stopping.is_set():
+                sock.close()
+                break
+            threading.Thread(target=handle, args=(sock,), daemon=True).start()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(SOCKET_PATH):
+            os.remove(SOCKET_PATH)
+        with contextlib.suppress(Exception):
+            sys.stdout, sys.stderr = original_stdout, original_stderr
+            builtins.input = original_input
+    return 0
+
+
+# ------------------------------------------------------------------ client
+
+
+def connect():
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(SOCKET_PATH)
+    except (FileNotFoundError, ConnectionRefusedError):
+        sock.close()
+        return None
+    return sock
+
+
+def send_command(sock: socket.socket, argv: list[str]) -> int:
+    conn = _Connection(sock)
+    conn.send(argv=argv, cwd=os.getcwd(), isatty=sys.stdout.isatty())
+    while True:
+        try:
+            message = conn.receive()
+        except EOFError:
+            print('error: the daemon hung up', file=sys.stderr)
+            return 1
+        if 'out' in message:
+            sys.stdout.write(message['out'])
+            sys.stdout.flush()
+        elif 'err' in message:
+            sys.stderr.write(message['err'])
+            sys.stderr.flush()
+        elif 'prompt' in message:
+            conn.send(answer=input(message['prompt']))
+        elif 'exit' in message:
+            return message['exit']
+
+
+def start() -> int:
+    sock = connect()
+    if sock is not None:
+        sock.close()
+        print('daemon already running')
+        return 0
+    log = os.path.join(os.path.dirname(SOCKET_PATH), f'cp_helper-{os.getuid()}.log')
+    package_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        p for p in [package_parent, env.get('PYTHONPATH')] if p)
+    with open(log, 'a') as f:
+        subprocess.Popen(
+            [sys.executable, '-m', f'{PACKAGE}.daemon', 'serve'],
+            stdin=subprocess.DEVNULL,
+            stdout=f,
+            stderr=f,
+            env=env,
+            start_new_session=True,
+        )
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        sock = connect()
+        if sock is not None:
+            sock.close()
+            print(f'daemon started; log in {log}')
+            return 0
+        time.sleep(0.05)
+    print(f'daemon did not start; see {log}', file=sys.stderr)
+    return 1
+
+
+def main() -> int:
+    argv = sys.argv[1:]
+    command = argv[0] if argv else None
+    if command == 'serve':
+        return serve()
+    if command == 'start':
+        return start()
+
+    sock = connect()
+    if sock is not None:
+        with sock:
+            return send_command(sock, argv)
+    if command in ['stop', 'ping']:
+        print('daemon not running')
+        return 1 if command == 'ping' else 0
+    # no daemon; do it ourselves
+    return run_command(build_parser().parse_args(argv))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,46 @@
+"""
+The judges, each imported only when it is first used:
+
+    from cp_helper.judges import Codeforces  # imports judges/codeforces.py only
+    get_judge('codeforces')
+"""
+
+
+import importlib
+
+
+# name used on the command line -> (module, class)
+JUDGES = {
+    'atcoder': ('atcoder', 'AtCoder'),
+    'boj': ('boj', 'Boj'),
+    'codeforces': ('codeforces', 'Codeforces'),
+    'cses': ('cses', 'Cses'),
+    'dmoj': ('dmoj', 'Dmoj'),
+    'fhc': ('fhc', 'Fhc'),
+    'kattis': ('kattis', 'Kattis'),
+    'usaco': ('usaco', 'Usaco'),
+    'generic': ('judge', 'Judge'),
+}
+
+
+def get_judge(name: str) -> type:
+    try:
+        module_name, class_name = JUDGES[name.lower()]
+    except KeyError:
+        raise ValueError(
+            f'unknown judge {name!r}; expected one of {", ".join(JUDGES)}'
+        ) from None
+    module = importlib.import_module(f'.{module_name}', __name__)
+    return getattr(module, class_name)
+
+
+def __getattr__(name: str):
+    for module_name, class_name in JUDGES.values():
+        if class_name == name:
+            module = importlib.import_module(f'.{module_name}', __name__)
+            return getattr(module, class_name)
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def __dir__() -> list[str]:
+    return sorted([*globals(), *(class_name for _, class_name in JUDGES.values())])
@@ -1,7 +1,8 @@
-from .judge import Judge
+from typing import Optional
 
-from bs4 import BeautifulSoup
-import requests
+from .judge import Contest, Judge, scrape_html
+
+from .parsing import make_soup
 
 
 def contest_url(contest_id: str) -> str:
@@ -12,6 +13,7 @@ class AtCoder(Judge):
     name = 'AtCoder'
     github_repo = 'cp-solutions'
     github_directory = 'atcoder'
+    supports_contests = True
 
     @staticmethod
     def link(problem_id):
@@ -28,28 +30,38 @@ class AtCoder(Judge):
         return chr(ord('a') + index)
 
     @classmethod
-    def get_input_data(cls, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    def get_sample_data(cls, html: str) -> tuple[list[str], list[str]]:
+        soup = make_soup(html)
         tags = soup.find_all('h3')
         input_data: list[str] = []
+        output_data: list[str] = []
         for tag in tags:
             if tag.text.startswith('Sample Input'):
-                nxt = tag.next_sibling
-                if nxt == '\n':
-                    nxt = nxt.next_sibling
-                data = nxt.text.replace('\r\n', '\n')
-                input_data.append(data)
-        return input_data
-
-    # this doesn't work for live contests since the problems are not published
-    # when the contest starts (only when the contest is over?)
-    # @classmethod
-    # def download_contest(cls, contest_id) -> bool:
-    #     res = requests.get(contest_url(contest_id))
-    #     if not (200 <= res.status_code < 300):
-    #         return False
-    #     html = res.text
-    #     soup = BeautifulSoup(html, 'html.parser')
-    #     tags = soup.select('span.lang-en > div.row tbody > tr > td')
-    #     problems = list(filter(lambda s: len(s) == 1, [tag.text.strip().lower() for tag in tags]))
-    #     cls.make_contest_files(f'{contest_id}_', problem_id_suffixes=problems)
+                data = input_data
+            elif tag.text.startswith('Sample Output'):
+                data = output_data
+            else:
+                continue
+            nxt = tag.next_sibling
+            if nxt == '\n':
+                nxt = nxt.next_sibling
+            data.append(nxt.text.replace('\r\n', '\n'))
+        return (input_data, output_data)
+
+    @classmethod
+    def get_contest(cls, contest_id) -> Optional[Contest]:
+        """
+        The task list is only published once the contest starts (see
+        judges/prefetch.py for waiting on it). Task IDs don't always match
+        the contest ID, so the links are taken from the list.
+        """
+        html = scrape_html(f'{contest_url(contest_id)}/tasks', max_age=0)
+        if html is None:
+            return None
+        soup = make_soup(html)
+        anchor_tags = soup.select('table tbody > tr > td:first-child > a')
+        if not anchor_tags:
+            return None
+        problems = [tag.text.strip().lower() for tag in anchor_tags]
+        links = [f'https://atcoder.jp{tag["href"]}' for tag in anchor_tags]
+        return Contest(f'{contest_id}_', problems, links)
@@ -1,8 +1,10 @@
-from .judge import Judge
+import re
+
+from .judge import Judge, Limits
 
 from pprint import pprint
 
-from bs4 import BeautifulSoup
+from .parsing import make_soup, parse_megabytes, parse_seconds
 
 
 class Boj(Judge):
@@ -22,12 +24,24 @@ class Boj(Judge):
         return (f'boj_{problem_id}', filename)
 
     @classmethod
-    def get_input_data(cls, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    def get_sample_data(cls, html: str) -> tuple[list[str], list[str]]:
+        soup = make_soup(html)
         tags = soup.select('pre.sampledata')
         input_data: list[str] = []
+        output_data: list[str] = []
         for tag in tags:
+            data = tag.text.replace('\r\n', '\n')
             if tag.get('id').startswith('sample-input'):
-                data = tag.text.replace('\r\n', '\n')
                 input_data.append(data)
-        return input_data
+            elif tag.get('id').startswith('sample-output'):
+                output_data.append(data)
+        return (input_data, output_data)
+
+    @classmethod
+    def get_limits(cls, html: str) -> Limits:
+        # the values are in the row under the headers (in Korean)
+        m = re.search(r'id="problem-info".*?<td>([^<]*)</td>\s*<td>([^<]*)</td>',
+                      html, re.DOTALL)
+        if m is None:
+            return Limits()
+        return Limits(parse_seconds(m.group(1)), parse_megabytes(m.group(2)))
@@ -0,0 +1,211 @@
+"""
+Importing whole problem archives, e.g. all of CSES or a range of BOJ problems.
+
+Unlike make_contest_files, nothing here asks questions and a failed problem
+doesn't stop the rest. Every finished problem is appended to a manifest (one
+JSON line each), so an interrupted import picks up where it left off and
+never downloads a finished problem again; failed problems are retried.
+
+Problems whose code file already exists are skipped unless --overwrite is
+given. The samples are written before the code file, each atomically, so a
+code file on disk always comes with its samples.
+
+Usage:
+    python3 -m cp_helper.judges.bulk cses --all
+    python3 -m cp_helper.judges.bulk boj --range 1000-1099
+    python3 -m cp_helper.judges.bulk kattis hello carrots cold -j 8
+"""
+
+
+import argparse
+from dataclasses import asdict, dataclass
+import json
+import os
+import sys
+import threading
+import time
+from typing import Optional
+
+from . import JUDGES, get_judge
+from .cache import atomic_write
+from .judge import Judge, MAX_DOWNLOAD_WORKERS
+
+
+@dataclass
+class ManifestEntry:
+    problem_id: str
+    status: str  # 'done' or 'failed'
+    inputs: int
+    outputs: int
+    error: Optional[str]
+    at: float  # unix time
+
+
+class Manifest:
+    """An append-only log of finished problems; the last entry wins."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: dict[str, ManifestEntry] = dict()
+        self.lock = threading.Lock()
+        try:
+            with open(path) as f:
+                for line in f:
+                    try:
+                        entry = ManifestEntry(**json.loads(line))
+                    except (ValueError, TypeError):
+                        continue  # e.g. cut off by a crash
+                    self.entries[entry.problem_id] = entry
+        except FileNotFoundError:
+            pass
+
+    def done(self, problem_id: str) -> bool:
+        entry = self.entries.get(problem_id)
+        return entry is not None and entry.status == 'done'
+
+    def record(self, entry: ManifestEntry) -> None:
+        with self.lock:
+            self.entries[entry.problem_id] = entry
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(asdict(entry)) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+
+    def compact(self) -> None:
+        """Rewrite the log with one line per problem."""
+        with self.lock:
+            lines = [json.dumps(asdict(entry)) + '\n' for entry in self.entries.values()]
+            atomic_write(self.path, ''.join(lines).encode())
+
+
+def import_problem(judge: type[Judge], problem_id: str,
+                   lang: Optional[str] = None) -> ManifestEntry:
+    try:
+        files = judge.problem_files(problem_id, lang=lang)
+        sample_data, limits = judge.fetch_problem(files.link, required=True)
+        os.makedirs(files.directory, exist_ok=True)
+        judge.write_sample_files(files, sample_data, confirm=False)
+        judge.write_problem_info(files, limits)
+        judge.write_code_file(files)
+        judge.confirm_written(files, sample_data)
+    except Exception as e:
+        return ManifestEntry(problem_id, 'failed', 0, 0, repr(e), time.time())
+    inputs, outputs = sample_data
+    return ManifestEntry(problem_id, 'done', len(inputs), len(outputs), None, time.time())
+
+
+def _present(judge: type[Judge], problem_id: str, lang: Optional[str]) -> bool:
+    """Whether the problem's code file exists (a bad ID fails in import_problem)."""
+    try:
+        return os.path.isfile(judge.problem_files(problem_id, lang=lang).code_file)
+    except Exception:
+        return False
+
+
+def bulk_import(judge: type[Judge], problem_ids: list[str], manifest: Manifest,
+                overwrite=False, workers=MAX_DOWNLOAD_WORKERS,
+                lang: Optional[str] = None) -> bool:
+    """
+    Import every problem that isn't done yet. Returns whether all of them
+    are done now.
+    """
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    todo = []
+    skipped = 0
+    for problem_id in problem_ids:
+        if manifest.done(problem_id):
+            continue
+        if not overwrite and _present(judge, problem_id, lang):
+            skipped += 1
+            continue
+        todo.append(problem_id)
+    print(f'{len(problem_ids)} problems: {len(problem_ids) - len(todo) - skipped} '
+          f'already imported, {skipped} already present, {len(todo)} to import')
+
+    start = time.perf_counter()
+    failed = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, workers))
+    try:
+        futures = [executor.submit(import_problem, judge, problem_id, lang)
+                   for problem_id in todo]
+        for k, future in enumerate(as_completed(futures), start=1):
+            entry = future.result()
+            manifest.record(entry)
+            if entry.status != 'done':
+                failed += 1
+                print(f'[{k}/{len(todo)}] {entry.problem_id} failed: {entry.error}')
+    except KeyboardInterrupt:
+        print('interrupted; run the same command again to resume')
+        executor.shutdown(wait=True, cancel_futures=True)
+        return False
+    finally:
+        executor.shutdown(wait=True)
+        manifest.compact()
+
+    elapsed = time.perf_counter() - start
+    print(f'imported {len(todo) - failed} problems in {elapsed:.1f}s; {failed} failed')
+    if failed:
+        print('run the same command again to retry the failed ones')
+    return failed == 0
+
+
+def parse_range(s: str) -> list[str]:
+    first, _, last = s.partition('-')
+    try:
+        return [str(i) for i in range(int(first), int(last or first) + 1)]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'not a range of IDs: {s}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('judge', choices=sorted(JUDGES))
+    parser.add_argument('problem_ids', nargs='*')
+    parser.add_argument('--all', action='store_true',
+                        help="every problem in the judge's archive")
+    parser.add_argument('--range', type=parse_range, action='append', default=[],
+                        help='numeric problem IDs, e.g. 1000-1099')
+    parser.add_argument('--ids-file', help='a file with one problem ID per line')
+    parser.add_argument('--overwrite', action='store_true',
+                        help='rewrite problems whose code file already exists')
+    parser.add_argument('--manifest', default=None,
+                        help='progress log (default: bulk_<judge>.jsonl)')
+    parser.add_argument('--restart', action='store_true',
+                        help='forget the progress in the manifest')
+    parser.add_argument('-j', '--jobs', type=int, default=MAX_DOWNLOAD_WORKERS)
+    parser.add_argument('--lang', default=None)
+    args = parser.parse_args()
+
+    judge = get_judge(args.judge)
+    problem_ids = list(args.problem_ids)
+    for ids in args.range:
+        problem_ids.extend(ids)
+    if args.ids_file is not None:
+        with open(args.ids_file) as f:
+            problem_ids.extend(line.strip() for line in f if line.strip())
+    if args.all:
+        if not judge.supports_problem_list:
+            print(f'{judge.name} has no list of problems')
+            return 1
+        ids = judge.get_problem_ids()
+        if ids is None:
+            print('could not get the list of problems')
+            return 1
+        problem_ids.extend(ids)
+    # drop duplicates, keeping the order
+    problem_ids = list(dict.fromkeys(problem_ids))
+    if not problem_ids:
+        parser.error('no problems given')
+
+    manifest_path = args.manifest or f'bulk_{args.judge}.jsonl'
+    if args.restart and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    manifest = Manifest(manifest_path)
+    ok = bulk_import(judge, problem_ids, manifest, overwrite=args.overwrite,
+                     workers=args.jobs, lang=args.lang)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,193 @@
+"""
+A persistent on-disk cache for web pages, so that regenerating a template or
+re-pulling samples doesn't download the problem page again.
+
+Each page is stored as two files named after the hash of its URL:
+<hash>.gz holds the gzipped body and <hash>.json holds the metadata (ETag,
+Last-Modified, when it was fetched and when it was last used).
+
+Configured with environment variables:
+CP_HELPER_CACHE_DIR - where everything is cached (default ~/.cache/cp_helper)
+CP_HELPER_HTTP_CACHE_TTL - seconds a page is used without revalidating it
+CP_HELPER_HTTP_CACHE_MAX_BYTES - size cap for the compressed bodies
+"""
+
+
+from dataclasses import asdict, dataclass
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional
+
+from ..tracing import span
+
+
+CACHE_DIR = os.getenv(
+    'CP_HELPER_CACHE_DIR',
+    os.path.join(os.path.expanduser('~'), '.cache', 'cp_helper'),
+)
+HTTP_CACHE_TTL = float(os.getenv('CP_HELPER_HTTP_CACHE_TTL', 24 * 60 * 60))
+HTTP_CACHE_MAX_BYTES = int(
+    os.getenv('CP_HELPER_HTTP_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+
+def _temp_path(path: str) -> str:
+    return f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    """Write data to path so that readers never see a partial file."""
+    with span('write', path=path, bytes=len(data)):
+        tmp = _temp_path(path)
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+def atomic_write_text(path: str, text: str) -> None:
+    """Like atomic_write, for text (with the platform's newlines)."""
+    with span('write', path=path):
+        tmp = _temp_path(path)
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float  # when the body was last confirmed to be current
+    used_at: float  # for LRU eviction
+    size: int  # size of the compressed body
+
+
+class HttpCache:
+    def __init__(self, directory: str, ttl: float, max_bytes: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def _paths(self, url: str) -> tuple[str, str]:
+        key = hashlib.sha256(url.encode()).hexdigest()
+        base = os.path.join(self.directory, key)
+        return (f'{base}.gz', f'{base}.json')
+
+    def _read_entry(self, url: str) -> Optional[CacheEntry]:
+        _, meta_path = self._paths(url)
+        try:
+            with open(meta_path) as f:
+                entry = CacheEntry(**json.load(f))
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+        if entry.url != url:
+            return None
+        return entry
+
+    def _write_entry(self, entry: CacheEntry) -> None:
+        _, meta_path = self._paths(entry.url)
+        atomic_write(meta_path, json.dumps(asdict(entry)).encode())
+
+    def _read_body(self, url: str) -> Optional[str]:
+        body_path, _ = self._paths(url)
+        try:
+            with gzip.open(body_path, 'rb') as f:
+                return f.read().decode()
+        except (FileNotFoundError, OSError, EOFError):
+            return None
+
+    def _use(self, entry: CacheEntry) -> Optional[str]:
+        body = self._read_body(entry.url)
+        if body is not None:
+            entry.used_at = time.time()
+            self._write_entry(entry)
+        return body
+
+    def fresh(self, url: str, max_age: Optional[float] = None) -> Optional[str]:
+        """
+        Return the cached page if it was fetched less than max_age seconds
+        ago (default: the cache's TTL), without touching the network.
+        """
+        if max_age is None:
+            max_age = self.ttl
+        with self.lock:
+            entry = self._read_entry(url)
+            if entry is None or time.time() - entry.fetched_at >= max_age:
+                return None
+            return self._use(entry)
+
+    def validators(self, url: str) -> dict[str, str]:
+        """Headers for a conditional GET of a (stale) cached page."""
+        with self.lock:
+            entry = self._read_entry(url)
+        headers = dict()
+        if entry is None:
+            return headers
+        if entry.etag is not None:
+            headers['If-None-Match'] = entry.etag
+        if entry.last_modified is not None:
+            headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def revalidated(self, url: str) -> Optional[str]:
+        """The server answered 304 Not Modified; the cached page is current."""
+        with self.lock:
+            entry = self._read_entry(url)
+            if entry is None:
+                return None
+            entry.fetched_at = time.time()
+            return self._use(entry)
+
+    def store(self, url: str, body: str, etag: Optional[str] = None,
+              last_modified: Optional[str] = None) -> None:
+        body_path, _ = self._paths(url)
+        data = gzip.compress(body.encode())
+        now = time.time()
+        with self.lock:
+            os.makedirs(self.directory, exist_ok=True)
+            atomic_write(body_path, data)
+            self._write_entry(CacheEntry(
+                url, etag, last_modified, now, now, len(data)))
+            self._evict()
+
+    def _evict(self) -> None:
+        entries: list[CacheEntry] = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, name)) as f:
+                    entries.append(CacheEntry(**json.load(f)))
+            except (FileNotFoundError, ValueError, TypeError):
+                continue
+        total = sum(entry.size for entry in entries)
+        entries.sort(key=lambda entry: entry.used_at)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            for path in self._paths(entry.url):
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= entry.size
+
+    def clear(self) -> None:
+        with self.lock:
+            if not os.path.isdir(self.directory):
+                return
+            for name in os.listdir(self.directory):
+                if name.endswith('.gz') or name.endswith('.json'):
+                    os.remove(os.path.join(self.directory, name))
+
+
+http_cache = HttpCache(
+    os.path.join(CACHE_DIR, 'http'),
+    HTTP_CACHE_TTL,
+    HTTP_CACHE_MAX_BYTES,
+)
@@ -1,7 +1,8 @@
-from .judge import Judge, scrape_html
+from typing import Optional
 
-from bs4 import BeautifulSoup
-import requests
+from .judge import Contest, Judge, scrape_html
+
+from .parsing import make_soup
 
 
 def contest_url(contest_id: str) -> str:
@@ -12,6 +13,7 @@ class Codeforces(Judge):
     name = 'Codeforces'
     github_repo = 'cp-solutions'
     github_directory = 'codeforces'
+    supports_contests = True
 
     @staticmethod
     def link(problem_id: str):
@@ -40,18 +42,22 @@ class Codeforces(Judge):
         )
 
     @classmethod
-    def get_input_data(cls, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    def get_sample_data(cls, html: str) -> tuple[list[str], list[str]]:
+        soup = make_soup(html)
         pre_tags = soup.select('div.input > div.title + pre')
         input_data = [tag.text.lstrip() for tag in pre_tags]
-        return input_data
+        pre_tags = soup.select('div.output > div.title + pre')
+        output_data = [tag.text.lstrip() for tag in pre_tags]
+        return (input_data, output_data)
 
     @classmethod
-    def download_contest(cls, contest_id) -> bool:
-        html = scrape_html(contest_url(contest_id))
+    def get_contest(cls, contest_id) -> Optional[Contest]:
+        html = scrape_html(contest_url(contest_id), max_age=0)
         if html is None:
-            return False
-        soup = BeautifulSoup(html, 'html.parser')
+            return None
+        soup = make_soup(html)
         anchor_tags = soup.select('tr > td.id > a')
         problems = [tag.text.strip() for tag in anchor_tags]
-        cls.make_contest_files(contest_id, problem_id_suffixes=problems)
+        if not problems:
+            return None
+        return Contest(contest_id, problems)
@@ -1,19 +1,31 @@
-from .judge import Judge
+from typing import Optional
+
+from .judge import Judge, scrape_html
 
 from pprint import pprint
 
-from bs4 import BeautifulSoup
+from .parsing import make_soup
 
 
 class Cses(Judge):
     name = 'CSES'
     github_repo = 'cp-solutions'
     github_directory = 'cses'
+    supports_problem_list = True
 
     @staticmethod
     def link(problem_id):
         return f'https://cses.fi/problemset/task/{problem_id}'
 
+    @classmethod
+    def get_problem_ids(cls) -> Optional[list[str]]:
+        html = scrape_html('https://cses.fi/problemset/')
+        if html is None:
+            return None
+        soup = make_soup(html)
+        anchor_tags = soup.select('li.task > a[href^="/problemset/task/"]')
+        return [tag['href'].rstrip('/').split('/')[-1] for tag in anchor_tags]
+
     @staticmethod
     def local_directory_and_filename_no_ext(problem_id, suffix=None):
         filename = f'cses_{problem_id}'
@@ -22,14 +34,18 @@ class Cses(Judge):
         return (f'cses_{problem_id}', filename)
 
     @classmethod
-    def get_input_data(cls, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    def get_sample_data(cls, html: str) -> tuple[list[str], list[str]]:
+        soup = make_soup(html)
         tags = soup.select('[id^=example]~code')
         # print(tags)
         input_data: list[str] = []
+        output_data: list[str] = []
+        # the first example is the input, the second its output
         if tags:
             input_data.append(tags[0].text)
+        if len(tags) >= 2:
+            output_data.append(tags[1].text)
         # for tag in tags:
         #     pprint(tag)
         #     input_data.append(tag.text)
-        return input_data
+        return (input_data, output_data)
@@ -1,6 +1,6 @@
 from .judge import Judge
 
-from bs4 import BeautifulSoup
+from .parsing import make_soup
 
 
 class Dmoj(Judge):
@@ -18,15 +18,20 @@ class Dmoj(Judge):
         return f'{index + 1}'
 
     @classmethod
-    def get_input_data(cls, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    def get_sample_data(cls, html: str) -> tuple[list[str], list[str]]:
+        soup = make_soup(html)
         tags = soup.find_all('h4')
         input_data: list[str] = []
+        output_data: list[str] = []
         for tag in tags:
             if tag.text.startswith('Sample Input'):
-                nxt = tag.next_sibling
-                if nxt == '\n':
-                    nxt = nxt.next_sibling
-                data = nxt.text
-                input_data.append(data)
-        return input_data
+                data = input_data
+            elif tag.text.startswith('Sample Output'):
+                data = output_data
+            else:
+                continue
+            nxt = tag.next_sibling
+            if nxt == '\n':
+                nxt = nxt.next_sibling
+            data.append(nxt.text)
+        return (input_data, output_data)
@@ -0,0 +1,374 @@
+"""
+Uploading many solutions at once through the GitHub Git Data API.
+
+Judge.upload_solution uses the contents API, which costs two requests and
+one commit per file. upload_solutions instead builds a single tree with all
+the files and commits it, so a whole contest costs a constant number of
+requests and shows up as one commit:
+
+1. GET the repo (for its default branch)
+2. GET the branch ref (for the head commit)
+3. GET the head commit (for its tree)
+4. POST a tree on top of that tree, with the contents of every file inline
+   (GitHub creates the blobs for us)
+5. POST a commit with that tree
+6. PATCH the branch ref to the new commit
+
+sync_solutions keeps a local index of what is in the repo (path -> git blob
+sha, as of a commit) under the cache directory. Git blob shas only depend on
+the content, so they are computed locally to find the files that changed,
+and only those are committed; if nothing changed, a sync costs two requests.
+The index is refreshed with one recursive tree listing whenever the branch
+has moved on since it was saved.
+
+Set GITHUB_API_URL to test against a local stand-in server.
+
+Usage: python3 -m cp_helper.judges.github sync codeforces DIRECTORY...
+"""
+
+
+import argparse
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+import sys
+from typing import Optional
+
+from . import JUDGES, get_judge
+from ..tracing import traced
+from .cache import CACHE_DIR, atomic_write
+from .judge import (
+    Judge,
+    delete_local_solution,
+    get_session,
+    github_api_url,
+    github_username,
+)
+
+
+INDEX_DIR = os.path.join(CACHE_DIR, 'github')
+SOLUTION_EXTENSIONS = ['.cpp', '.c', '.py']
+
+
+def _succeeded(res, what: str) -> bool:
+    if 200 <= res.status_code < 300:
+        return True
+    print(f'{what} failed with code {res.status_code}')
+    print(f'reason: {res.reason}')
+    return False
+
+
+def github_filepath(judge: type[Judge], file: str) -> str:
+    assert judge.github_directory != ''
+    return f'{judge.github_directory}/{judge.github_path(file)}'
+
+
+def get_head(repo: str, branch: Optional[str] = None) -> Optional[tuple[str, str]]:
+    """The branch (default: the repo's default branch) and its head commit."""
+    repo_path = f'/repos/{github_username()}/{repo}'
+    session = get_session()
+
+    if branch is None:
+        res = session.get(github_api_url(repo_path))
+        if not _succeeded(res, f'getting repo {repo}'):
+            return None
+        branch = res.json()['default_branch']
+
+    res = session.get(github_api_url(f'{repo_path}/git/ref/heads/{branch}'))
+    if not _succeeded(res, f'getting branch {branch} of {repo}'):
+        return None
+    return (branch, res.json()['object']['sha'])
+
+
+@traced('github.commit')
+def commit_files(repo: str, files: dict[str, str], message: str,
+                 branch: Optional[str] = None,
+                 head_sha: Optional[str] = None) -> Optional[str]:
+    """
+    Commit files (path in the repo -> content) to repo in a single commit.
+    Returns the sha of the new commit, or None if any request failed.
+
+    head_sha - the commit to build on, if the caller already knows it
+    (branch must be given too); the update fails if the branch has moved
+    """
+    repo_path = f'/repos/{github_username()}/{repo}'
+    session = get_session()
+
+    if head_sha is None:
+        head = get_head(repo, branch)
+        if head is None:
+            return None
+        branch, head_sha = head
+    assert branch is not None
+
+    res = session.get(github_api_url(f'{repo_path}/git/commits/{head_sha}'))
+    if not _succeeded(res, f'getting commit {head_sha} of {repo}'):
+        return None
+    base_tree = res.json()['tree']['sha']
+
+    tree = [
+        dict(path=path, mode='100644', type='blob', content=content)
+        for path, content in files.items()
+    ]
+    res = session.post(
+        github_api_url(f'{repo_path}/git/trees'),
+        json=dict(base_tree=base_tree, tree=tree),
+    )
+    if not _succeeded(res, f'creating tree in {repo}'):
+        return None
+    tree_sha = res.json()['sha']
+
+    res = session.post(
+        github_api_url(f'{repo_path}/git/commits'),
+        json=dict(message=message, tree=tree_sha, parents=[head_sha]),
+    )
+    if not _succeeded(res, f'creating commit in {repo}'):
+        return None
+    commit_sha = res.json()['sha']
+
+    res = session.patch(
+        github_api_url(f'{repo_path}/git/refs/heads/{branch}'),
+        json=dict(sha=commit_sha),
+    )
+    if not _succeeded(res, f'updating branch {branch} of {repo}'):
+        return None
+    return commit_sha
+
+
+def upload_solutions(solutions: list[tuple[type[Judge], str]],
+                     delete_local=True, message=None) -> bool:
+    """
+    Upload many solution files, possibly for different judges, with one
+    commit per GitHub repo.
+
+    solutions - (judge, path of the local file) pairs
+    """
+    # repo -> path in repo -> (local file, content)
+    by_repo: dict[str, dict[str, tuple[str, str]]] = dict()
+    for judge, file in solutions:
+        try:
+            with open(file) as f:
+                content = f.read()
+        except FileNotFoundError:
+            print(f'ERROR: file {file} not found')
+            return False
+        path = github_filepath(judge, file)
+        by_repo.setdefault(judge.github_repo, dict())[path] = (file, content)
+
+    ok = True
+    for repo, files in by_repo.items():
+        if message is None:
+            names = ', '.join(os.path.basename(path) for path in files)
+            commit_message = f'Upload solutions {names} from Python script'
+        else:
+            commit_message = message
+        contents = {path: content for path, (_, content) in files.items()}
+        # the head is looked up here rather than in commit_files, to keep
+        # the index up to date
+        head = get_head(repo)
+        commit_sha = None
+        if head is not None:
+            branch, head_sha = head
+            commit_sha = commit_files(repo, contents, commit_message,
+                                      branch=branch, head_sha=head_sha)
+        if commit_sha is None:
+            print(f'{len(files)} local files not uploaded to {repo}')
+            ok = False
+            continue
+
+        record_commit(repo, head_sha, commit_sha, contents, branch=branch)
+        print(f'successfully pushed {len(files)} files to GitHub repo {repo} '
+              f'in commit {commit_sha[:7]}')
+        for path, (file, _) in files.items():
+            print(f'  {file} -> {path}')
+        print(f'message: {commit_message}')
+        if delete_local:
+            for file, _ in files.values():
+                # an earlier file may have taken the whole directory with it
+                if os.path.isfile(file):
+                    delete_local_solution(file)
+    return ok
+
+
+def git_blob_sha(content: str) -> str:
+    """The sha git (and so GitHub) gives a file with this content."""
+    data = content.encode()
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+@dataclass
+class RepoIndex:
+    """What is in a branch of a repo as of one commit."""
+    repo: str
+    branch: str
+    commit: str
+    files: dict[str, str]  # path -> blob sha
+
+
+def _index_path(repo: str) -> str:
+    return os.path.join(INDEX_DIR, f'{github_username()}_{repo}.json')
+
+
+def load_index(repo: str) -> Optional[RepoIndex]:
+    try:
+        with open(_index_path(repo)) as f:
+            return RepoIndex(**json.load(f))
+    except (FileNotFoundError, ValueError, TypeError):
+        return None
+
+
+def save_index(index: RepoIndex) -> None:
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    atomic_write(_index_path(index.repo), json.dumps(asdict(index)).encode())
+
+
+def record_commit(repo: str, parent_sha: str, commit_sha: str, files: dict[str, str],
+                  branch: Optional[str] = None) -> None:
+    """
+    Update the saved index of repo for a commit we made on top of parent_sha
+    (on branch, if known) that wrote files (path -> content). An index that
+    was not current is left to be refreshed by the next sync.
+    """
+    index = load_index(repo)
+    if index is None or index.commit != parent_sha:
+        return
+    if branch is not None and index.branch != branch:
+        return
+    index.commit = commit_sha
+    index.files.update((path, git_blob_sha(content)) for path, content in files.items())
+    save_index(index)
+
+
+def fetch_index(repo: str, branch: str, commit_sha: str) -> Optional[RepoIndex]:
+    """List every file in the repo as of commit_sha, with one tree request."""
+    repo_path = f'/repos/{github_username()}/{repo}'
+    session = get_session()
+
+    res = session.get(github_api_url(f'{repo_path}/git/commits/{commit_sha}'))
+    if not _succeeded(res, f'getting commit {commit_sha} of {repo}'):
+        return None
+    tree_sha = res.json()['tree']['sha']
+
+    res = session.get(
+        github_api_url(f'{repo_path}/git/trees/{tree_sha}'),
+        params=dict(recursive=1),
+    )
+    if not _succeeded(res, f'listing the files in {repo}'):
+        return None
+    data = res.json()
+    if data.get('truncated'):
+        # files that are missing from the listing will just be uploaded
+        # again, with no changes
+        print(f'warning: the listing of {repo} is incomplete')
+    files = {
+        entry['path']: entry['sha']
+        for entry in data['tree']
+        if entry['type'] == 'blob'
+    }
+    return RepoIndex(repo, branch, commit_sha, files)
+
+
+def current_index(repo: str, branch: Optional[str] = None) -> Optional[RepoIndex]:
+    """The saved index of repo, refreshed if the branch has moved on."""
+    head = get_head(repo, branch)
+    if head is None:
+        return None
+    branch, head_sha = head
+    index = load_index(repo)
+    if index is not None and index.branch == branch and index.commit == head_sha:
+        return index
+    index = fetch_index(repo, branch, head_sha)
+    if index is not None:
+        save_index(index)
+    return index
+
+
+def local_solutions(directories: list[str]) -> list[str]:
+    """Every solution file in directories, recursively."""
+    files = []
+    for directory in directories:
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(names):
+                if os.path.splitext(name)[1] in SOLUTION_EXTENSIONS:
+                    files.append(os.path.join(root, name))
+    return files
+
+
+@traced('github.sync')
+def sync_solutions(judge: type[Judge], directories: list[str],
+                   dry_run=False, message=None) -> bool:
+    """
+    Upload the solutions in directories that are new or different from what
+    is in the judge's repo, in one commit. Local files are never deleted.
+    """
+    repo = judge.github_repo
+    index = current_index(repo)
+    if index is None:
+        return False
+
+    changed: dict[str, str] = dict()  # path in repo -> content
+    sources: dict[str, str] = dict()  # path in repo -> local file
+    for file in local_solutions(directories):
+        path = github_filepath(judge, file)
+        if path in sources:
+            print(f'warning: {file} and {sources[path]} both go to {path}; '
+                  f'skipping {file}')
+            continue
+        sources[path] = file
+        with open(file) as f:
+            content = f.read()
+        if index.files.get(path) != git_blob_sha(content):
+            changed[path] = content
+
+    print(f'{len(sources)} local solutions; {len(changed)} new or changed')
+    for path in changed:
+        print(f'  {sources[path]} -> {path}')
+    if not changed or dry_run:
+        return True
+
+    if message is None:
+        message = f'Sync {len(changed)} {judge.name} solutions from Python script'
+    commit_sha = commit_files(repo, changed, message,
+                              branch=index.branch, head_sha=index.commit)
+    if commit_sha is None:
+        print(f'{len(changed)} local files not synced to {repo}')
+        return False
+
+    record_commit(repo, index.commit, commit_sha, changed, branch=index.branch)
+    print(f'successfully pushed {len(changed)} files to GitHub repo {repo} '
+          f'in commit {commit_sha[:7]}')
+    return True
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('sync', help='upload new and changed solutions')
+    p.add_argument('judge', choices=sorted(JUDGES))
+    p.add_argument('directories', nargs='+')
+    p.add_argument('-n', '--dry-run', action='store_true',
+                   help='only list what would be uploaded')
+    p.add_argument('-m', '--message', default=None)
+
+    p = sub.add_parser('upload', help='upload solutions in one commit')
+    p.add_argument('judge', choices=sorted(JUDGES))
+    p.add_argument('files', nargs='+')
+    p.add_argument('--keep', action='store_true', help="don't delete the local files")
+    p.add_argument('-m', '--message', default=None)
+    args = parser.parse_args()
+
+    judge = get_judge(args.judge)
+    if args.command == 'sync':
+        ok = sync_solutions(judge, args.directories, dry_run=args.dry_run,
+                            message=args.message)
+    else:
+        ok = upload_solutions([(judge, file) for file in args.files],
+                              delete_local=not args.keep, message=args.message)
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
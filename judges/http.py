@@ -0,0 +1,281 @@
+"""
+The HTTP client behind both sessions: polite to the judges, and patient
+with them and with GitHub when they push back.
+
+For each host:
+- a token bucket keeps requests under its budget (HOST_BUDGETS). A 429
+  halves the rate, and every success wins a little of it back, so bulk
+  downloads settle just under what the judge tolerates.
+- Retry-After (on 429 and 503) and GitHub's X-RateLimit-Remaining and
+  X-RateLimit-Reset pause every request to the host until then, not just
+  the one that got the answer.
+- failed requests (429, 5xx, dropped connections) are retried with
+  exponential backoff and full jitter, so that threads that fail together
+  don't retry together. POST and PATCH are only retried when the server
+  said it didn't do anything (429 and 503).
+- a circuit breaker stops requests to a host after CIRCUIT_THRESHOLD
+  failures in a row, so that a judge that is down fails fast instead of
+  after every retry of every problem. After CIRCUIT_COOLDOWN seconds one
+  request is let through to test it.
+
+Requests to this machine (local test servers) have no budget, and
+CP_HELPER_HTTP_THROTTLE=0 turns off the budgets for every host; retries
+and the circuit breakers stay.
+"""
+
+
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+import os
+import random
+import threading
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+import requests
+
+from ..tracing import span
+
+
+# requests per second and burst size, by host (and its subdomains)
+HOST_BUDGETS: dict[str, tuple[float, int]] = {
+    'codeforces.com': (2.0, 4),
+    'atcoder.jp': (2.0, 4),
+    'acmicpc.net': (2.0, 4),
+    'cses.fi': (4.0, 8),
+    'dmoj.ca': (2.0, 4),
+    'kattis.com': (2.0, 4),
+    'usaco.org': (2.0, 4),
+    'facebook.com': (1.0, 2),
+    'api.github.com': (10.0, 10),  # the hourly limit is in the headers
+}
+DEFAULT_BUDGET = (4.0, 8)
+THROTTLE = os.getenv('CP_HELPER_HTTP_THROTTLE', '1') != '0'
+LOOPBACK_HOSTS = ['localhost', '127.0.0.1', '::1']
+MIN_RATE_FRACTION = 1 / 16  # of the budget, however often we get a 429
+RECOVERY = 1.05  # the rate is multiplied by this after each success
+
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5  # seconds; doubled after each failure
+BACKOFF_CAP = 16.0  # seconds
+MAX_WAIT = 120.0  # seconds; longer Retry-After or resets aren't waited for
+
+CIRCUIT_THRESHOLD = 5  # failures in a row
+CIRCUIT_COOLDOWN = 30.0  # seconds
+
+RETRY_STATUSES = [500, 502, 503, 504]
+NOT_PROCESSED_STATUSES = [429, 503]
+IDEMPOTENT_METHODS = ['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE']
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of sending a request to a host that keeps failing."""
+
+
+class TokenBucket:
+    """Tokens come in at rate per second, up to burst; a request takes one."""
+
+    def __init__(self, rate: float, burst: int):
+        self.max_rate = rate
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def acquire(self) -> float:
+        """Wait for a token; returns how long that took."""
+        start = time.monotonic()
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return now - start
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """Send nothing for the next seconds, then one request at a time."""
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 1.0)
+            self.updated = max(self.updated, self.paused_until)
+
+    def throttled(self) -> None:
+        with self.lock:
+            self.rate = max(self.rate / 2, self.max_rate * MIN_RATE_FRACTION)
+
+    def succeeded(self) -> None:
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * RECOVERY)
+
+
+class CircuitBreaker:
+    def __init__(self, threshold=CIRCUIT_THRESHOLD, cooldown=CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial = False  # whether the request testing the host is out
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.trial or time.monotonic() - self.opened_at < self.cooldown:
+                return False
+            self.trial = True
+            return True
+
+    def record(self, ok: Optional[bool]) -> None:
+        """The outcome of a request: None if it says nothing about the host."""
+        with self.lock:
+            self.trial = False
+            if ok is None:
+                return
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self.opened_at = time.monotonic()
+
+
+@dataclass
+class Host:
+    bucket: Optional[TokenBucket]  # None if the host has no budget
+    breaker: CircuitBreaker
+
+
+_hosts: dict[str, Host] = dict()
+_hosts_lock = threading.Lock()
+
+
+def budget_for(host: str) -> Optional[tuple[float, int]]:
+    """Requests per second and burst size for host, or None if unlimited."""
+    if not THROTTLE or host in LOOPBACK_HOSTS:
+        return None
+    for domain, budget in HOST_BUDGETS.items():
+        if host == domain or host.endswith(f'.{domain}'):
+            return budget
+    return DEFAULT_BUDGET
+
+
+def get_host(url: str) -> Host:
+    parts = urlsplit(url)
+    with _hosts_lock:
+        if parts.netloc not in _hosts:
+            budget = budget_for(parts.hostname or '')
+            bucket = None if budget is None else TokenBucket(*budget)
+            _hosts[parts.netloc] = Host(bucket, CircuitBreaker())
+        return _hosts[parts.netloc]
+
+
+def retry_after(res: requests.Response) -> Optional[float]:
+    """Seconds to wait before the next request, if the response says."""
+    value = res.headers.get('Retry-After')
+    if value is not None:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            pass
+    # GitHub: no requests left until the reset
+    if res.headers.get('X-RateLimit-Remaining') == '0':
+        try:
+            return max(0.0, float(res.headers['X-RateLimit-Reset']) - time.time())
+        except (KeyError, ValueError):
+            pass
+    return None
+
+
+def backoff(attempt: int) -> float:
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class Session(requests.Session):
+    """A requests session that goes through the host's budget and retries."""
+
+    def request(self, method, url, *args, **kwargs):
+        host = get_host(url)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        attempt = 0
+        res: Optional[requests.Response] = None
+        error: Optional[Exception] = None
+        while True:
+            if not host.breaker.allow():
+                # the last answer is more useful than this, if there is one
+                if res is not None:
+                    return res
+                if error is not None:
+                    raise error
+                raise CircuitOpenError(f'{urlsplit(url).netloc} keeps failing; '
+                                       f'not trying again for a while')
+            if host.bucket is not None:
+                with span('http.wait') as s:
+                    s.set(seconds=host.bucket.acquire())
+            ok: Optional[bool] = None
+            failed: Optional[Exception] = None
+            try:
+                res = super().request(method, url, *args, **kwargs)
+                # being throttled isn't the host failing, so only 5xx count
+                ok = res.status_code < 500
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                ok = False
+                if not idempotent or attempt >= MAX_RETRIES:
+                    raise
+                failed = error = e
+            finally:
+                # even for other errors, or a trial would never end
+                host.breaker.record(ok)
+            if failed is not None:
+                self._sleep(backoff(attempt))
+                attempt += 1
+                continue
+
+            exhausted = res.headers.get('X-RateLimit-Remaining') == '0'
+            rate_limited = res.status_code == 429 or (res.status_code == 403 and exhausted)
+            if host.bucket is not None and res.status_code == 429:
+                host.bucket.throttled()
+            elif host.bucket is not None and res.status_code < 400:
+                host.bucket.succeeded()
+            if rate_limited or res.status_code in NOT_PROCESSED_STATUSES:
+                retry = True
+            else:
+                retry = idempotent and res.status_code in RETRY_STATUSES
+
+            wait = retry_after(res)
+            if wait is not None and (retry or exhausted):
+                if wait > MAX_WAIT:
+                    if retry:
+                        print(f'{urlsplit(url).netloc}: rate limited for the next '
+                              f'{wait:.0f}s; giving up')
+                        return res
+                elif host.bucket is not None:
+                    host.bucket.pause(wait)  # waited out in acquire
+            if not retry or attempt >= MAX_RETRIES:
+                return res
+            if wait is None:
+                self._sleep(backoff(attempt))
+            elif host.bucket is None and wait <= MAX_WAIT:
+                self._sleep(wait)  # no bucket to wait it out in
+            attempt += 1
+
+    @staticmethod
+    def _sleep(seconds: float) -> None:
+        with span('http.backoff', seconds=seconds):
+            time.sleep(seconds)
@@ -12,42 +12,122 @@ DMOJ and Kattis problem IDs are always (?) lowercase
 
 
 import base64
+from dataclasses import dataclass
 from datetime import datetime
-from importlib import resources
+import functools
+import json
 import os
+import threading
+import time
 from typing import Optional
-import requests
+from urllib.parse import urlsplit
 
-from send2trash import send2trash
+from ..tracing import span, trace_session, traced
+from .cache import atomic_write_text, http_cache
+from .parsing import find_value_after, parse_megabytes, parse_seconds
 
-from .. import templates
+# requests, send2trash, dotenv and the templates are slow to load, and most
+# commands only need some of them, so everything below is created on first
+# use. The old module-level names (session, web_page_session,
+# GITHUB_USERNAME, GITHUB_TOKEN, TEMPLATES) still work; see __getattr__.
 
-import dotenv
-dotenv.load_dotenv()
 
-GITHUB_USERNAME: str = os.getenv('GITHUB_USERNAME')
-GITHUB_TOKEN: str = os.getenv('GITHUB_TOKEN')
+@functools.lru_cache(maxsize=None)
+def load_env() -> None:
+    import dotenv
+    dotenv.load_dotenv()
 
-session = requests.Session()
-session.auth = (GITHUB_USERNAME, GITHUB_TOKEN)
 
-web_page_session = requests.Session()
-web_page_session.headers = {
-    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36'
-}
+def github_username() -> str:
+    load_env()
+    return os.getenv('GITHUB_USERNAME')
+
+
+@functools.lru_cache(maxsize=None)
+def get_session():
+    """The requests session for the GitHub API."""
+    from .http import Session
+    load_env()
+    session = Session()
+    session.auth = (os.getenv('GITHUB_USERNAME'), os.getenv('GITHUB_TOKEN'))
+    trace_session(session, 'github')
+    return session
+
+
+@functools.lru_cache(maxsize=None)
+def get_web_page_session():
+    """The requests session for scraping the judges."""
+    from .http import Session
+    web_page_session = Session()
+    web_page_session.headers = {
+        'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/98.0.4758.102 Safari/537.36'
+    }
+    trace_session(web_page_session, 'http')
+    return web_page_session
+
+
+# can be pointed at a local stand-in server for testing
+GITHUB_API_URL: str = os.getenv('GITHUB_API_URL', 'https://api.github.com')
 
 
 def github_api_url(path: str) -> str:
-    return f'https://api.github.com{path}'
+    return f'{GITHUB_API_URL}{path}'
 
 
 def str_to_base64_str(s: str) -> str:
     return base64.b64encode(s.encode()).decode()
 
 
-def scrape_html(url: str) -> Optional[str]:
-    res = web_page_session.get(url)
+# cap on simultaneous requests to any one judge, so that downloading a whole
+# contest at once doesn't look like an attack
+MAX_REQUESTS_PER_HOST = 4
+# total number of problems fetched at the same time by make_contest_files
+MAX_DOWNLOAD_WORKERS = 16
+
+_host_semaphores: dict[str, threading.BoundedSemaphore] = dict()
+_host_semaphores_lock = threading.Lock()
+
+
+def host_semaphore(url: str) -> threading.BoundedSemaphore:
+    host = urlsplit(url).netloc
+    with _host_semaphores_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(
+                MAX_REQUESTS_PER_HOST)
+        return _host_semaphores[host]
+
+
+@traced('scrape')
+def scrape_html(url: str, max_age: Optional[float] = None) -> Optional[str]:
+    """
+    Get a web page, reading through the on-disk cache.
+
+    Pages fetched less than max_age seconds ago (default: the cache TTL) are
+    returned without any request; older ones are revalidated with a
+    conditional GET. Pass max_age=0 for pages that change, like contest
+    problem lists.
+    """
+    with span('scrape.cache', url=url) as s:
+        html = http_cache.fresh(url, max_age=max_age)
+        s.set(hit=html is not None)
+    if html is not None:
+        return html
+    web_page_session = get_web_page_session()
+    with host_semaphore(url):
+        res = web_page_session.get(url, headers=http_cache.validators(url))
+        if res.status_code == 304:
+            html = http_cache.revalidated(url)
+            if html is not None:
+                return html
+            # the cached copy disappeared in the meantime
+            res = web_page_session.get(url)
     if 200 <= res.status_code < 300:
+        http_cache.store(
+            url,
+            res.text,
+            etag=res.headers.get('ETag'),
+            last_modified=res.headers.get('Last-Modified'),
+        )
         return res.text
     print(
         f'request to get input data from {url} failed with code {res.status_code}')
@@ -58,24 +138,127 @@ SOURCE_EXTENSIONS = [
     '.cpp',
     '.c',
     '.py',
-    '.clean_cpp',  # clean C++; no debug.h include
 ]
 
-# TODO: clean_cpp doesn't actually work right now
 
-TEMPLATES = dict()
-for ext in SOURCE_EXTENSIONS:
-    TEMPLATES[ext] = resources.read_text(templates, f'template{ext}')
+@functools.lru_cache(maxsize=None)
+@traced('template.load')
+def get_template(ext: str) -> Optional[str]:
+    if ext not in SOURCE_EXTENSIONS:
+        return None
+    from importlib import resources
+    from .. import templates
+    template = resources.read_text(templates, f'template{ext}')
+    if ext == '.py':
+        # solutions are submitted as one file, so fastio.py is pasted in
+        fastio = resources.read_text(templates, 'fastio.py')
+        lines = fastio.split('"""', 2)[2].strip().splitlines()
+        while lines and (not lines[0] or lines[0].startswith(('import ', 'from '))):
+            lines.pop(0)
+        template = template.replace('FASTIO', '\n'.join(lines))
+    return template
+
+
+def __getattr__(name: str):
+    # the globals that used to be created at import time
+    if name == 'session':
+        return get_session()
+    if name == 'web_page_session':
+        return get_web_page_session()
+    if name in ['GITHUB_USERNAME', 'GITHUB_TOKEN']:
+        load_env()
+        return os.getenv(name)
+    if name == 'TEMPLATES':
+        return {ext: get_template(ext) for ext in SOURCE_EXTENSIONS}
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 # the default template to use is f'template.{DEFAULT_LANGUAGE}'
 DEFAULT_LANGUAGE = 'cpp'
 
 
+def delete_local_solution(file: str) -> None:
+    """
+    Move an uploaded solution to the trash, along with its whole problem
+    directory if it was the last source file in there.
+    """
+    from send2trash import send2trash
+
+    head = os.path.dirname(file)
+    source_files = sum(
+        int(os.path.splitext(s)[1] in SOURCE_EXTENSIONS)
+        for s in os.listdir(head)
+    )
+    if source_files == 1:
+        # no more source files;
+        # shutil.rmtree(head)
+        send2trash(head)
+        print(f'deleted locally: directory {head}')
+    else:
+        assert source_files > 1
+        # delete the file
+        send2trash(file)
+        print(f'deleted locally: file {file}')
+
+
+@dataclass
+class ProblemFiles:
+    """Where the files for a single problem are written."""
+    problem_id: str
+    directory: str
+    filename: str  # includes the extension
+    link: str
+
+    @property
+    def code_file(self) -> str:
+        return os.path.join(self.directory, self.filename)
+
+
+@dataclass
+class Limits:
+    """The limits for each test, as given on the problem page."""
+    time: Optional[float] = None  # seconds
+    memory: Optional[int] = None  # megabytes
+
+
+PROBLEM_INFO_FILE = 'problem.json'  # in the problem's directory
+
+
+@dataclass
+class DownloadResult:
+    problem_id: str
+    num_inputs: int
+    fetch_time: float  # seconds spent downloading and parsing the page
+    finished_at: float  # seconds after the start of the whole download
+
+
+@dataclass
+class Contest:
+    """The problems of a contest, as listed on its page."""
+    prefix: str
+    problem_id_suffixes: list[str]
+    links: Optional[list[str]] = None
+
+
+def print_download_times(results: list[DownloadResult], total: float) -> None:
+    results = sorted(results, key=lambda r: r.problem_id)
+    width = max([len(r.problem_id) for r in results] + [len('problem')])
+    print(f'{"problem":<{width}}  inputs  fetch (s)  done at (s)')
+    for r in results:
+        print(f'{r.problem_id:<{width}}  {r.num_inputs:>6}  '
+              f'{r.fetch_time:>9.3f}  {r.finished_at:>11.3f}')
+    serial = sum(r.fetch_time for r in results)
+    print(f'{len(results)} problems in {total:.3f}s '
+          f'(sum of fetch times: {serial:.3f}s)')
+
+
 class Judge:
     """Default values for a Judge. This class should be extended."""
     name = 'generic judge'
     github_repo = 'cp-solutions'
     github_directory = 'misc'
+    # whether get_contest and get_problem_ids are implemented
+    supports_contests = False
+    supports_problem_list = False
 
     @staticmethod
     # TODO: in Python 3.10, type this as str | None
@@ -94,53 +277,55 @@ class Judge:
         return (directory, filename)
 
     @classmethod
-    def write_template(cls, problem_id, suffix=None, link=None, lang=None) -> None:
+    def problem_files(cls, problem_id, suffix=None, link=None, lang=None) -> 'ProblemFiles':
         if lang is None:
             lang = DEFAULT_LANGUAGE
-        ext = f'.{lang}'
-
         directory, filename = cls.local_directory_and_filename_no_ext(
             problem_id, suffix=suffix)
-        filename += ext
+        filename += f'.{lang}'
         if link is None:
             link = cls.link(problem_id)
+        return ProblemFiles(problem_id, directory, filename, link)
 
-        if not os.path.isdir(directory):
-            os.mkdir(directory)
-
-        code_file = os.path.join(directory, filename)
-
-        # check for overwriting
-        if os.path.isfile(code_file):
-            while True:
-                response = input(
-                    f'File {code_file} already exists. Overwrite? ([y]/n) '
-                ).lower().strip()
-                if response == '':
-                    response = 'y'
-                if response in ['y', 'n']:
-                    break
-            if response == 'n':
-                # don't overwrite; return
-                print(f'File {code_file} not overwritten.')
-                return
-
-        if ext in TEMPLATES:
-            template = TEMPLATES[ext]
-        else:
-            print(
-                f'no template found for language "{lang}"; using empty template')
-            template = ''
+    @staticmethod
+    def confirm_overwrite(code_file: str) -> bool:
+        if not os.path.isfile(code_file):
+            return True
+        while True:
+            response = input(
+                f'File {code_file} already exists. Overwrite? ([y]/n) '
+            ).lower().strip()
+            if response == '':
+                response = 'y'
+            if response in ['y', 'n']:
+                break
+        if response == 'n':
+            # don't overwrite
+            print(f'File {code_file} not overwritten.')
+            return False
+        return True
 
-        # format template
-        now = datetime.now().strftime('%x %X')
-        template = template.replace('DATE', now)
-        template = template.replace('FILENAME', filename)
-        template = template.replace('PROBLEM_LINK', link)
+    @classmethod
+    def write_code_file(cls, files: 'ProblemFiles') -> None:
+        if not os.path.isdir(files.directory):
+            os.mkdir(files.directory)
+
+        ext = os.path.splitext(files.filename)[1]
+        with span('template', problem=files.problem_id):
+            template = get_template(ext)
+            if template is None:
+                print(
+                    f'no template found for language "{ext[1:]}"; using empty template')
+                template = ''
+
+            # format template
+            now = datetime.now().strftime('%x %X')
+            template = template.replace('DATE', now)
+            template = template.replace('FILENAME', files.filename)
+            template = template.replace('PROBLEM_LINK', files.link)
 
         # write to files
-        with open(code_file, 'w') as out:
-            out.write(template)
+        atomic_write_text(files.code_file, template)
 
         # use vscode workspace setup instead
         # build_command = BUILD_COMMAND.replace('FILENAME', filename)
@@ -148,41 +333,99 @@ class Judge:
         # with open(build_file, 'w') as out:
         #     out.write(build_command)
 
-        input_file = os.path.join(directory, 'in1')
+        input_file = os.path.join(files.directory, 'in1')
         # only write input_file if doesn't exist
         if not os.path.isfile(input_file):
             with open(input_file, 'w') as out:
                 pass  # don't write anything; just make the file
 
-        # pull input data from the problem link
+    @classmethod
+    def fetch_problem(cls, link: str,
+                      required=False) -> tuple[tuple[list[str], list[str]], 'Limits']:
+        """
+        Download the problem page and pull the samples and limits out of it.
+        A page that can't be downloaded gives no samples, or raises
+        RuntimeError if required.
+        """
+        import requests
         try:
             html = scrape_html(link)
-            if html is not None:
-                input_data = cls.get_input_data(html)
-            else:
-                input_data = []
         except requests.exceptions.MissingSchema:
-            input_data = []
-        # write input data
+            html = None
+        if html is None:
+            if required:
+                raise RuntimeError(f'could not download {link}')
+            return (([], []), Limits())
+        with span('parse.samples', judge=cls.name, url=link):
+            sample_data = cls.get_sample_data(html)
+        with span('parse.limits', judge=cls.name, url=link):
+            limits = cls.get_limits(html)
+        return (sample_data, limits)
+
+    @classmethod
+    def fetch_sample_data(cls, link: str) -> tuple[list[str], list[str]]:
+        return cls.fetch_problem(link)[0]
+
+    @classmethod
+    def write_problem_info(cls, files: 'ProblemFiles', limits: 'Limits') -> None:
+        """What the runners need to know about the problem, as JSON."""
+        info = dict(
+            judge=cls.name,
+            problem_id=files.problem_id,
+            link=files.link,
+            time_limit=limits.time,
+            memory_limit=limits.memory,
+        )
+        path = os.path.join(files.directory, PROBLEM_INFO_FILE)
+        atomic_write_text(path, json.dumps(info, indent=2) + '\n')
+
+    @classmethod
+    def write_sample_files(cls, files: 'ProblemFiles',
+                           sample_data: tuple[list[str], list[str]], confirm=True) -> None:
+        """Write the samples; confirm=False leaves the confirmation to the caller."""
+        input_data, output_data = sample_data
         for i, data in enumerate(input_data, start=1):
-            in_file = os.path.join(directory, f'in{i}')
-            with open(in_file, 'w') as f:
-                f.write(data)
+            in_file = os.path.join(files.directory, f'in{i}')
+            atomic_write_text(in_file, data)
+        for i, data in enumerate(output_data, start=1):
+            out_file = os.path.join(files.directory, f'out{i}')
+            atomic_write_text(out_file, data)
+        if confirm:
+            cls.confirm_written(files, sample_data)
 
+    @classmethod
+    def confirm_written(cls, files: 'ProblemFiles',
+                        sample_data: tuple[list[str], list[str]]) -> None:
+        input_data, output_data = sample_data
         confirmation = 'template '
         if cls.name is not None:
             confirmation += f'for {cls.name} problem '
-        confirmation += f'written to {code_file}'
+        confirmation += f'written to {files.code_file}'
         confirmation += f'; {len(input_data)} input files downloaded'
+        if output_data:
+            confirmation += f' ({len(output_data)} with expected output)'
         print(confirmation)
 
+    @classmethod
+    @traced('write_template')
+    def write_template(cls, problem_id, suffix=None, link=None, lang=None) -> None:
+        files = cls.problem_files(problem_id, suffix=suffix, link=link, lang=lang)
+        if not cls.confirm_overwrite(files.code_file):
+            return
+        cls.write_code_file(files)
+        # pull sample data from the problem link
+        sample_data, limits = cls.fetch_problem(files.link)
+        cls.write_sample_files(files, sample_data)
+        cls.write_problem_info(files, limits)
+
     @staticmethod
     def get_contest_suffix(index) -> str:
         return chr(ord('A') + index)  # default is A, B, ...
 
     @classmethod
     def make_contest_files(cls, prefix='', num_problems=None,
-                           problem_id_suffixes=None, links=None) -> None:
+                           problem_id_suffixes=None, links=None,
+                           parallel=True) -> list['DownloadResult']:
         if problem_id_suffixes is None:
             assert num_problems is not None and num_problems >= 1
             problem_id_suffixes = [
@@ -194,15 +437,122 @@ class Judge:
             links = [None for _ in problem_id_suffixes]
         else:
             assert len(links) == len(problem_id_suffixes)
+
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        # ask all the overwrite questions up front, since the downloads
+        # happen on other threads, and write the code files right away so
+        # that they can be opened while the samples are on their way
+        to_download: list[ProblemFiles] = []
         for suffix, link in zip(problem_id_suffixes, links):
-            problem_id = f'{prefix}{suffix}'
-            cls.write_template(problem_id, link=link)
+            files = cls.problem_files(f'{prefix}{suffix}', link=link)
+            if cls.confirm_overwrite(files.code_file):
+                cls.write_code_file(files)
+                to_download.append(files)
+
+        start = time.perf_counter()
+
+        def download(files: ProblemFiles) -> tuple[tuple[list[str], list[str]], Limits, float]:
+            fetch_start = time.perf_counter()
+            try:
+                sample_data, limits = cls.fetch_problem(files.link)
+            except Exception as e:
+                print(f'failed to download {files.link}: {e!r}')
+                sample_data, limits = ([], []), Limits()
+            return sample_data, limits, time.perf_counter() - fetch_start
+
+        results: list[DownloadResult] = []
+
+        def finish(files: ProblemFiles, sample_data: tuple[list[str], list[str]],
+                   limits: Limits, fetch_time: float) -> None:
+            cls.write_sample_files(files, sample_data)
+            cls.write_problem_info(files, limits)
+            results.append(DownloadResult(
+                files.problem_id,
+                len(sample_data[0]),
+                fetch_time,
+                time.perf_counter() - start,
+            ))
+
+        if parallel:
+            workers = max(1, min(MAX_DOWNLOAD_WORKERS, len(to_download)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = {
+                    executor.submit(download, files): files
+                    for files in to_download
+                }
+                # write each problem's samples as soon as they arrive; the
+                # first ones matter the most
+                for future in as_completed(futures):
+                    finish(futures[future], *future.result())
+        else:
+            for files in to_download:
+                finish(files, *download(files))
+
+        total = time.perf_counter() - start
+        print_download_times(results, total)
+        return results
+
+    @classmethod
+    def get_contest(cls, contest_id) -> Optional['Contest']:
+        """
+        The problems of a contest, or None if the contest page couldn't be
+        fetched or doesn't list any problems (yet), or if the judge doesn't
+        support contests.
+        """
+        return None
+
+    @classmethod
+    def download_contest(cls, contest_id) -> bool:
+        contest = cls.get_contest(contest_id)
+        if contest is None:
+            return False
+        cls.make_contest_files(
+            contest.prefix,
+            problem_id_suffixes=contest.problem_id_suffixes,
+            links=contest.links,
+        )
+        return True
+
+    @classmethod
+    def get_problem_ids(cls) -> Optional[list[str]]:
+        """
+        The IDs of every problem in the judge's archive, or None if they
+        couldn't be fetched or the judge doesn't list them.
+        """
+        return None
+
+    @classmethod
+    def get_sample_data(cls, html: str) -> tuple[list[str], list[str]]:
+        """
+        The sample inputs and expected outputs on a problem page. There may
+        be fewer outputs than inputs if the page doesn't give all of them.
+        """
+        return ([], [])
+
+    @classmethod
+    def get_limits(cls, html: str) -> 'Limits':
+        """
+        The time and memory limits on a problem page. Most judges print
+        them as "time limit ... 2 seconds"; override this if not.
+        """
+        return Limits(
+            parse_seconds(find_value_after(html, 'time limit')),
+            parse_megabytes(find_value_after(html, 'memory limit')),
+        )
 
     @classmethod
     def get_input_data(cls, html: str) -> list[str]:
-        return []
+        with span('parse.samples', judge=cls.name):
+            return cls.get_sample_data(html)[0]
+
+    @classmethod
+    def github_path(cls, file: str) -> str:
+        """Path of the solution in the repo, relative to github_directory."""
+        return os.path.basename(file)
 
     @classmethod
+    @traced('github.upload')
     def upload_solution(cls, file: str, github_path=None, delete_local=True) -> bool:
         # file - full path of the file to remove
         try:
@@ -214,13 +564,14 @@ class Judge:
 
         head, tail = os.path.split(file)
         if github_path is None:
-            github_path = tail
+            github_path = cls.github_path(file)
 
         assert cls.github_directory != ''
         github_filepath = f'{cls.github_directory}/{github_path}'
 
         url = github_api_url(
-            f'/repos/{GITHUB_USERNAME}/{cls.github_repo}/contents/{github_filepath}')
+            f'/repos/{github_username()}/{cls.github_repo}/contents/{github_filepath}')
+        session = get_session()
 
         # check if file already exists
         # if it does, need to get the sha
@@ -247,24 +598,16 @@ class Judge:
         # print(message)
 
         if 200 <= res.status_code < 300:
+            from .github import record_commit
+            commit = res.json()['commit']
+            if commit['parents']:
+                record_commit(cls.github_repo, commit['parents'][0]['sha'], commit['sha'],
+                              {github_filepath: solution})
             print(
                 f'successfully pushed {tail} to GitHub repo {cls.github_repo}, path {github_filepath}')
             print(f'message: {commit_message}')
             if delete_local:
-                source_files = sum(
-                    int(os.path.splitext(s)[1] in SOURCE_EXTENSIONS)
-                    for s in os.listdir(head)
-                )
-                if source_files == 1:
-                    # no more source files;
-                    # shutil.rmtree(head)
-                    send2trash(head)
-                    print(f'deleted locally: directory {head}')
-                else:
-                    assert source_files > 1
-                    # delete the file
-                    send2trash(file)
-                    print(f'deleted locally: file {file}')
+                delete_local_solution(file)
             return True
 
         print(f'local file {tail} not uploaded')
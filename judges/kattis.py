@@ -1,7 +1,8 @@
-from .judge import Judge, scrape_html
+from typing import Optional
 
-from bs4 import BeautifulSoup
-import requests
+from .judge import Contest, Judge, scrape_html
+
+from .parsing import make_soup
 
 
 def contest_url(contest_id: str) -> str:
@@ -12,6 +13,7 @@ class Kattis(Judge):
     name = 'Kattis'
     github_repo = 'cp-solutions'
     github_directory = 'kattis'
+    supports_contests = True
 
     @staticmethod
     def link(problem_id: str) -> str:
@@ -28,24 +30,25 @@ class Kattis(Judge):
         return chr(ord('A') + index)
 
     @classmethod
-    def get_input_data(cls, html: str) -> list[str]:
-        soup = BeautifulSoup(html, 'html.parser')
+    def get_sample_data(cls, html: str) -> tuple[list[str], list[str]]:
+        soup = make_soup(html)
         tags = soup.select('table.sample')
         input_data: list[str] = []
+        output_data: list[str] = []
         for table in tags:
             assert table['summary'] == 'sample data'
             pre_tags = table.select('tr > td > pre')
             assert len(pre_tags) == 2
-            data = pre_tags[0].text
-            input_data.append(data)
-        return input_data
+            input_data.append(pre_tags[0].text)
+            output_data.append(pre_tags[1].text)
+        return (input_data, output_data)
 
     @classmethod
-    def download_contest(cls, contest_id: str) -> bool:
-        html = scrape_html(contest_url(contest_id))
+    def get_contest(cls, contest_id: str) -> Optional[Contest]:
+        html = scrape_html(contest_url(contest_id), max_age=0)
         if html is None:
-            return False
-        soup = BeautifulSoup(html, 'html.parser')
+            return None
+        soup = make_soup(html)
         rows = soup.select('table#contest_problem_list > tbody > tr')
         letters = []
         link_suffixes = []
@@ -55,14 +58,16 @@ class Kattis(Judge):
             link = anchor['href']
             letters.append(letter)
             link_suffixes.append(link.split('/')[-1])
+        if not letters:
+            return None
         # print(letters, links)
         # print(problems)
         links = [
             f'https://{contest_id}.kattis.com/problems/{suffix}'
             for suffix in link_suffixes
         ]
-        cls.make_contest_files(
-            # prefix=f'{contest_id}_',
-            problem_id_suffixes=letters,
-            links=links,
+        return Contest(
+            '',  # f'{contest_id}_'
+            letters,
+            links,
         )
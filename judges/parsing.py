@@ -0,0 +1,90 @@
+"""
+Parsing problem pages.
+
+The judges only use the BeautifulSoup API (select, find_all, siblings), so
+the tree builder underneath can be swapped for a faster one. lxml is used
+when it is installed, and html.parser otherwise; set CP_HELPER_HTML_PARSER
+to force one (anything BeautifulSoup accepts, e.g. html5lib).
+
+bs4 and lxml take a while to import, so that only happens on the first
+page that is actually parsed.
+
+The time and memory limits are found with regular expressions on the raw
+page instead, since every judge prints them as a label followed by a value.
+"""
+
+
+import os
+import re
+from typing import Optional
+
+from ..tracing import traced
+
+
+# None means: pick one on first use
+HTML_PARSER: Optional[str] = os.getenv('CP_HELPER_HTML_PARSER') or None
+
+
+def _default_parser() -> str:
+    try:
+        import lxml
+        return 'lxml'
+    except ImportError:
+        return 'html.parser'
+
+
+@traced('parse.soup')
+def make_soup(html: str):
+    global HTML_PARSER
+    from bs4 import BeautifulSoup
+
+    if HTML_PARSER is None:
+        HTML_PARSER = _default_parser()
+    # lxml (like browsers) turns \r\n into \n but html.parser doesn't;
+    # normalize first so that every parser gives the same text
+    html = html.replace('\r\n', '\n').replace('\r', '\n')
+    return BeautifulSoup(html, HTML_PARSER)
+
+
+# a label, then anything but a digit (tags, colons, "per test") and then the value
+_VALUE_AFTER = r'[^0-9]{0,80}?([0-9][^<]*)'
+_SECONDS = re.compile(
+    r'([0-9]*\.?[0-9]+)\s*(ms|millisecond|s|sec|second|초)?', re.IGNORECASE)
+_MEGABYTES = re.compile(
+    r'([0-9]*\.?[0-9]+)\s*(k|kb|kib|kilobyte|m|mb|mib|megabyte|g|gb|gib|gigabyte)?',
+    re.IGNORECASE)
+
+
+def find_value_after(html: str, label: str) -> Optional[str]:
+    """
+    The text of the first number that follows label (case-insensitive) in
+    html, e.g. '2 seconds' for 'time limit per test</div>2 seconds'.
+    Working on the raw page means it doesn't need another parse.
+    """
+    m = re.search(label + _VALUE_AFTER, html, re.IGNORECASE | re.DOTALL)
+    return None if m is None else m.group(1).strip()
+
+
+def parse_seconds(text: Optional[str]) -> Optional[float]:
+    """'2 seconds', '1.00 s', '2.0s', '500 ms', '1 초' -> seconds."""
+    m = None if text is None else _SECONDS.match(text)
+    if m is None:
+        return None
+    value = float(m.group(1))
+    if (m.group(2) or '').lower().startswith('m'):
+        value /= 1000
+    return value
+
+
+def parse_megabytes(text: Optional[str]) -> Optional[int]:
+    """'256 megabytes', '1024 MB', '256M', '1 GB' -> megabytes."""
+    m = None if text is None else _MEGABYTES.match(text)
+    if m is None:
+        return None
+    value = float(m.group(1))
+    unit = (m.group(2) or 'm').lower()
+    if unit.startswith('k'):
+        value /= 1024
+    elif unit.startswith('g'):
+        value *= 1024
+    return round(value)
@@ -0,0 +1,196 @@
+"""
+Downloading a contest the moment it starts.
+
+Problems aren't published until the contest starts, and in the first minute
+the judges are overloaded and often answer with 5xx errors. This waits for
+the start time, polls the contest page with jittered exponential backoff
+until it lists the problems, and then starts the parallel download right
+away.
+
+A few seconds before the start, the page is fetched once to get the imports
+and the connection (TLS handshake included) out of the way.
+
+How long it took for the first template to be written is appended to
+<cache dir>/prefetch.jsonl, to see whether changes actually help.
+
+Usage: python3 -m cp_helper.judges.prefetch codeforces 1700 --start 17:35
+"""
+
+
+import argparse
+from dataclasses import asdict, dataclass
+from datetime import date, datetime
+from datetime import time as dtime
+import json
+import os
+import random
+import sys
+import time
+from typing import Iterator, Optional
+
+from . import get_judge
+from .cache import CACHE_DIR
+from .judge import Contest, Judge, get_web_page_session
+
+
+METRICS_FILE = os.path.join(CACHE_DIR, 'prefetch.jsonl')
+WARM_UP = 10.0  # seconds before the start to warm up
+FIRST_DELAY = 0.5  # seconds between the first polls
+MAX_DELAY = 15.0
+GIVE_UP_AFTER = 30 * 60.0  # seconds after the start
+
+
+@dataclass
+class PrefetchMetrics:
+    judge: str
+    contest_id: str
+    start: float  # unix time the contest started
+    attempts: int  # polls of the contest page
+    num_problems: int
+    # seconds after the start
+    problems_at: float  # when the contest page listed the problems
+    first_template_at: Optional[float]
+    last_template_at: Optional[float]
+
+
+def backoff_delays(first: float = FIRST_DELAY, maximum: float = MAX_DELAY) -> Iterator[float]:
+    """
+    Exponential backoff with "equal jitter": the k-th delay is uniform in
+    [d/2, d] where d = min(maximum, first * 2^k), so that everyone who
+    started polling at T-0 spreads out instead of retrying in lockstep.
+    """
+    delay = first
+    while True:
+        yield delay / 2 + random.uniform(0, delay / 2)
+        delay = min(maximum, delay * 2)
+
+
+def sleep_until(t: float) -> None:
+    while True:
+        remaining = t - time.time()
+        if remaining <= 0:
+            return
+        time.sleep(min(remaining, 60.0))
+
+
+def try_get_contest(judge: type[Judge], contest_id, attempt: int) -> Optional[Contest]:
+    try:
+        return judge.get_contest(contest_id)
+    except OSError as e:  # includes requests' connection errors and timeouts
+        print(f'attempt {attempt}: {e!r}')
+        return None
+
+
+def poll_contest(judge: type[Judge], contest_id, deadline: float) -> tuple[Optional[Contest], int]:
+    """Poll until the contest lists its problems or the deadline passes."""
+    delays = backoff_delays()
+    attempts = 0
+    while True:
+        attempts += 1
+        contest = try_get_contest(judge, contest_id, attempts)
+        if contest is not None:
+            return (contest, attempts)
+        delay = next(delays)
+        if time.time() + delay > deadline:
+            return (None, attempts)
+        print(f'attempt {attempts}: no problems yet; retrying in {delay:.1f}s')
+        time.sleep(delay)
+
+
+def record_metrics(metrics: PrefetchMetrics, path: str = METRICS_FILE) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a') as f:
+        f.write(json.dumps(asdict(metrics)) + '\n')
+
+
+def prefetch_contest(judge: type[Judge], contest_id, start: Optional[float] = None,
+                     give_up_after: float = GIVE_UP_AFTER) -> Optional[PrefetchMetrics]:
+    """
+    Download the contest as soon as possible after start (unix time;
+    default now). Returns None if the problems never showed up.
+    """
+    if start is None:
+        start = time.time()
+    if start - time.time() > WARM_UP:
+        print(f'waiting until {datetime.fromtimestamp(start):%H:%M:%S} '
+              f'for {judge.name} contest {contest_id}')
+        sleep_until(start - WARM_UP)
+    # warm up: imports, the session and a connection to the judge; if the
+    # problems are already there, so much the better
+    get_web_page_session()
+    contest = try_get_contest(judge, contest_id, 0)
+    attempts = 1
+    if contest is None:
+        sleep_until(start)
+        contest, attempts = poll_contest(judge, contest_id, start + give_up_after)
+        attempts += 1
+        if contest is None:
+            print(f'gave up on {judge.name} contest {contest_id} '
+                  f'after {attempts} attempts')
+            return None
+    problems_at = time.time() - start
+    print(f'found {len(contest.problem_id_suffixes)} problems '
+          f'{problems_at:.1f}s after the start')
+
+    pipeline_start = time.time() - start
+    results = judge.make_contest_files(
+        contest.prefix,
+        problem_id_suffixes=contest.problem_id_suffixes,
+        links=contest.links,
+        parallel=True,
+    )
+    done_at = [pipeline_start + r.finished_at for r in results]
+    metrics = PrefetchMetrics(
+        judge.name,
+        str(contest_id),
+        start,
+        attempts,
+        len(contest.problem_id_suffixes),
+        problems_at,
+        min(done_at) if done_at else None,
+        max(done_at) if done_at else None,
+    )
+    record_metrics(metrics)
+    if metrics.first_template_at is not None:
+        print(f'time to first template: {metrics.first_template_at:.2f}s '
+              f'(all {len(done_at)}: {metrics.last_template_at:.2f}s)')
+    return metrics
+
+
+def parse_start(s: str) -> float:
+    """A unix timestamp, an ISO date and time, or a time today (HH:MM[:SS])."""
+    try:
+        return float(s)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(s).timestamp()
+    except ValueError:
+        pass
+    try:
+        return datetime.combine(date.today(), dtime.fromisoformat(s)).timestamp()
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'not a time: {s}')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('judge')
+    parser.add_argument('contest_id')
+    parser.add_argument('--start', type=parse_start, default=None,
+                        help='when the contest starts, in local time (default: now)')
+    parser.add_argument('--give-up', type=float, default=GIVE_UP_AFTER / 60,
+                        help='minutes after the start to stop polling')
+    args = parser.parse_args()
+
+    judge = get_judge(args.judge)
+    if not judge.supports_contests:
+        print(f'{judge.name} contests cannot be downloaded')
+        return 1
+    metrics = prefetch_contest(judge, args.contest_id, args.start,
+                               give_up_after=args.give_up * 60)
+    return 0 if metrics is not None else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""
+Compiling solutions, with the same flags as the VS Code commands.
+
+Builds are cached by content: the key is a hash of the source, every local
+header it includes (recursively), the flags and the compiler, so rebuilding
+an unchanged solution just copies the cached executable. Solutions that
+include <bits/stdc++.h> are compiled against a precompiled header built
+once per flag profile, which also contains ../algorithms/debug/debug.h for
+the profiles that define _DEBUG.
+
+Usage: python3 -m cp_helper.runner.build [--profile debug] solution.cpp
+"""
+
+
+import argparse
+import hashlib
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from ..judges.cache import CACHE_DIR, atomic_write
+from ..tracing import span, traced
+
+
+CPP_COMPILER = 'g++'
+C_COMPILER = 'gcc'
+PYTHON = sys.executable
+
+BUILD_CACHE_DIR = os.path.join(CACHE_DIR, 'build')
+PCH_CACHE_DIR = os.path.join(CACHE_DIR, 'pch')
+# number of cached executables to keep
+MAX_CACHED_BUILDS = 200
+
+WARNING_FLAGS = [
+    '-Wall',
+    '-Wextra',
+    '-Wfatal-errors',
+    '-Wpedantic',
+    '-Wshadow',
+    '-Wno-unused-parameter',
+]
+
+# same as the cp.buildAndRun, cp.buildAndDebug and cp.multiTest commands in
+# .vscode-linux/settings.json
+PROFILES = {
+    'run': ['-std=c++17', '-D_DEBUG', '-D_GLIBCXX_DEBUG', *WARNING_FLAGS, '-O2'],
+    'debug': ['-std=c++17', '-D_DEBUG', '-D_GLIBCXX_DEBUG', *WARNING_FLAGS, '-g'],
+    'multi': ['-std=c++17', '-D_DEBUG', '-D_GLIBCXX_DEBUG', '-D_MULTI_TEST',
+              '-pthread', *WARNING_FLAGS, '-O2'],
+    # not a VS Code command: for big inputs, where the debug checks are too slow
+    'release': ['-std=c++17', *WARNING_FLAGS, '-O2'],
+}
+DEFAULT_PROFILE = 'run'
+
+CPP_FLAGS = PROFILES[DEFAULT_PROFILE]
+
+C_FLAGS = [
+    '-std=c11',
+    '-Wall',
+    '-Wextra',
+    '-O2',
+]
+
+INCLUDE_LOCAL = re.compile(r'^\s*#\s*include\s*"([^"]+)"', re.MULTILINE)
+INCLUDE_STDCXX = re.compile(r'^\s*#\s*include\s*<bits/stdc\+\+\.h>', re.MULTILINE)
+HEADER_GUARD = re.compile(r'^\s*#\s*(pragma\s+once|ifndef)\b', re.MULTILINE)
+
+
+def local_includes(source: str) -> list[str]:
+    """
+    Every file included with #include "..." by source, recursively, as
+    absolute paths. Conditional compilation is ignored, so this may include
+    too much, which only makes the cache key more conservative.
+    """
+    seen: set[str] = set()
+    order: list[str] = []
+    stack = [os.path.abspath(source)]
+    while stack:
+        file = stack.pop()
+        try:
+            with open(file) as f:
+                text = f.read()
+        except (FileNotFoundError, UnicodeDecodeError):
+            continue
+        for name in INCLUDE_LOCAL.findall(text):
+            path = os.path.normpath(os.path.join(os.path.dirname(file), name))
+            if path not in seen and os.path.isfile(path):
+                seen.add(path)
+                order.append(path)
+                stack.append(path)
+    return order
+
+
+def run_compiler(command: list[str]) -> subprocess.CompletedProcess:
+    """
+    Run the compiler, passing its diagnostics on through sys.stderr so that
+    they reach whoever is listening (e.g. a daemon client).
+    """
+    if sys.stderr.isatty():
+        command = [*command, '-fdiagnostics-color=always']
+    with span('compile', command=' '.join(command)):
+        res = subprocess.run(command, capture_output=True, text=True)
+    sys.stdout.write(res.stdout)
+    sys.stderr.write(res.stderr)
+    return res
+
+
+def compiler_id(compiler: str) -> str:
+    """Changes whenever the compiler is upgraded."""
+    path = shutil.which(compiler)
+    if path is None:
+        return compiler
+    path = os.path.realpath(path)
+    return f'{path}:{os.stat(path).st_mtime_ns}'
+
+
+def build_key(compiler: str, flags: list[str], files: list[str]) -> str:
+    h = hashlib.sha256()
+    h.update(compiler_id(compiler).encode())
+    h.update('\0'.join(flags).encode())
+    for file in files:
+        h.update(b'\0' + file.encode() + b'\0')
+        with open(file, 'rb') as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+def precompiled_header(compiler: str, flags: list[str], source: str) -> list[str]:
+    """
+    Flags that make compiler use a precompiled header for source, building
+    it first if needed. Only one precompiled header can be used per
+    compilation, so it contains every header in the set: <bits/stdc++.h>,
+    plus debug.h if source includes one, _DEBUG is defined and debug.h has
+    an include guard (it is included again by the source itself).
+    """
+    with open(source) as f:
+        text = f.read()
+    if not INCLUDE_STDCXX.search(text):
+        return []
+
+    header = '#include <bits/stdc++.h>\n'
+    header_files: list[str] = []
+    if '-D_DEBUG' in flags:
+        for path in local_includes(source):
+            if os.path.basename(path) != 'debug.h':
+                continue
+            with open(path) as f:
+                guarded = HEADER_GUARD.search(f.read()) is not None
+            if guarded:
+                # the template includes debug.h after using namespace std
+                header += f'using namespace std;\n#include "{path}"\n'
+                header_files.append(path)
+            break
+
+    h = hashlib.sha256()
+    h.update(header.encode())
+    key = build_key(compiler, flags, header_files) + h.hexdigest()
+    directory = os.path.join(PCH_CACHE_DIR, hashlib.sha256(key.encode()).hexdigest()[:32])
+    header_file = os.path.join(directory, 'pch.h')
+    gch_file = f'{header_file}.gch'
+    if not os.path.isfile(gch_file):
+        os.makedirs(directory, exist_ok=True)
+        atomic_write(header_file, header.encode())
+        print(f'building precompiled header for {" ".join(flags)}')
+        tmp = f'{gch_file}.{os.getpid()}.tmp'
+        res = run_compiler(
+            [compiler, *flags, '-x', 'c++-header', header_file, '-o', tmp])
+        if res.returncode != 0:
+            return []
+        os.replace(tmp, gch_file)
+    return ['-include', header_file]
+
+
+def prune_build_cache() -> None:
+    try:
+        entries = [
+            os.path.join(BUILD_CACHE_DIR, name)
+            for name in os.listdir(BUILD_CACHE_DIR)
+        ]
+    except FileNotFoundError:
+        return
+    if len(entries) <= MAX_CACHED_BUILDS:
+        return
+    entries.sort(key=os.path.getmtime)
+    for path in entries[:len(entries) - MAX_CACHED_BUILDS]:
+        os.remove(path)
+
+
+@traced('build')
+def compile_solution(source: str, output: Optional[str] = None,
+                     flags: Optional[list[str]] = None,
+                     profile=DEFAULT_PROFILE, use_cache=True) -> Optional[str]:
+    """
+    Compile a C or C++ source file; by default into a in the same directory.
+    flags overrides the flags of the profile. Returns the path of the
+    executable, or None if compilation failed (in which case any old
+    executable is removed, so it can't be run by mistake).
+    """
+    ext = os.path.splitext(source)[1]
+    if output is None:
+        output = os.path.join(os.path.dirname(source), 'a')
+    if ext == '.c':
+        compiler = C_COMPILER
+        if flags is None:
+            flags = C_FLAGS
+    else:
+        compiler = CPP_COMPILER
+        if flags is None:
+            flags = PROFILES[profile]
+
+    if os.path.isfile(output):
+        os.remove(output)
+    if not use_cache:
+        res = run_compiler([compiler, source, *flags, '-o', output])
+        return output if res.returncode == 0 else None
+
+    start = time.perf_counter()
+    key = build_key(compiler, flags, [os.path.abspath(source), *local_includes(source)])
+    cached = os.path.join(BUILD_CACHE_DIR, key)
+    if os.path.isfile(cached):
+        os.utime(cached)  # for pruning
+        tmp = f'{output}.{os.getpid()}.tmp'
+        shutil.copy2(cached, tmp)
+        os.replace(tmp, output)
+        print(f'build cache hit ({time.perf_counter() - start:.3f}s)')
+        return output
+
+    pch_flags = precompiled_header(compiler, flags, source) if ext != '.c' else []
+    res = run_compiler([compiler, source, *flags, *pch_flags, '-o', output])
+    if res.returncode != 0:
+        return None
+    os.makedirs(BUILD_CACHE_DIR, exist_ok=True)
+    tmp = f'{cached}.{os.getpid()}.tmp'
+    shutil.copy2(output, tmp)
+    os.replace(tmp, cached)
+    prune_build_cache()
+    print(f'compiled in {time.perf_counter() - start:.3f}s')
+    return output
+
+
+def solution_command(source: str) -> Optional[list[str]]:
+    """
+    The command that runs a solution, compiling it first if needed.
+    Returns None if it didn't compile.
+    """
+    ext = os.path.splitext(source)[1]
+    if ext == '.py':
+        return [PYTHON, source]
+    executable = compile_solution(source)
+    if executable is None:
+        return None
+    return [os.path.abspath(executable)]
+
+
+def find_program(directory: str, name: str) -> Optional[list[str]]:
+    """
+    The command for a helper program like gen or slow in a problem
+    directory: name.cpp, name.c or name.py, or an already built executable
+    called name. Sources are compiled to name. Returns None if there is no
+    such program or it didn't compile.
+    """
+    for ext in ['.cpp', '.c', '.py']:
+        source = os.path.join(directory, name + ext)
+        if not os.path.isfile(source):
+            continue
+        if ext == '.py':
+            return [PYTHON, source]
+        executable = compile_solution(source, output=os.path.join(directory, name))
+        if executable is None:
+            return None
+        return [os.path.abspath(executable)]
+    path = os.path.join(directory, name)
+    if os.path.isfile(path) and os.access(path, os.X_OK):
+        return [os.path.abspath(path)]
+    return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description='Compile a solution into a.')
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('--profile', choices=list(PROFILES), default=DEFAULT_PROFILE)
+    parser.add_argument('-o', '--output', default=None)
+    parser.add_argument('--no-cache', action='store_true',
+                        help='always compile from scratch')
+    args = parser.parse_args()
+
+    executable = compile_solution(
+        args.source,
+        output=args.output,
+        profile=args.profile,
+        use_cache=not args.no_cache,
+    )
+    return 0 if executable is not None else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
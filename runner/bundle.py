@@ -0,0 +1,503 @@
+"""
+Bundling a C++ solution into a single file for submission.
+
+Every local #include "..." is replaced by the file it names, recursively,
+once per file. Debug scaffolding is stripped: _DEBUG is taken to be
+undefined, so #ifdef _DEBUG blocks (e.g. the debug.h include in the
+template) disappear and their #else branches stay, and statements that are
+just a debug(...) call are removed, along with the debug macro if nothing
+uses it any more.
+
+Library files are split into top-level sections (a class, a function, a
+namespace, a global, a directive), and sections that nothing in the
+solution uses, directly or through other sections, are dropped. A section
+is used if a name it defines appears in kept code; operators, template
+specializations and out-of-class member definitions are kept with the
+names they mention, every declarator of a declaration is a name it
+defines (`int a, b;`, and the name after the braces of `typedef struct
+{...} T;`), so are the enumerators of an unscoped enum, and a #define uses
+the names in its body. Anything that can't be
+told apart is kept.
+
+Each file's parse (its sections and includes) is cached by size and
+modification time in <cache dir>/bundle, so rebundling after an edit only
+parses the files that changed.
+
+Usage: python3 -m cp_helper.runner.bundle path/to/solution.cpp [-o submit.cpp] [--check]
+"""
+
+
+import argparse
+from dataclasses import asdict, dataclass, field
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from ..judges.cache import CACHE_DIR, atomic_write_text
+from .build import CPP_COMPILER, INCLUDE_LOCAL, WARNING_FLAGS
+
+
+CACHE_FILE = os.path.join(CACHE_DIR, 'bundle', 'graph.json')
+CACHE_VERSION = 3
+CHECK_FLAGS = ['-std=c++17', *WARNING_FLAGS, '-fsyntax-only']
+
+TOKEN = re.compile(r'''
+    (?P<directive>^[ \t]*\#(?:\\\n|[^\n])*)
+  | //[^\n]*
+  | /\*.*?\*/
+  | "(?:\\.|[^"\\\n])*"
+  | '(?:\\.|[^'\\\n])*'
+  | (?P<name>[A-Za-z_]\w*)
+  | (?P<punct>::|[{}()<>;=,\[])
+''', re.MULTILINE | re.DOTALL | re.VERBOSE)
+NAME = re.compile(r'[A-Za-z_]\w*')
+MACRO = re.compile(r'\s*#\s*define\s+\w+(?:\([^)]*\))?(.*)', re.DOTALL)
+LITERAL_OR_COMMENT = re.compile(r'"(?:\\.|[^"\\\n])*"|//[^\n]*|/\*.*?\*/', re.DOTALL)
+
+CONDITIONAL = re.compile(r'\s*#\s*(if|ifdef|ifndef|elif|else|endif)\b(.*)')
+DEBUG_CONDITION = re.compile(r'\s*(!?)\s*(?:defined\s*\(?\s*_DEBUG\s*\)?|_DEBUG)\s*(?://.*)?')
+PRAGMA_ONCE = re.compile(r'\s*#\s*pragma\s+once\b.*')
+SYSTEM_INCLUDE = re.compile(r'\s*#\s*include\s*<[^>]+>.*')
+DEBUG_STATEMENT = re.compile(r'\s*debug\s*\(.*\)\s*;\s*(//.*)?')
+DEBUG_MACRO = re.compile(r'^[ \t]*#\s*define\s+debug\b.*\n?', re.MULTILINE)
+DEBUG_USE = re.compile(r'\bdebug\s*\(')
+TRAILING = re.compile(r'[ \t]*(//[^\n]*)?\n?')
+
+TYPE_KEYWORDS = ['class', 'struct', 'union', 'enum']
+
+
+@dataclass
+class Section:
+    text: str
+    kind: str  # 'always', 'named' (kept if a name it defines is used) or 'attached'
+    defines: list[str] = field(default_factory=list)
+    uses: list[str] = field(default_factory=list)
+
+
+@dataclass
+class ParsedFile:
+    size: int
+    mtime_ns: int
+    # each piece is either {'include': path} or {'sections': [...]}
+    pieces: list[dict]
+
+
+@dataclass
+class BundleStats:
+    files: int
+    sections: int  # in library files
+    dropped: int
+    size: int  # bytes
+    seconds: float
+
+
+def strip_debug(text: str) -> str:
+    """
+    Drop what is only there with _DEBUG defined, and lines that are just a
+    debug(...) statement. Other conditionals are left alone.
+    """
+    out = []
+    # for each open conditional: whether it is about _DEBUG, whether the
+    # current branch is kept, and whether an earlier branch was taken
+    stack: list[list[bool]] = []
+
+    def active() -> bool:
+        return all(keep for _, keep, _ in stack)
+
+    for line in text.split('\n'):
+        m = CONDITIONAL.match(line)
+        if m is not None:
+            directive, condition = m.groups()
+            if directive in ['if', 'ifdef', 'ifndef']:
+                if directive == 'if':
+                    d = DEBUG_CONDITION.fullmatch(condition)
+                    debug_value = None if d is None else not d.group(1)
+                else:
+                    is_debug = condition.split('//')[0].strip() == '_DEBUG'
+                    debug_value = None if not is_debug else directive == 'ifdef'
+                if debug_value is None:
+                    stack.append([False, True, True])
+                else:
+                    # _DEBUG is undefined: the branch is kept if it
+                    # doesn't need _DEBUG
+                    stack.append([True, not debug_value, not debug_value])
+                    continue
+            elif stack and stack[-1][0]:
+                if directive == 'else':
+                    stack[-1][1] = not stack[-1][2]
+                    stack[-1][2] = True
+                elif directive == 'elif':
+                    # #elif after #ifdef _DEBUG: can't evaluate, so keep
+                    # it as a plain #if if nothing was taken yet
+                    if not stack[-1][2]:
+                        stack[-1] = [False, True, True]
+                        if active():
+                            out.append(line.replace('elif', 'if', 1))
+                        continue
+                    stack[-1][1] = False
+                else:  # endif
+                    stack.pop()
+                continue
+            elif directive == 'endif' and stack:
+                stack.pop()
+        if not active():
+            continue
+        if DEBUG_STATEMENT.fullmatch(line):
+            continue
+        out.append(line)
+    return '\n'.join(out)
+
+
+def _without_template(values: list[str]) -> list[str]:
+    """values without a template <...> in front (whose class isn't a class)."""
+    if values[:1] != ['template']:
+        return values
+    depth = 0
+    for i, tok in enumerate(values):
+        if tok == '<':
+            depth += 1
+        elif tok == '>':
+            depth -= 1
+            if depth == 0:
+                return values[i + 1:]
+    return values
+
+
+def _head_name(head: list[tuple[str, str]]) -> tuple[str, list[str]]:
+    """What the start of a section defines: (kind, names)."""
+    tokens = list(head)
+    # skip template <...>
+    if tokens[:1] == [('name', 'template')]:
+        depth = 0
+        for i, (_, tok) in enumerate(tokens[1:], start=1):
+            if tok == '<':
+                depth += 1
+            elif tok == '>':
+                depth -= 1
+                if depth == 0:
+                    tokens = tokens[i + 1:]
+                    break
+        else:
+            return ('always', [])
+    values = [tok for _, tok in tokens]
+    if not values:
+        return ('always', [])
+    if values[0] == 'namespace':
+        names = [tok for kind, tok in tokens[1:2] if kind == 'name']
+        return ('named', names) if names else ('always', [])
+    if values[:2] == ['using', 'namespace']:
+        return ('always', [])
+    if values[0] == 'using' and '=' in values:
+        return ('named', [values[1]])
+    if values[0] == 'typedef':
+        names = [tok for kind, tok in tokens if kind == 'name']
+        return ('named', names[-1:])
+    for i, tok in enumerate(values):
+        if tok in TYPE_KEYWORDS:
+            rest = [(kind, t) for kind, t in tokens[i + 1:] if t not in TYPE_KEYWORDS]
+            if rest and rest[0][0] == 'name':
+                if len(rest) > 1 and rest[1][1] == '<':
+                    return ('attached', [])  # a specialization
+                return ('named', [rest[0][1]])
+            return ('always', [])
+        if tok in ['(', '=', '[', ';', ',']:
+            if i == 0 or tokens[i - 1][0] != 'name':
+                return ('always', [])
+            name = values[i - 1]
+            if name == 'operator' or (i >= 2 and values[i - 2] in ['operator', '::']):
+                return ('attached', [])
+            return ('named', [name])
+    return ('always', [])
+
+
+def _macro_uses(directive: str) -> set[str]:
+    """The names in the body of a #define (nothing for other directives)."""
+    m = MACRO.match(directive)
+    if m is None:
+        return set()
+    return set(NAME.findall(LITERAL_OR_COMMENT.sub(' ', m.group(1))))
+
+
+def split_sections(text: str) -> list[Section]:
+    """Split C++ code into top-level sections."""
+    sections: list[Section] = []
+    start = 0
+    depth = 0  # of braces
+    parens = 0
+    head: list[tuple[str, str]] = []  # tokens before the first brace
+    names: set[str] = set()
+    braced = False  # whether the section had a block
+    needs_semicolon = False
+    # the enumerators of an unscoped enum, which can be used on their own
+    enumerators: Optional[list[str]] = None
+    expect_enumerator = False
+    # names declared after the first one: after a comma or a closing brace
+    # at the top level (int a, b; struct {...} p, q;)
+    declarators: list[str] = []
+    expect_declarator = False
+    angles = 0  # of template brackets at the top level, whose commas don't count
+
+    def end(position: int, kind: str = '', defines: Optional[list[str]] = None) -> None:
+        nonlocal start, head, names, braced, needs_semicolon, enumerators
+        nonlocal declarators, expect_declarator, angles
+        # the rest of the line goes with the section
+        m = TRAILING.match(text, position)
+        position = m.end()
+        section_text = text[start:position]
+        if not section_text.strip():
+            return  # whitespace goes with the next section
+        if not kind:
+            kind, defines = _head_name(head)
+        defines = defines or []
+        if enumerators and kind != 'attached':
+            kind, defines = 'named', defines + enumerators
+        if kind == 'named':
+            defines = defines + [d for d in declarators if d not in defines]
+        uses = sorted(names - set(defines))
+        sections.append(Section(section_text, kind, defines, uses))
+        start = position
+        head = []
+        names = set()
+        braced = False
+        needs_semicolon = False
+        enumerators = None
+        declarators = []
+        expect_declarator = False
+        angles = 0
+
+    for m in TOKEN.finditer(text):
+        if m.group('directive') is not None:
+            if depth == 0 and not head and not braced:
+                end(m.start())
+                names = _macro_uses(m.group('directive'))
+                end(m.end(), 'always')
+            continue
+        name = m.group('name')
+        punct = m.group('punct')
+        if name is not None:
+            names.add(name)
+            if depth == 0 and expect_declarator:
+                declarators.append(name)
+                expect_declarator = False
+            if depth == 0 and not braced:
+                head.append(('name', name))
+            elif enumerators is not None and expect_enumerator and depth == 1:
+                enumerators.append(name)
+                expect_enumerator = False
+            continue
+        if punct is None:
+            continue  # a comment or a literal
+        if depth == 0 and not braced and punct != '{' and (
+                punct != ',' or (parens == 0 and angles == 0)):
+            head.append(('punct', punct))
+        if punct == ',' and enumerators is not None and depth == 1 and parens == 0:
+            expect_enumerator = True
+        if depth == 0 and parens == 0:
+            if punct == '<':
+                angles += 1
+            elif punct == '>' and angles > 0:
+                angles -= 1
+            elif punct == ',' and angles == 0:
+                expect_declarator = True
+        if punct == '(':
+            parens += 1
+        elif punct == ')':
+            parens -= 1
+        elif punct == '{':
+            if depth == 0 and not braced:
+                values = _without_template([tok for _, tok in head])
+                # classes, enums and initializers end with a semicolon;
+                # functions and namespaces end with the brace
+                if values[:1] == ['namespace']:
+                    needs_semicolon = False
+                else:
+                    needs_semicolon = (any(tok in TYPE_KEYWORDS for tok in values)
+                                       or '=' in values or '(' not in values)
+                if 'enum' in values and values[values.index('enum') + 1:][:1] not in [
+                        ['class'], ['struct']]:
+                    enumerators = []
+                    expect_enumerator = True
+            braced = True
+            depth += 1
+        elif punct == '}':
+            depth -= 1
+            if depth == 0 and not needs_semicolon:
+                end(m.end())
+            elif depth == 0:
+                expect_declarator = True
+        elif punct == ';' and depth == 0 and parens == 0:
+            end(m.end())
+    end(len(text))
+    return sections
+
+
+def _parse_file(path: str) -> ParsedFile:
+    st = os.stat(path)
+    with open(path) as f:
+        text = strip_debug(f.read())
+    pieces: list[dict] = []
+    position = 0
+    for m in INCLUDE_LOCAL.finditer(text):
+        included = os.path.normpath(os.path.join(os.path.dirname(path), m.group(1)))
+        if not os.path.isfile(included):
+            continue  # left for the compiler to complain about
+        pieces.append(dict(sections=[asdict(s) for s in split_sections(text[position:m.start()])]))
+        pieces.append(dict(include=included))
+        # the rest of the include line
+        end = text.find('\n', m.end())
+        position = len(text) if end == -1 else end + 1
+    pieces.append(dict(sections=[asdict(s) for s in split_sections(text[position:])]))
+    return ParsedFile(st.st_size, st.st_mtime_ns, pieces)
+
+
+class GraphCache:
+    """Parsed files, by absolute path; entries are reused while unchanged."""
+
+    def __init__(self, path: str = CACHE_FILE):
+        self.path = path
+        self.files: dict[str, ParsedFile] = dict()
+        self.changed = False
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') == CACHE_VERSION:
+                self.files = {p: ParsedFile(**v) for p, v in data['files'].items()}
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            pass
+
+    def get(self, path: str) -> ParsedFile:
+        st = os.stat(path)
+        parsed = self.files.get(path)
+        if parsed is None or (parsed.size, parsed.mtime_ns) != (st.st_size, st.st_mtime_ns):
+            parsed = _parse_file(path)
+            self.files[path] = parsed
+            self.changed = True
+        return parsed
+
+    def save(self) -> None:
+        if not self.changed:
+            return
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        data = dict(version=CACHE_VERSION,
+                    files={p: asdict(v) for p, v in self.files.items()})
+        atomic_write_text(self.path, json.dumps(data))
+        self.changed = False
+
+
+def bundle(source: str, drop_unused=True,
+           cache: Optional[GraphCache] = None) -> tuple[str, BundleStats]:
+    """The solution as one file, and how it went."""
+    start = time.perf_counter()
+    if cache is None:
+        cache = GraphCache()
+    source = os.path.abspath(source)
+
+    # expand the includes: (section, whether it is from a library) in order
+    sections: list[tuple[Section, bool]] = []
+    included: set[str] = set()
+
+    def expand(path: str, library: bool) -> None:
+        included.add(path)
+        for piece in cache.get(path).pieces:
+            if 'include' in piece:
+                if piece['include'] not in included:
+                    expand(piece['include'], True)
+                continue
+            for s in piece['sections']:
+                sections.append((Section(**s), library))
+
+    expand(source, False)
+    cache.save()
+
+    # drop what was already there: #pragma once, repeated system includes
+    # and repeated using directives
+    seen_lines: set[str] = set()
+    keep = [True] * len(sections)
+    for i, (s, library) in enumerate(sections):
+        line = s.text.strip()
+        if PRAGMA_ONCE.fullmatch(line):
+            keep[i] = False
+        elif s.kind == 'always' and (SYSTEM_INCLUDE.fullmatch(line) or
+                                     line.startswith('using namespace')):
+            keep[i] = line not in seen_lines
+            seen_lines.add(line)
+
+    library_sections = [i for i, (_, library) in enumerate(sections) if library and keep[i]]
+    dropped = 0
+    if drop_unused:
+        used: set[str] = set()
+        kept: set[int] = set()
+        for i, (s, library) in enumerate(sections):
+            if keep[i] and (not library or s.kind == 'always'):
+                kept.add(i)
+                used.update(s.uses)
+                used.update(s.defines)
+        defined = set()
+        changed = True
+        while changed:
+            changed = False
+            for i in library_sections:
+                if i in kept:
+                    continue
+                s = sections[i][0]
+                if (s.kind == 'named' and used.intersection(s.defines)) or \
+                        (s.kind == 'attached' and defined.intersection(s.uses)):
+                    kept.add(i)
+                    used.update(s.uses)
+                    defined.update(s.defines)
+                    changed = True
+            # names defined by kept library sections, for the attached ones
+            defined.update(name for i in kept for name in sections[i][0].defines)
+        for i in library_sections:
+            if i not in kept:
+                keep[i] = False
+                dropped += 1
+
+    text = ''.join(s.text for i, (s, _) in enumerate(sections) if keep[i])
+    if not DEBUG_USE.search(DEBUG_MACRO.sub('', text)):
+        text = DEBUG_MACRO.sub('', text)
+    text = re.sub(r'\n{3,}', '\n\n', text).strip() + '\n'
+    stats = BundleStats(len(included), len(library_sections), dropped,
+                        len(text.encode()), time.perf_counter() - start)
+    return text, stats
+
+
+def check(text: str) -> bool:
+    """Whether the bundle compiles (without _DEBUG)."""
+    res = subprocess.run([CPP_COMPILER, *CHECK_FLAGS, '-x', 'c++', '-'],
+                         input=text, capture_output=True, text=True)
+    sys.stderr.write(res.stderr)
+    return res.returncode == 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('-o', '--output', default=None,
+                        help='where to write the bundle (default: standard output)')
+    parser.add_argument('--keep-unused', action='store_true',
+                        help="don't drop unused library sections")
+    parser.add_argument('--check', action='store_true',
+                        help='make sure the bundle compiles')
+    args = parser.parse_args()
+
+    text, stats = bundle(args.source, drop_unused=not args.keep_unused)
+    if args.output is None:
+        sys.stdout.write(text)
+    else:
+        atomic_write_text(args.output, text)
+    print(f'bundled {stats.files} files; dropped {stats.dropped} of {stats.sections} '
+          f'library sections; {stats.size} bytes ({stats.seconds * 1000:.1f} ms)',
+          file=sys.stderr)
+    if args.check and not check(text):
+        print('the bundle does not compile', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+Deciding whether an output is correct.
+
+By default outputs are compared token by token (tokens are separated by any
+whitespace). Files are read through mmap and compared lazily, so huge
+outputs are never loaded into memory, and the comparison stops at the first
+difference, which is reported with its position. The outputs are the same
+up to the first byte that differs, so tokenizing starts at the line that
+byte is on. Options:
+
+abs_eps, rel_eps - numbers are equal if they differ by at most abs_eps, or
+                   by at most rel_eps times the expected value
+ignore_case      - compare letters case-insensitively
+whitespace       - 'tokens' (any whitespace is the same), 'lines' (the
+                   tokens on each line must match; trailing blank lines and
+                   spaces are ignored) or 'exact' (byte for byte)
+
+Problems with more than one correct answer need a special judge instead,
+given as --checker:
+- a program (checker.cpp, checker.py, or an executable), which is called as
+  `checker input output answer` like a testlib checker: exit code 0 means
+  accepted, and whatever it prints is the reason. A program named checker
+  in the problem directory is used automatically.
+- module:function, a Python function taking the same three paths and
+  returning a bool or a CheckResult
+"""
+
+
+import argparse
+import contextlib
+from dataclasses import dataclass
+import importlib
+from itertools import zip_longest
+import mmap
+import os
+import re
+import subprocess
+import tempfile
+from typing import Callable, Iterator, Optional, Union
+
+from .build import find_program, solution_command
+
+
+CHUNK = 1 << 20  # bytes compared at a time when checking for identical outputs
+CHECKER_TIMEOUT = 30.0  # seconds
+SHOW_TOKEN = 40  # characters of a token shown in messages
+
+TOKEN = re.compile(rb'\S+|\n')
+NUMBER = re.compile(rb'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?')
+WHITESPACE_POLICIES = ['tokens', 'lines', 'exact']
+
+Buffer = Union[bytes, mmap.mmap]
+
+
+@dataclass
+class CheckOptions:
+    abs_eps: float = 0.0
+    rel_eps: float = 0.0
+    ignore_case: bool = False
+    whitespace: str = 'tokens'
+
+
+@dataclass
+class CheckResult:
+    ok: bool
+    message: str = ''  # why not
+    token: Optional[int] = None  # number of the first differing token, from 1
+    line: Optional[int] = None  # the line of the output it is on, from 1
+
+
+class Checker:
+    """Decides whether an output is correct; override check_files."""
+
+    def check_files(self, input_file: str, output_file: str,
+                    expected_file: str) -> CheckResult:
+        raise NotImplementedError
+
+    def check_bytes(self, input_data: bytes, output: bytes,
+                    expected: bytes) -> CheckResult:
+        with tempfile.TemporaryDirectory(prefix='cp_helper_check_') as d:
+            paths = [os.path.join(d, name) for name in ['input', 'output', 'answer']]
+            for path, data in zip(paths, [input_data, output, expected]):
+                with open(path, 'wb') as f:
+                    f.write(data)
+            return self.check_files(*paths)
+
+
+@contextlib.contextmanager
+def mapped(path: str) -> Iterator[Buffer]:
+    """The contents of a file, memory-mapped."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b''  # empty files can't be mapped
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            yield m
+
+
+def _first_difference(a: Buffer, b: Buffer) -> Optional[int]:
+    """The first position where a and b differ, or None if they are equal."""
+    for start in range(0, max(len(a), len(b)), CHUNK):
+        x = a[start:start + CHUNK]
+        y = b[start:start + CHUNK]
+        if x != y:
+            i = 0
+            while i < min(len(x), len(y)) and x[i] == y[i]:
+                i += 1
+            return start + i
+    return None
+
+
+def _count_newlines(buf: Buffer, end: int) -> int:
+    return sum(buf[start:min(start + CHUNK, end)].count(b'\n')
+               for start in range(0, end, CHUNK))
+
+
+def _count_tokens(buf: Buffer, end: int) -> int:
+    """The number of tokens in buf[:end]."""
+    count = 0
+    in_token = False  # whether the previous chunk ended inside a token
+    for start in range(0, end, CHUNK):
+        chunk = buf[start:min(start + CHUNK, end)]
+        count += len(chunk.split())
+        if in_token and not chunk[:1].isspace():
+            count -= 1  # counted in both chunks
+        in_token = not chunk[-1:].isspace()
+    return count
+
+
+def _tokens(buf: Buffer, keep_newlines: bool, start=0,
+            line=1) -> Iterator[tuple[bytes, int]]:
+    """
+    (token, line) pairs from buf[start:], where line is the line that start
+    is on. With keep_newlines, each line break is a b'\\n' token, except
+    the ones at the end.
+    """
+    newlines: list[int] = []  # lines of the line breaks not yielded yet
+    for m in TOKEN.finditer(buf, start):
+        token = m.group()
+        if token == b'\n':
+            if keep_newlines:
+                newlines.append(line)
+            line += 1
+            continue
+        for newline in newlines:
+            yield (b'\n', newline)
+        newlines.clear()
+        yield (token, line)
+
+
+def _show(token: Optional[bytes]) -> str:
+    if token is None:
+        return 'end of output'
+    if token == b'\n':
+        return 'end of line'
+    text = token.decode(errors='replace')
+    if len(text) > SHOW_TOKEN:
+        text = text[:SHOW_TOKEN] + '...'
+    return repr(text)
+
+
+def tokens_equal(found: bytes, expected: bytes, options: CheckOptions) -> bool:
+    if found == expected:
+        return True
+    if options.ignore_case and found.lower() == expected.lower():
+        return True
+    if (options.abs_eps or options.rel_eps) and \
+            NUMBER.fullmatch(found) and NUMBER.fullmatch(expected):
+        x = float(found)
+        y = float(expected)
+        diff = abs(x - y)
+        return diff <= options.abs_eps or diff <= options.rel_eps * abs(y)
+    return False
+
+
+def compare(output: Buffer, expected: Buffer, options: CheckOptions) -> CheckResult:
+    """Compare two outputs, given as bytes or memory-mapped files."""
+    i = _first_difference(output, expected)
+    if i is None:
+        return CheckResult(True)
+    if options.whitespace == 'exact':
+        line = _count_newlines(output, i) + 1
+        return CheckResult(False, f'outputs differ at byte {i + 1} (line {line})',
+                           line=line)
+
+    # everything before the line with the first difference is the same
+    start = output.rfind(b'\n', 0, i) + 1
+    line = _count_newlines(output, start) + 1
+    k = _count_tokens(output, start)
+    keep_newlines = options.whitespace == 'lines'
+    pairs = zip_longest(_tokens(output, keep_newlines, start, line),
+                        _tokens(expected, keep_newlines, start, line))
+    for found, wanted in pairs:
+        found_token, found_line = found if found is not None else (None, None)
+        wanted_token, wanted_line = wanted if wanted is not None else (None, None)
+        if found_token != b'\n' or wanted_token != b'\n':
+            k += 1
+        if found_token is not None and wanted_token is not None and \
+                tokens_equal(found_token, wanted_token, options):
+            continue
+        where = f'token {k}'
+        if found_line is not None:
+            where += f', line {found_line} of the output'
+        if wanted_line is not None:
+            where += f', line {wanted_line} of the answer'
+        return CheckResult(
+            False,
+            f'{where}: expected {_show(wanted_token)}, found {_show(found_token)}',
+            token=k,
+            line=found_line,
+        )
+    return CheckResult(True)
+
+
+class TokenChecker(Checker):
+    def __init__(self, options: Optional[CheckOptions] = None):
+        self.options = options or CheckOptions()
+
+    def check_files(self, input_file: str, output_file: str,
+                    expected_file: str) -> CheckResult:
+        with mapped(output_file) as output, mapped(expected_file) as expected:
+            return compare(output, expected, self.options)
+
+    def check_bytes(self, input_data: bytes, output: bytes,
+                    expected: bytes) -> CheckResult:
+        return compare(output, expected, self.options)
+
+
+class ProgramChecker(Checker):
+    """A special judge program, called as `checker input output answer`."""
+
+    def __init__(self, command: list[str], timeout=CHECKER_TIMEOUT):
+        self.command = command
+        self.timeout = timeout
+
+    def check_files(self, input_file: str, output_file: str,
+                    expected_file: str) -> CheckResult:
+        try:
+            res = subprocess.run(
+                [*self.command, input_file, output_file, expected_file],
+                stdin=subprocess.DEVNULL,
+                capture_output=True,
+                text=True,
+                timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            return CheckResult(False, 'checker: time limit exceeded')
+        message = (res.stdout + res.stderr).strip()
+        if res.returncode != 0 and not message:
+            message = f'checker exit code {res.returncode}'
+        return CheckResult(res.returncode == 0, message)
+
+
+class FunctionChecker(Checker):
+    """A Python function taking the input, output and answer paths."""
+
+    def __init__(self, function: Callable[[str, str, str], Union[bool, CheckResult]]):
+        self.function = function
+
+    def check_files(self, input_file: str, output_file: str,
+                    expected_file: str) -> CheckResult:
+        result = self.function(input_file, output_file, expected_file)
+        if isinstance(result, CheckResult):
+            return result
+        return CheckResult(bool(result), '' if result else 'rejected by checker')
+
+
+def make_checker(spec: Optional[str], directory: str,
+                 options: Optional[CheckOptions] = None) -> Optional[Checker]:
+    """
+    The checker for a problem: spec is a program, module:function, or None
+    for the directory's checker program if it has one and token comparison
+    otherwise. Returns None if the checker didn't compile.
+    """
+    if spec is None:
+        command = find_program(directory, 'checker')
+        if command is not None:
+            return ProgramChecker(command)
+        if any(os.path.isfile(os.path.join(directory, f'checker{ext}'))
+               for ext in ['.cpp', '.c']):
+            return None  # it didn't compile
+        return TokenChecker(options)
+    if ':' in spec and not os.path.exists(spec):
+        module_name, function_name = spec.rsplit(':', 1)
+        return FunctionChecker(getattr(importlib.import_module(module_name), function_name))
+    if os.path.splitext(spec)[1] in ['.cpp', '.c', '.py']:
+        command = solution_command(spec)
+    else:
+        command = [os.path.abspath(spec)]
+    return None if command is None else ProgramChecker(command)
+
+
+def add_checker_arguments(parser: argparse.ArgumentParser) -> None:
+    group = parser.add_argument_group('checking outputs')
+    group.add_argument('--checker', default=None,
+                       help='special judge: a program or module:function')
+    group.add_argument('--abs-eps', type=float, default=0.0,
+                       help='absolute error allowed in numbers')
+    group.add_argument('--rel-eps', type=float, default=0.0,
+                       help='relative error allowed in numbers')
+    group.add_argument('--ignore-case', action='store_true')
+    group.add_argument('--whitespace', choices=WHITESPACE_POLICIES, default='tokens')
+
+
+def checker_from_args(args: argparse.Namespace, directory: str) -> Optional[Checker]:
+    options = CheckOptions(args.abs_eps, args.rel_eps, args.ignore_case, args.whitespace)
+    return make_checker(args.checker, directory, options)
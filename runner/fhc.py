@@ -0,0 +1,197 @@
+"""
+Running a solution on the full-size inputs of a Facebook Hacker Cup round.
+
+The inputs (the validation input, then the real one) come as zip files,
+the real ones encrypted with a password given when the timer starts, and
+they can be hundreds of megabytes. Each archive is decompressed to the
+problem directory as it is read, without holding it in memory (with unzip
+if it is installed, which decrypts much faster than Python's zipfile).
+Inputs that were already extracted aren't extracted again.
+
+The solution then gets the input file itself as its standard input and the
+output file as its standard output: the data never passes through this
+process or a pipe. C++ is compiled without the debug checks (the release
+profile) into a_release, so the debug build in a is left alone.
+
+a_validation_input.txt is answered in a_validation_output.txt, which is
+the file to upload. Sizes, times and throughput are reported for each
+step.
+
+Usage:
+    python3 -m cp_helper.runner.fhc path/to/A.cpp a_validation_input.zip
+    python3 -m cp_helper.runner.fhc path/to/A.cpp a_input.zip --password ...
+    python3 -m cp_helper.runner.fhc path/to/A.cpp a_input.txt
+"""
+
+
+import argparse
+from dataclasses import dataclass
+import os
+import shutil
+import subprocess
+import sys
+import time
+from typing import Optional
+import zipfile
+
+from ..tracing import span
+from .build import PYTHON, compile_solution
+
+
+COPY_BUFFER = 1 << 20  # bytes
+MEGABYTE = 1 << 20
+
+
+@dataclass
+class Transfer:
+    path: str
+    size: int  # bytes
+    seconds: float
+
+    @property
+    def rate(self) -> float:
+        """Megabytes per second."""
+        return self.size / MEGABYTE / max(self.seconds, 1e-9)
+
+    def describe(self, verb: str) -> str:
+        return (f'{verb} {os.path.basename(self.path)}: {format_size(self.size)} '
+                f'in {self.seconds:.2f}s ({self.rate:.0f} MB/s)')
+
+
+def format_size(size: int) -> str:
+    if size < MEGABYTE:
+        return f'{size / 1024:.1f} KB'
+    return f'{size / MEGABYTE:.1f} MB'
+
+
+def output_name(input_file: str) -> str:
+    stem, ext = os.path.splitext(os.path.basename(input_file))
+    if 'input' in stem:
+        return stem.replace('input', 'output') + ext
+    return f'{stem}_output{ext or ".txt"}'
+
+
+def _unzip_member(archive: str, member: str, target: str,
+                  password: Optional[str]) -> bool:
+    """Extract with the unzip program; False if that isn't possible."""
+    if shutil.which('unzip') is None:
+        return False
+    command = ['unzip', '-p', *(['-P', password] if password else []), archive, member]
+    with open(target, 'wb') as out:
+        res = subprocess.run(command, stdout=out, stderr=subprocess.PIPE)
+    if res.returncode != 0:
+        sys.stderr.write(res.stderr.decode(errors='replace'))
+        os.remove(target)
+        return False
+    return True
+
+
+def extract(archive: str, directory: str, password: Optional[str] = None) -> list[Transfer]:
+    """
+    Decompress the files in archive into directory, streaming each one to
+    disk. Returns what was extracted (files already there with the right
+    size are skipped, and not returned).
+    """
+    extracted = []
+    with zipfile.ZipFile(archive) as z:
+        for info in z.infolist():
+            if info.is_dir():
+                continue
+            target = os.path.join(directory, os.path.basename(info.filename))
+            if os.path.isfile(target) and os.path.getsize(target) == info.file_size:
+                print(f'{os.path.basename(target)} is already extracted')
+                continue
+            start = time.perf_counter()
+            tmp = f'{target}.{os.getpid()}.tmp'
+            with span('extract', member=info.filename, bytes=info.file_size):
+                encrypted = bool(info.flag_bits & 0x1)
+                try:
+                    if not (encrypted and _unzip_member(archive, info.filename, tmp, password)):
+                        pwd = password.encode() if password else None
+                        with z.open(info, pwd=pwd) as src, open(tmp, 'wb') as dst:
+                            shutil.copyfileobj(src, dst, COPY_BUFFER)
+                    os.replace(tmp, target)
+                finally:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+            extracted.append(Transfer(target, info.file_size, time.perf_counter() - start))
+            print(extracted[-1].describe('extracted'))
+    return extracted
+
+
+def release_command(source: str) -> Optional[list[str]]:
+    """Like solution_command, but built without the debug checks."""
+    if os.path.splitext(source)[1] == '.py':
+        return [PYTHON, source]
+    output = os.path.join(os.path.dirname(os.path.abspath(source)), 'a_release')
+    executable = compile_solution(source, output=output, profile='release')
+    return None if executable is None else [executable]
+
+
+def run_on_file(command: list[str], input_file: str,
+                output_file: str) -> tuple[int, Transfer, Transfer]:
+    """
+    Run command with input_file as its standard input and output_file as
+    its standard output. Returns the exit code, and the input and the
+    output as transfers.
+    """
+    tmp = f'{output_file}.{os.getpid()}.tmp'
+    start = time.perf_counter()
+    with open(input_file, 'rb') as stdin, open(tmp, 'wb') as stdout:
+        with span('run', input=os.path.basename(input_file)):
+            res = subprocess.run(command, stdin=stdin, stdout=stdout)
+    seconds = time.perf_counter() - start
+    # a crash shouldn't replace a good output from an earlier run
+    if res.returncode == 0:
+        os.replace(tmp, output_file)
+    else:
+        os.rename(tmp, f'{output_file}.failed')
+        output_file = f'{output_file}.failed'
+    return (
+        res.returncode,
+        Transfer(input_file, os.path.getsize(input_file), seconds),
+        Transfer(output_file, os.path.getsize(output_file), seconds),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('inputs', nargs='+', help='zip archives or input files')
+    parser.add_argument('--password', default=None, help='for encrypted archives')
+    args = parser.parse_args()
+
+    directory = os.path.dirname(os.path.abspath(args.source))
+    input_files = []
+    for path in args.inputs:
+        if not zipfile.is_zipfile(path):
+            input_files.append(path)
+            continue
+        try:
+            extract(path, directory, args.password)
+        except RuntimeError as e:  # zipfile's wrong or missing password
+            print(f'{path}: {e}')
+            return 1
+        with zipfile.ZipFile(path) as z:
+            input_files.extend(
+                os.path.join(directory, os.path.basename(name)) for name in z.namelist()
+                if not name.endswith('/') and 'output' not in os.path.basename(name))
+
+    command = release_command(args.source)
+    if command is None:
+        print('compilation failed')
+        return 1
+    status = 0
+    for input_file in input_files:
+        output_file = os.path.join(directory, output_name(input_file))
+        code, read, written = run_on_file(command, input_file, output_file)
+        print(read.describe('read'))
+        print(f'wrote {os.path.basename(written.path)}: {format_size(written.size)}')
+        if code != 0:
+            print(f'exit code {code}; the partial output is in {written.path}')
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,350 @@
+"""
+Running a Python solution many times without starting Python each time.
+
+A fork server is a Python process that starts once per solution: it
+imports what the solution imports at the top level (NumPy and all),
+compiles the solution, and then waits. For each test it forks a child
+that gets the test's files as its standard streams and runs the compiled
+solution as __main__ from scratch. A fork costs about a millisecond;
+starting Python and importing costs tens (see `main` below to measure it
+for your solution).
+
+The child starts from the server's state, so anything the imports did is
+shared: the random module is reseeded in each child, and the server
+recompiles the solution when the file changes. A request can ask for a
+clean exec instead (exec=True), which is exactly a cold start.
+
+The server talks over a Unix socket, and the files are passed as file
+descriptors (SCM_RIGHTS), so no data goes through the server. It exits,
+removing its socket, when the process that started it does.
+
+Only for Linux (or anywhere with fork and socket.send_fds); ForkServer
+raises OSError where it can't start, and run_python falls back to a cold
+start.
+
+Usage: python3 -m cp_helper.runner.forkserver path/to/solution.py [--input in1] [-n 50]
+"""
+
+
+import argparse
+import atexit
+import contextlib
+import json
+import os
+import select
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional, Sequence
+
+from .build import PYTHON
+
+
+START_TIMEOUT = 10.0  # seconds for the server to come up
+RUNS = 50  # per measurement in main
+
+SERVER = r'''
+import ast, atexit, contextlib, gc, json, os, random, select, shutil, signal, socket, sys, traceback
+signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl-C is for the client
+socket_path, source = sys.argv[1:3]
+sys.argv = [source]
+sys.path[0] = os.path.dirname(os.path.abspath(source))
+
+def load():
+    with open(source, 'rb') as f:
+        text = f.read()
+    return os.stat(source).st_mtime_ns, compile(text, source, 'exec')
+
+# the imports at the top of the solution, and nothing else
+try:
+    with open(source, 'rb') as f:
+        tree = ast.parse(f.read(), source)
+    imports = [node for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom))]
+    exec(compile(ast.Module(imports, []), source, 'exec'), {'__name__': '__preload__'})
+except BaseException:
+    pass  # the child will run into it and report it
+try:
+    mtime, code = load()
+except SyntaxError:
+    mtime, code = None, None
+gc.collect()
+gc.freeze()  # so that the children don't copy every page the collector touches
+
+def child(fds, argv, clean):
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    if clean or code is None:
+        os.execv(sys.executable, [sys.executable, source, *argv])
+    sys.argv = [source, *argv]
+    sys.stdin = sys.__stdin__ = open(0, 'r', closefd=False)
+    sys.stdout = sys.__stdout__ = open(1, 'w', closefd=False)
+    sys.stderr = sys.__stderr__ = open(2, 'w', closefd=False)
+    random.seed()
+    status = 0
+    try:
+        exec(code, {'__name__': '__main__', '__file__': source, '__builtins__': __builtins__})
+    except SystemExit as e:
+        if e.code is None:
+            status = 0
+        elif isinstance(e.code, int):
+            status = e.code
+        else:
+            print(e.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    try:
+        # like the end of a normal run: non-daemon threads (the
+        # threading.Thread(target=main).start() idiom) are waited for
+        threading = sys.modules.get('threading')
+        if threading is not None:
+            threading._shutdown()
+        atexit._run_exitfuncs()
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except BaseException:
+        status = status or 1
+    os._exit(status)
+
+server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+server.bind(socket_path)
+server.listen()
+print('ready', flush=True)
+while True:
+    # our stdin is a pipe from the client: EOF means it is gone
+    readable, _, _ = select.select([server, sys.stdin], [], [])
+    if sys.stdin in readable:
+        break
+    conn, _ = server.accept()
+    with conn:
+        message, fds, _, _ = socket.recv_fds(conn, 4096, 3)
+        request = json.loads(message)
+        try:
+            if code is None or os.stat(source).st_mtime_ns != mtime:
+                mtime, code = load()
+        except (OSError, SyntaxError):
+            code = None
+        pid = os.fork()
+        if pid == 0:
+            server.close()
+            conn.close()
+            child(fds, request['argv'], request['exec'])
+        for fd in fds:
+            os.close(fd)
+        # the client may be gone, having killed the solution
+        with contextlib.suppress(OSError):
+            conn.sendall(f'{pid}\n'.encode())
+        _, status = os.waitpid(pid, 0)
+        with contextlib.suppress(OSError):
+            conn.sendall(f'{os.waitstatus_to_exitcode(status)}\n'.encode())
+# the client may not get to it (e.g. a stress worker that was terminated)
+server.close()
+shutil.rmtree(os.path.dirname(socket_path), ignore_errors=True)
+'''
+
+
+class ForkServer:
+    """A warm interpreter for one Python solution."""
+
+    def __init__(self, source: str):
+        self.source = os.path.abspath(source)
+        self.directory = tempfile.mkdtemp(prefix='cp_helper_fork_')
+        self.socket_path = os.path.join(self.directory, 'socket')
+        self.process = subprocess.Popen(
+            [PYTHON, '-c', SERVER, self.socket_path, self.source],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+        )
+        ready, _, _ = select.select([self.process.stdout], [], [], START_TIMEOUT)
+        if not ready or self.process.stdout.readline() != b'ready\n':
+            self.close()
+            raise OSError(f'the fork server for {source} did not start')
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, stdin: int, stdout: int, stderr: int, args: Sequence[str] = (),
+            timeout: Optional[float] = None, clean=False) -> Optional[int]:
+        """
+        Run the solution with the given file descriptors as its standard
+        streams and args as its arguments. Returns the exit code (negative if killed by a signal), or
+        None if it ran out of time and was killed.
+        """
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as conn:
+            conn.connect(self.socket_path)
+            socket.send_fds(conn, [json.dumps(dict(argv=list(args), exec=clean)).encode()],
+                            [stdin, stdout, stderr])
+            # the reply is the child's pid, then its exit code
+            conn.settimeout(timeout)
+            reply = b''
+            timed_out = killed = False
+            try:
+                while reply.count(b'\n') < 2:
+                    try:
+                        chunk = conn.recv(64)
+                    except socket.timeout:
+                        timed_out = True
+                        conn.settimeout(None)
+                        chunk = b''
+                    else:
+                        if not chunk:
+                            raise OSError('the fork server died')
+                    reply += chunk
+                    if timed_out and not killed and b'\n' in reply:
+                        with contextlib.suppress(ProcessLookupError):
+                            os.kill(int(reply.split(b'\n')[0]), signal.SIGKILL)
+                        killed = True
+            except BaseException:
+                # interrupted (e.g. a stress worker that was terminated):
+                # the server waits for the solution, so don't leave it running
+                if not killed and b'\n' in reply:
+                    with contextlib.suppress(ProcessLookupError):
+                        os.kill(int(reply.split(b'\n')[0]), signal.SIGKILL)
+                raise
+            return None if timed_out else int(reply.split(b'\n')[1])
+
+    def close(self) -> None:
+        if self.process.poll() is None:
+            self.process.stdin.close()  # the server exits on EOF
+            try:
+                self.process.wait(timeout=1.0)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def __enter__(self) -> 'ForkServer':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+# by source, for this process only: children made by multiprocessing
+# inherit the dict, but not the right to use their parent's servers
+_servers: dict[str, ForkServer] = dict()
+_servers_pid: Optional[int] = None
+
+
+def close_servers() -> None:
+    """Stop the fork servers this process started."""
+    if _servers_pid != os.getpid():
+        return
+    for server in _servers.values():
+        server.close()
+    _servers.clear()
+
+
+def get_server(source: str) -> Optional[ForkServer]:
+    """The fork server for source, started if needed; None if it can't be."""
+    global _servers, _servers_pid
+    if _servers_pid != os.getpid():
+        _servers, _servers_pid = dict(), os.getpid()
+        atexit.register(close_servers)
+    server = _servers.get(source)
+    if server is not None and server.alive():
+        return server
+    if server is not None:
+        server.close()  # for its directory
+    try:
+        server = ForkServer(source)
+    except OSError:
+        return None
+    _servers[source] = server
+    return server
+
+
+def _memfd(name: str, data: bytes = b'') -> int:
+    """An anonymous in-memory file holding data, to pass as a stream."""
+    fd = os.memfd_create(name)
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+    os.lseek(fd, 0, os.SEEK_SET)
+    return fd
+
+
+def _run_cold(command: list[str], input_data: bytes,
+              timeout: Optional[float]) -> tuple[Optional[int], bytes]:
+    try:
+        res = subprocess.run(command, input=input_data, stdout=subprocess.PIPE,
+                             stderr=subprocess.DEVNULL, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return (None, b'')
+    return (res.returncode, res.stdout)
+
+
+def run_python(source: str, input_data: bytes, timeout: Optional[float] = None,
+               args: Sequence[str] = ()) -> tuple[Optional[int], bytes]:
+    """
+    Run a Python program on input_data through its fork server; returns
+    (exit code or None if it timed out, standard output). Standard error
+    is thrown away. Starts it cold if the fork server can't be used.
+    """
+    server = get_server(os.path.abspath(source))
+    if server is None:
+        return _run_cold([PYTHON, source, *args], input_data, timeout)
+    stdin = _memfd('stdin', input_data)
+    stdout = _memfd('stdout')
+    stderr = os.open(os.devnull, os.O_WRONLY)
+    try:
+        code = server.run(stdin, stdout, stderr, args, timeout)
+        os.lseek(stdout, 0, os.SEEK_SET)
+        with open(stdout, 'rb', closefd=False) as f:
+            output = f.read()
+    except OSError:
+        # the next call starts a new server
+        server.close()
+        return _run_cold([PYTHON, source, *args], input_data, timeout)
+    finally:
+        for fd in [stdin, stdout, stderr]:
+            os.close(fd)
+    return (code, output)
+
+
+def measure(source: str, input_file: str, runs=RUNS) -> tuple[float, float]:
+    """Median seconds per run, started cold and through the fork server."""
+    cold = []
+    for _ in range(runs):
+        with open(input_file, 'rb') as f:
+            start = time.perf_counter()
+            subprocess.run([PYTHON, source], stdin=f, stdout=subprocess.DEVNULL)
+            cold.append(time.perf_counter() - start)
+    warm = []
+    with ForkServer(source) as server, open(os.devnull, 'wb') as null:
+        for _ in range(runs):
+            with open(input_file, 'rb') as f:
+                start = time.perf_counter()
+                server.run(f.fileno(), null.fileno(), sys.stderr.fileno())
+                warm.append(time.perf_counter() - start)
+    return statistics.median(cold), statistics.median(warm)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('--input', default='in1',
+                        help='the sample to run on, in the directory of the solution')
+    parser.add_argument('-n', '--runs', type=int, default=RUNS)
+    args = parser.parse_args()
+
+    input_file = os.path.join(os.path.dirname(os.path.abspath(args.source)), args.input)
+    if not os.path.isfile(input_file):
+        print(f'{input_file} does not exist')
+        return 1
+    cold, warm = measure(args.source, input_file, args.runs)
+    print(f'cold start:  {cold * 1000:8.1f} ms per test')
+    print(f'fork server: {warm * 1000:8.1f} ms per test')
+    print(f'saved:       {(cold - warm) * 1000:8.1f} ms per test ({cold / warm:.1f}x)')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
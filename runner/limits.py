@@ -0,0 +1,201 @@
+"""
+Running a solution under the problem's time and memory limits, and
+measuring what it used.
+
+The limits come from problem.json in the problem directory (written when
+the template is made; see Judge.write_problem_info). They are enforced with
+setrlimit: CPU time (a little over the limit, so that going over shows up
+as TLE rather than a crash), data segment and stack size (the stack may use
+all the memory, as on most judges). CPU time, wall time and peak RSS come
+from the kernel through wait4, so they cover the whole process, not just
+what Python sees.
+
+The solution is started by a small launcher (LAUNCHER) rather than by this
+process: the peak RSS the kernel reports carries over from the process that
+forked the solution, so forking it from here would report at least our own
+size. Forking from the launcher means that peak RSS is never less than the
+launcher's few megabytes instead. The launcher also sets the limits, which
+is not safe to do between fork and exec in a process with threads.
+
+Tests that use more than NEAR_LIMIT of a limit are flagged: the judge's
+machine may well be slower than yours.
+"""
+
+
+from dataclasses import dataclass, field
+import json
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from typing import IO, Optional
+
+from ..judges.judge import PROBLEM_INFO_FILE, Limits
+
+
+NEAR_LIMIT = 0.8  # fraction of a limit that gets a warning
+POLL_INTERVAL = 0.02  # seconds between checks for timeouts and cancellation
+# what C++ and Python print when an allocation fails
+OUT_OF_MEMORY_MESSAGES = ['std::bad_alloc', 'MemoryError']
+
+
+@dataclass
+class RunResult:
+    verdict: str  # OK, RE, TLE, MLE or CANCELLED
+    returncode: int  # negative if killed by a signal
+    wall: float  # seconds
+    cpu: float  # seconds, user + system
+    max_rss: float  # megabytes
+    warnings: list[str] = field(default_factory=list)
+
+
+def load_limits(directory: str) -> Limits:
+    """The limits in directory/problem.json, if it is there."""
+    try:
+        with open(os.path.join(directory, PROBLEM_INFO_FILE)) as f:
+            info = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return Limits()
+    return Limits(info.get('time_limit'), info.get('memory_limit'))
+
+
+def _max_rss_megabytes(ru_maxrss: int) -> float:
+    # kilobytes on Linux, bytes on macOS
+    if sys.platform == 'darwin':
+        return ru_maxrss / (1024 * 1024)
+    return ru_maxrss / 1024
+
+
+# Run as `python -S -c LAUNCHER '[fd, time, memory]' command...`. Writes the
+# solution's pid to fd, then [exit status, wall, cpu, ru_maxrss] when it ends.
+LAUNCHER = '''
+import json, math, os, resource, sys, time
+fd, time_limit, memory_limit = json.loads(sys.argv[1])
+command = sys.argv[2:]
+start = time.perf_counter()
+pid = os.fork()
+if pid == 0:
+    try:
+        os.close(fd)
+        if time_limit is not None:
+            seconds = math.ceil(time_limit) + 1
+            resource.setrlimit(resource.RLIMIT_CPU, (seconds, seconds + 1))
+        if memory_limit is not None:
+            for limit in [resource.RLIMIT_DATA, resource.RLIMIT_STACK]:
+                nbytes = memory_limit * 1024 * 1024
+                _, hard = resource.getrlimit(limit)
+                if hard != resource.RLIM_INFINITY:
+                    nbytes = min(nbytes, hard)
+                resource.setrlimit(limit, (nbytes, hard))
+        os.execvp(command[0], command)
+    except Exception as e:
+        print(f'{command[0]}: {e}', file=sys.stderr)
+    finally:
+        os._exit(127)
+with os.fdopen(fd, 'w') as report:
+    print(pid, file=report, flush=True)
+    _, status, usage = os.wait4(pid, 0)
+    wall = time.perf_counter() - start
+    cpu = usage.ru_utime + usage.ru_stime
+    print(json.dumps([os.waitstatus_to_exitcode(status), wall, cpu, usage.ru_maxrss]),
+          file=report)
+'''
+
+
+def run_limited(command: list[str], stdin: IO, stdout: IO, stderr: IO,
+                limits: Limits, timeout: Optional[float] = None,
+                cancel: Optional[threading.Event] = None) -> RunResult:
+    """
+    Run command with its standard streams connected to the given files,
+    under limits. It is killed after timeout seconds of wall time, or as
+    soon as cancel is set.
+    """
+    start = time.perf_counter()
+    read_fd, write_fd = os.pipe()
+    try:
+        launcher = subprocess.Popen(
+            [sys.executable, '-S', '-c', LAUNCHER,
+             json.dumps([write_fd, limits.time, limits.memory]), *command],
+            stdin=stdin,
+            stdout=stdout,
+            stderr=stderr,
+            pass_fds=[write_fd],
+        )
+    finally:
+        os.close(write_fd)
+    with os.fdopen(read_fd) as report:
+        line = report.readline()
+        if not line:
+            # the launcher died before it started the solution
+            launcher.wait()
+            return RunResult('RE', launcher.returncode, time.perf_counter() - start, 0.0, 0.0)
+        pid = int(line)
+
+        # the launcher's report blocks, so the timeout and cancellation are
+        # watched from another thread
+        done = threading.Event()
+        killed_for: list[str] = []
+
+        def watch() -> None:
+            while not done.wait(POLL_INTERVAL):
+                reason = None
+                if cancel is not None and cancel.is_set():
+                    reason = 'CANCELLED'
+                elif timeout is not None and time.perf_counter() - start > timeout:
+                    reason = 'TLE'
+                if reason is not None:
+                    killed_for.append(reason)
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+                    return
+
+        watcher = threading.Thread(target=watch, daemon=True)
+        watcher.start()
+        try:
+            line = report.readline()
+        finally:
+            done.set()
+            launcher.wait()
+    watcher.join()
+    if not line:
+        # the launcher died without a report, so nothing was measured; don't
+        # leave the solution running
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        verdict = killed_for[0] if killed_for else 'RE'
+        return RunResult(verdict, launcher.returncode, time.perf_counter() - start, 0.0, 0.0)
+    returncode, wall, cpu, max_rss = json.loads(line)
+    max_rss = _max_rss_megabytes(max_rss)
+
+    if killed_for:
+        verdict = killed_for[0]
+    elif limits.time is not None and (
+            cpu > limits.time or returncode in [-signal.SIGXCPU, -signal.SIGKILL]):
+        verdict = 'TLE'
+    elif limits.memory is not None and max_rss > limits.memory:
+        verdict = 'MLE'
+    elif returncode != 0:
+        # a failed allocation usually ends in an abort or a segfault
+        near_memory = limits.memory is not None and max_rss >= NEAR_LIMIT * limits.memory
+        verdict = 'MLE' if near_memory else 'RE'
+    else:
+        verdict = 'OK'
+
+    warnings = []
+    if verdict == 'OK':
+        if limits.time is not None and cpu >= NEAR_LIMIT * limits.time:
+            warnings.append(f'close to the time limit: {cpu:.2f}s of {limits.time:g}s')
+        if limits.memory is not None and max_rss >= NEAR_LIMIT * limits.memory:
+            warnings.append(f'close to the memory limit: {max_rss:.0f} MB of {limits.memory} MB')
+    return RunResult(verdict, returncode, wall, cpu, max_rss, warnings)
+
+
+def out_of_memory(stderr: str) -> bool:
+    """Whether a crash looks like a failed allocation, going by its stderr."""
+    return any(s in stderr for s in OUT_OF_MEMORY_MESSAGES)
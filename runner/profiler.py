@@ -0,0 +1,301 @@
+"""
+Profiling a solution on one of its samples.
+
+Python solutions run under cProfile. C++ and C solutions are compiled
+without the debug flags (-O2 -g, keeping frame pointers) and run under perf
+if it is installed, and built with -pg and run under gprof otherwise.
+
+Two files are written next to the samples, named after the input and the
+time, so that runs can be compared:
+profile_in1_<time>.txt    - the hottest functions by self time
+profile_in1_<time>.folded - collapsed stacks (one `a;b;c value` line per
+                            stack), for flamegraph.pl or speedscope
+
+perf records real stacks. cProfile and gprof only know who called whom, so
+their stacks are rebuilt from the call graph: the self time of a function
+is split among its callers in proportion to the time spent in it on behalf
+of each one, and so on up. Recursion is cut at the first repeated function.
+
+Usage: python3 -m cp_helper.runner.profiler path/to/solution.cpp [--input in2]
+"""
+
+
+import argparse
+from collections import defaultdict
+from dataclasses import dataclass, field
+import os
+import pstats
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Optional
+
+from ..judges.cache import atomic_write_text
+from .build import PYTHON, WARNING_FLAGS, compile_solution
+
+
+DEFAULT_TOP = 20  # functions in the table
+PERF_FREQUENCY = 999  # samples per second
+MAX_DEPTH = 64  # frames in a rebuilt stack
+MIN_SHARE = 1e-4  # smaller parts of a function's time aren't traced further up
+
+PROFILE_FLAGS = ['-std=c++17', *WARNING_FLAGS, '-O2', '-g', '-fno-omit-frame-pointer']
+C_PROFILE_FLAGS = ['-std=c11', '-Wall', '-Wextra', '-O2', '-g', '-fno-omit-frame-pointer']
+TOOLS = ['auto', 'perf', 'gprof']
+
+GPROF_PARENT = re.compile(r'^\s+([\d.]+)\s+([\d.]+)\s+\d+/\d+\s+(.+?) \[\d+\]$')
+GPROF_PRIMARY = re.compile(
+    r'^\[\d+\]\s+[\d.]+\s+([\d.]+)\s+([\d.]+)\s+(?:(\d+)(?:\+\d+)?)?\s*(.+?) \[\d+\]$')
+PERF_FRAME = re.compile(r'^\s+[0-9a-f]+\s+(.+?)(?:\+0x[0-9a-f]+)?\s+\(.*\)$')
+
+
+@dataclass
+class FunctionStats:
+    name: str
+    calls: Optional[int]
+    self_time: float  # seconds
+    total_time: float  # seconds, including what it calls
+    # the time spent in this function (and what it calls) for each caller
+    callers: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Profile:
+    tool: str
+    total_time: float  # seconds
+    functions: dict[str, FunctionStats]  # by name
+    stacks: dict[str, float]  # collapsed stack -> value
+    unit: str  # of the stack values
+
+
+def fold(functions: dict[str, FunctionStats]) -> dict[str, float]:
+    """Collapsed stacks rebuilt from a call graph, in microseconds."""
+    stacks: dict[str, float] = defaultdict(float)
+
+    def walk(chain: list[str], share: float, amount: float) -> None:
+        f = functions.get(chain[-1])
+        callers = dict()
+        if f is not None and len(chain) < MAX_DEPTH:
+            callers = {name: t for name, t in f.callers.items()
+                       if t > 0 and name in functions and name not in chain}
+        total = sum(callers.values())
+        rest = share
+        for name, t in callers.items():
+            part = share * t / total
+            if part >= MIN_SHARE:
+                walk(chain + [name], part, amount)
+                rest -= part
+        if rest > 1e-12:
+            stacks[';'.join(reversed(chain))] += amount * rest
+
+    for f in functions.values():
+        if f.self_time > 0:
+            walk([f.name], 1.0, f.self_time * 1e6)
+    return stacks
+
+
+def _python_name(func: tuple[str, int, str]) -> str:
+    file, line, name = func
+    if file == '~':
+        return name  # a built-in
+    return f'{name} ({os.path.basename(file)}:{line})'
+
+
+def profile_python(source: str, input_file: str) -> Optional[Profile]:
+    with tempfile.TemporaryDirectory(prefix='cp_helper_profile_') as d:
+        stats_file = os.path.join(d, 'stats')
+        with open(input_file, 'rb') as f:
+            res = subprocess.run(
+                [PYTHON, '-m', 'cProfile', '-o', stats_file, source],
+                stdin=f,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+            )
+        sys.stderr.write(res.stderr.decode(errors='replace'))
+        if not os.path.isfile(stats_file):
+            print(f'the solution crashed (exit code {res.returncode})')
+            return None
+        stats = pstats.Stats(stats_file)
+
+    functions: dict[str, FunctionStats] = dict()
+    for func, (_, calls, tt, ct, callers) in stats.stats.items():
+        name = _python_name(func).replace(';', ',')
+        functions[name] = FunctionStats(name, calls, tt, ct, {
+            _python_name(caller).replace(';', ','): v[3] if isinstance(v, tuple) else v
+            for caller, v in callers.items()
+        })
+    return Profile('cProfile', stats.total_tt, functions, fold(functions), 'us')
+
+
+def parse_gprof(call_graph: str) -> dict[str, FunctionStats]:
+    """The functions in the output of `gprof -b -q`."""
+    functions: dict[str, FunctionStats] = dict()
+    for block in re.split(r'^-{20,}$', call_graph, flags=re.MULTILINE):
+        parents: dict[str, float] = dict()
+        for line in block.splitlines():
+            m = GPROF_PRIMARY.match(line)
+            if m is not None:
+                self_time, children, calls, name = m.groups()
+                name = name.replace(';', ',')
+                functions[name] = FunctionStats(
+                    name,
+                    None if calls is None else int(calls),
+                    float(self_time),
+                    float(self_time) + float(children),
+                    parents,
+                )
+                break
+            m = GPROF_PARENT.match(line)
+            if m is not None:
+                self_time, children, parent = m.groups()
+                parents[parent.replace(';', ',')] = float(self_time) + float(children)
+    return functions
+
+
+def profile_gprof(source: str, input_file: str, flags: list[str]) -> Optional[Profile]:
+    with tempfile.TemporaryDirectory(prefix='cp_helper_profile_') as d:
+        executable = compile_solution(source, output=os.path.join(d, 'a'),
+                                      flags=[*flags, '-pg'])
+        if executable is None:
+            return None
+        # gmon.out goes to the working directory
+        with open(input_file, 'rb') as f:
+            res = subprocess.run([executable], stdin=f, stdout=subprocess.DEVNULL, cwd=d)
+        gmon = os.path.join(d, 'gmon.out')
+        if not os.path.isfile(gmon):
+            print(f'the solution crashed (exit code {res.returncode})')
+            return None
+        res = subprocess.run(['gprof', '-b', '-q', executable, gmon],
+                             capture_output=True, text=True)
+    if res.returncode != 0:
+        sys.stderr.write(res.stderr)
+        return None
+    functions = parse_gprof(res.stdout)
+    total = sum(f.self_time for f in functions.values())
+    return Profile('gprof', total, functions, fold(functions), 'us')
+
+
+def parse_perf_script(output: str) -> dict[str, float]:
+    """Collapsed stacks, in samples, from the output of `perf script`."""
+    stacks: dict[str, float] = defaultdict(float)
+    frames: list[str] = []
+    for line in [*output.splitlines(), '']:
+        m = PERF_FRAME.match(line)
+        if m is not None:
+            frames.append(m.group(1).replace(';', ','))
+        elif not line.strip() and frames:
+            # frames are listed innermost first
+            stacks[';'.join(reversed(frames))] += 1
+            frames = []
+    return stacks
+
+
+def functions_from_stacks(stacks: dict[str, float], seconds_per_unit: float) -> dict[str, FunctionStats]:
+    functions: dict[str, FunctionStats] = dict()
+    for stack, value in stacks.items():
+        frames = stack.split(';')
+        for i, name in enumerate(frames):
+            f = functions.setdefault(name, FunctionStats(name, None, 0.0, 0.0))
+            if name not in frames[:i]:  # count recursive functions once
+                f.total_time += value * seconds_per_unit
+        functions[frames[-1]].self_time += value * seconds_per_unit
+    return functions
+
+
+def profile_perf(source: str, input_file: str, flags: list[str]) -> Optional[Profile]:
+    with tempfile.TemporaryDirectory(prefix='cp_helper_profile_') as d:
+        executable = compile_solution(source, output=os.path.join(d, 'a'), flags=flags)
+        if executable is None:
+            return None
+        data = os.path.join(d, 'perf.data')
+        with open(input_file, 'rb') as f:
+            res = subprocess.run(
+                ['perf', 'record', '-F', str(PERF_FREQUENCY), '-g', '-q', '-o', data,
+                 '--', executable],
+                stdin=f,
+                stdout=subprocess.DEVNULL,
+            )
+        if res.returncode != 0:
+            print(f'perf record failed (exit code {res.returncode})')
+            return None
+        res = subprocess.run(['perf', 'script', '-i', data],
+                             capture_output=True, text=True)
+    if res.returncode != 0:
+        sys.stderr.write(res.stderr)
+        return None
+    stacks = parse_perf_script(res.stdout)
+    functions = functions_from_stacks(stacks, 1 / PERF_FREQUENCY)
+    total = sum(stacks.values()) / PERF_FREQUENCY
+    return Profile('perf', total, functions, stacks, 'samples')
+
+
+def profile_solution(source: str, input_file: str, tool='auto') -> Optional[Profile]:
+    ext = os.path.splitext(source)[1]
+    if ext == '.py':
+        return profile_python(source, input_file)
+    flags = C_PROFILE_FLAGS if ext == '.c' else PROFILE_FLAGS
+    if tool == 'perf' or (tool == 'auto' and shutil.which('perf') is not None):
+        return profile_perf(source, input_file, flags)
+    if shutil.which('gprof') is None:
+        print('neither perf nor gprof is installed')
+        return None
+    return profile_gprof(source, input_file, flags)
+
+
+def hot_functions_table(profile: Profile, top=DEFAULT_TOP) -> str:
+    total = profile.total_time or 1.0
+    lines = [f'{"self %":>7} {"self":>9} {"total":>9} {"calls":>10}  function']
+    functions = sorted(profile.functions.values(), key=lambda f: f.self_time, reverse=True)
+    for f in functions[:top]:
+        calls = '' if f.calls is None else str(f.calls)
+        lines.append(f'{100 * f.self_time / total:6.1f}% {f.self_time:8.3f}s '
+                     f'{f.total_time:8.3f}s {calls:>10}  {f.name}')
+    return '\n'.join(lines) + '\n'
+
+
+def write_profile(profile: Profile, source: str, input_file: str, top=DEFAULT_TOP) -> str:
+    """Write the table and the stacks next to the input; returns the table."""
+    directory = os.path.dirname(os.path.abspath(input_file))
+    base = os.path.join(
+        directory,
+        f'profile_{os.path.basename(input_file)}_{time.strftime("%Y%m%d-%H%M%S")}',
+    )
+    table = hot_functions_table(profile, top)
+    header = (f'{os.path.basename(source)} on {os.path.basename(input_file)}, '
+              f'{profile.tool}: {profile.total_time:.3f}s\n\n')
+    atomic_write_text(f'{base}.txt', header + table)
+    stacks = sorted(profile.stacks.items(), key=lambda item: item[1], reverse=True)
+    atomic_write_text(f'{base}.folded', ''.join(
+        f'{stack} {round(value)}\n' for stack, value in stacks if round(value) > 0))
+    print(header + table, end='')
+    print(f'wrote {base}.txt and {base}.folded ({profile.unit})')
+    return table
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('--input', default='in1',
+                        help='the sample to run on, in the directory of the solution')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP,
+                        help='number of functions in the table')
+    parser.add_argument('--tool', choices=TOOLS, default='auto',
+                        help='for C and C++ (default: perf if installed, otherwise gprof)')
+    args = parser.parse_args()
+
+    input_file = os.path.join(os.path.dirname(os.path.abspath(args.source)), args.input)
+    if not os.path.isfile(input_file):
+        print(f'{input_file} does not exist')
+        return 1
+    profile = profile_solution(args.source, input_file, args.tool)
+    if profile is None:
+        return 1
+    write_profile(profile, args.source, input_file, args.top)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
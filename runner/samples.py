@@ -0,0 +1,190 @@
+"""
+Run a solution on all the samples in its directory (in1, in2, ...) at the
+same time and compare with the expected outputs (out1, out2, ...).
+
+Outputs go to temporary files and are compared by a checker (see
+runner/checker.py), so they can be as big as the disk allows. The time and
+memory limits in problem.json are enforced (see runner/limits.py), and
+samples that come close to them are flagged.
+
+Usage: python3 -m cp_helper.runner.samples path/to/solution.cpp
+"""
+
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+import os
+import re
+import sys
+import tempfile
+import threading
+from typing import Optional
+
+from ..judges.judge import Limits
+from ..tracing import span
+from .build import solution_command
+from .checker import Checker, TokenChecker, add_checker_arguments, checker_from_args
+from .limits import load_limits, out_of_memory, run_limited
+
+
+DEFAULT_TIMEOUT = 10.0  # seconds
+PREVIEW_BYTES = 4096  # of outputs, when showing them
+
+
+@dataclass
+class Sample:
+    name: str  # in1, in2, ...
+    input_file: str
+    output_file: Optional[str]  # None if the expected output is unknown
+
+
+@dataclass
+class SampleResult:
+    sample: Sample
+    verdict: str  # OK, WA, RE, TLE, MLE, CANCELLED, or ?? if there is no expected output
+    time: float  # wall time
+    output: str  # the start of it
+    stderr: str
+    message: str = ''  # from the checker
+    cpu: float = 0.0  # seconds
+    max_rss: float = 0.0  # megabytes
+    warnings: list[str] = field(default_factory=list)
+
+
+def find_samples(directory: str) -> list[Sample]:
+    samples: list[Sample] = []
+    for name in os.listdir(directory):
+        m = re.fullmatch(r'in(\d+)', name)
+        if m is None:
+            continue
+        output_file = os.path.join(directory, f'out{m.group(1)}')
+        if not os.path.isfile(output_file):
+            output_file = None
+        samples.append(Sample(name, os.path.join(directory, name), output_file))
+    samples.sort(key=lambda sample: int(sample.name[2:]))
+    return samples
+
+
+def preview(f) -> str:
+    """The start of an output file, for showing."""
+    data = f.read(PREVIEW_BYTES + 1)
+    text = data[:PREVIEW_BYTES].decode(errors='replace')
+    if len(data) > PREVIEW_BYTES:
+        text += f'\n... (cut off after {PREVIEW_BYTES} bytes)\n'
+    return text
+
+
+def run_sample(command: list[str], sample: Sample, timeout=DEFAULT_TIMEOUT,
+               checker: Optional[Checker] = None, limits: Optional[Limits] = None,
+               cancel: Optional[threading.Event] = None) -> SampleResult:
+    if checker is None:
+        checker = TokenChecker()
+    if limits is None:
+        limits = Limits()
+    with open(sample.input_file, 'rb') as f, \
+            tempfile.NamedTemporaryFile(prefix=f'{sample.name}.') as out, \
+            tempfile.TemporaryFile() as err:
+        with span('run', sample=sample.name) as s:
+            run = run_limited(command, f, out, err, limits, timeout=timeout, cancel=cancel)
+            s.set(verdict=run.verdict)
+        err.seek(0)
+        stderr = preview(err)
+
+        verdict = run.verdict
+        if verdict == 'RE' and limits.memory is not None and out_of_memory(stderr):
+            verdict = 'MLE'
+        message = ''
+        if verdict == 'OK':
+            if sample.output_file is None:
+                verdict = '??'
+            else:
+                result = checker.check_files(sample.input_file, out.name, sample.output_file)
+                verdict = 'OK' if result.ok else 'WA'
+                message = result.message
+        out.seek(0)
+        return SampleResult(sample, verdict, run.wall, preview(out), stderr, message,
+                            run.cpu, run.max_rss, run.warnings)
+
+
+def run_samples(source: str, timeout=DEFAULT_TIMEOUT,
+                checker: Optional[Checker] = None, limits: Optional[Limits] = None,
+                cancel: Optional[threading.Event] = None) -> Optional[list[SampleResult]]:
+    """
+    Compile source once, then run every sample in parallel, under limits
+    (default: the ones in problem.json). Setting cancel kills every run.
+    """
+    command = solution_command(source)
+    if command is None:
+        print('compilation failed')
+        return None
+    directory = os.path.dirname(os.path.abspath(source))
+    if limits is None:
+        limits = load_limits(directory)
+    samples = find_samples(directory)
+    workers = max(1, min(os.cpu_count() or 1, len(samples)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(
+            lambda sample: run_sample(command, sample, timeout=timeout, checker=checker,
+                                      limits=limits, cancel=cancel),
+            samples,
+        ))
+
+
+def print_results(results: list[SampleResult]) -> None:
+    for r in results:
+        print(f'===== {r.sample.name}: {r.verdict} ({r.time:.3f}s, '
+              f'cpu {r.cpu:.3f}s, {r.max_rss:.1f} MB)')
+        for warning in r.warnings:
+            print(f'warning: {warning}')
+        if r.stderr:
+            print(r.stderr, end='' if r.stderr.endswith('\n') else '\n')
+        if r.verdict == 'OK':
+            continue
+        print('output:')
+        print(r.output, end='' if r.output.endswith('\n') else '\n')
+        if r.verdict == 'WA':
+            with open(r.sample.output_file, 'rb') as f:
+                expected = preview(f)
+            print('expected:')
+            print(expected, end='' if expected.endswith('\n') else '\n')
+            if r.message:
+                print(r.message)
+    passed = sum(r.verdict == 'OK' for r in results)
+    checked = sum(r.verdict != '??' for r in results)
+    print(f'passed {passed}/{checked} samples with expected output '
+          f'({len(results)} samples total)')
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds before a sample is killed')
+    parser.add_argument('--time-limit', type=float, default=None,
+                        help='seconds of CPU time (default: from problem.json)')
+    parser.add_argument('--memory-limit', type=int, default=None,
+                        help='megabytes (default: from problem.json)')
+    add_checker_arguments(parser)
+    args = parser.parse_args()
+
+    directory = os.path.dirname(os.path.abspath(args.source))
+    checker = checker_from_args(args, directory)
+    if checker is None:
+        print('checker did not compile')
+        return 1
+    limits = load_limits(directory)
+    if args.time_limit is not None:
+        limits.time = args.time_limit
+    if args.memory_limit is not None:
+        limits.memory = args.memory_limit
+    results = run_samples(args.source, timeout=args.timeout, checker=checker,
+                          limits=limits)
+    if results is None:
+        return 1
+    print_results(results)
+    return 0 if all(r.verdict in ['OK', '??'] for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""
+Shrinking the failing tests found by stress testing.
+
+Each failK in the problem directory (or the tests given) is reduced by
+delta debugging: first whole lines, then single tokens, again until
+neither helps. A smaller input is kept only if it still fails the same way
+(wrong answer, or the same crash or timeout) and slow still accepts it.
+The result is saved as failK.min, with the two outputs in failK.min.a and
+failK.min.slow.
+
+The candidates of each step are run in parallel, as many at a time as
+there are cores, and the smallest one that still fails wins. Inputs that
+were already tried aren't run again.
+
+Most inputs start with their size, and dropping lines without updating it
+gives invalid tests. A hint says what the first line counts, so that it is
+rewritten for every candidate and never shrunk itself:
+--hint lines     n, then n lines (e.g. queries)
+--hint tokens    n, then n numbers (e.g. an array)
+--hint lines:2   the 2nd number of the first line counts the lines after
+                 it (e.g. `n m` and then m edges)
+
+Usage: python3 -m cp_helper.runner.shrink path/to/solution.cpp [fail1 ...]
+"""
+
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import os
+import re
+import sys
+import time
+from typing import Callable, Optional
+
+from .build import find_program, solution_command
+from .checker import Checker, add_checker_arguments, checker_from_args
+from .stress import DEFAULT_TIMEOUT, Failure, check_input
+
+
+FAILURE_NAME = re.compile(r'fail\d+')
+HINT = re.compile(r'(lines|tokens)(?::(\d+))?')
+
+
+@dataclass
+class Hint:
+    """The first line holds the number of lines or tokens after it."""
+    counts: str  # 'lines' or 'tokens'
+    position: int = 0  # of the count among the tokens of the first line
+
+
+def parse_hint(spec: str) -> Hint:
+    m = HINT.fullmatch(spec)
+    if m is None or m.group(2) == '0':
+        raise argparse.ArgumentTypeError(f'invalid hint: {spec}')
+    return Hint(m.group(1), int(m.group(2) or 1) - 1)
+
+
+@dataclass
+class Budget:
+    seconds: Optional[float] = None  # wall time
+    evaluations: Optional[int] = None  # runs of slow and the solution
+
+    def __post_init__(self):
+        self.start = time.perf_counter()
+        self.used = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def remaining(self) -> Optional[int]:
+        """Evaluations left, or None if there is no limit on them."""
+        if self.evaluations is None:
+            return None
+        return max(self.evaluations - self.used, 0)
+
+    def exhausted(self) -> bool:
+        return self.remaining() == 0 or (
+            self.seconds is not None and self.elapsed >= self.seconds)
+
+
+def failure_kind(reason: str) -> str:
+    # 'wrong answer (expected 3, found 4 ...)' is the same failure for
+    # any message
+    return reason.split(' (', 1)[0]
+
+
+def split_lines(data: bytes) -> list[bytes]:
+    lines = data.split(b'\n')
+    while lines and not lines[-1].strip():
+        lines.pop()
+    return [line.rstrip(b'\r') for line in lines]
+
+
+def count_lines(data: bytes) -> int:
+    return len(split_lines(data))
+
+
+def join_lines(lines: list[bytes]) -> bytes:
+    return b''.join(line + b'\n' for line in lines)
+
+
+def lines_from_tokens(lines: list[bytes], kept: list[tuple[int, int]]) -> list[bytes]:
+    """The lines with only the tokens kept, as (line, token) indices."""
+    tokens_kept: dict[int, list[int]] = dict()
+    for i, j in kept:
+        tokens_kept.setdefault(i, []).append(j)
+    result = []
+    for i, line in enumerate(lines):
+        tokens = line.split()
+        if not tokens:
+            result.append(line)  # blank lines go in the line pass
+        elif len(tokens_kept.get(i, [])) == len(tokens):
+            result.append(line)
+        elif i in tokens_kept:
+            result.append(b' '.join(tokens[j] for j in tokens_kept[i]))
+    return result
+
+
+class Shrinker:
+    """Delta debugging of one failing input."""
+
+    def __init__(self, solution: list[str], slow: list[str], checker: Checker,
+                 failure: Failure, hint: Optional[Hint] = None,
+                 timeout=DEFAULT_TIMEOUT, jobs: Optional[int] = None,
+                 budget: Optional[Budget] = None):
+        self.solution = solution
+        self.slow = slow
+        self.checker = checker
+        self.kind = failure_kind(failure.reason)
+        self.hint = hint
+        self.timeout = timeout
+        self.jobs = jobs or os.cpu_count() or 1
+        self.budget = budget or Budget()
+        self.best = failure
+        self._tried: dict[bytes, Optional[Failure]] = dict()
+
+        lines = split_lines(failure.input_data)
+        self.header: Optional[list[bytes]] = None
+        if hint is not None and lines and hint.position < len(lines[0].split()):
+            self.header = lines[0].split()
+            lines = lines[1:]
+        self.lines = lines
+
+    def render(self, lines: list[bytes]) -> bytes:
+        if self.header is None:
+            return join_lines(lines)
+        if self.hint.counts == 'lines':
+            count = len(lines)
+        else:
+            count = sum(len(line.split()) for line in lines)
+        header = list(self.header)
+        header[self.hint.position] = str(count).encode()
+        return join_lines([b' '.join(header), *lines])
+
+    def _evaluate(self, data: bytes) -> Optional[Failure]:
+        failure = check_input(self.solution, self.slow, data, self.timeout, self.checker)
+        if failure is not None and failure_kind(failure.reason) == self.kind:
+            return failure
+        return None
+
+    def smallest_failing(self, candidates: list[bytes]) -> Optional[Failure]:
+        """
+        The smallest of the first batch of candidates with one that still
+        fails, or None if none of them do (or the budget ran out).
+        """
+        with ThreadPoolExecutor(self.jobs) as executor:
+            for i in range(0, len(candidates), self.jobs):
+                if self.budget.exhausted():
+                    return None
+                batch = [c for c in candidates[i:i + self.jobs] if c not in self._tried]
+                remaining = self.budget.remaining()
+                if remaining is not None:
+                    batch = batch[:remaining]
+                for data, failure in zip(batch, executor.map(self._evaluate, batch)):
+                    self._tried[data] = failure
+                self.budget.used += len(batch)
+                found = [self._tried[c] for c in candidates[i:i + self.jobs]
+                         if self._tried.get(c) is not None]
+                if found:
+                    return min(found, key=lambda f: len(f.input_data))
+        return None
+
+    def ddmin(self, units: list, render: Callable[[list], bytes]) -> list:
+        """A smallest subsequence of units that still fails."""
+        n = 2
+        while len(units) >= 2 and not self.budget.exhausted():
+            size = -(-len(units) // n)
+            chunks = [units[i:i + size] for i in range(0, len(units), size)]
+            subsets = [chunk for chunk in chunks if len(chunks) > 2]
+            complements = [units[:i * size] + units[(i + 1) * size:]
+                           for i in range(len(chunks))]
+            candidates = subsets + complements
+            rendered = [render(c) for c in candidates]
+            failure = self.smallest_failing(rendered)
+            if failure is None:
+                if n >= len(units):
+                    break
+                n = min(2 * n, len(units))
+                continue
+            smaller = candidates[rendered.index(failure.input_data)]
+            n = 2 if len(smaller) <= size else max(n - 1, 2)
+            units = smaller
+            self.best = failure
+            self.report()
+        return units
+
+    def report(self) -> None:
+        data = self.best.input_data
+        print(f'{len(data)} bytes, {count_lines(data)} lines '
+              f'({self.budget.used} runs, {self.budget.elapsed:.1f}s)')
+
+    def shrink(self) -> Failure:
+        while not self.budget.exhausted():
+            before = len(self.best.input_data)
+            self.lines = self.ddmin(self.lines, self.render)
+            positions = [(i, j) for i, line in enumerate(self.lines)
+                         for j in range(len(line.split()))]
+            kept = self.ddmin(positions, lambda kept: self.render(
+                lines_from_tokens(self.lines, kept)))
+            self.lines = lines_from_tokens(self.lines, kept)
+            if len(self.best.input_data) >= before:
+                break
+        return self.best
+
+
+def find_failures(directory: str) -> list[str]:
+    """The failing tests saved by stress testing, in order."""
+    names = [name for name in os.listdir(directory) if FAILURE_NAME.fullmatch(name)]
+    names.sort(key=lambda name: int(name[len('fail'):]))
+    return [os.path.join(directory, name) for name in names]
+
+
+def save_minimized(path: str, failure: Failure) -> str:
+    path = f'{path}.min'
+    for name, data in [(path, failure.input_data), (f'{path}.a', failure.output),
+                       (f'{path}.slow', failure.expected)]:
+        with open(name, 'wb') as f:
+            f.write(data)
+    return path
+
+
+def shrink_test(path: str, solution: list[str], slow: list[str], checker: Checker,
+                hint: Optional[Hint] = None, timeout=DEFAULT_TIMEOUT,
+                jobs: Optional[int] = None,
+                budget: Optional[Budget] = None) -> Optional[Failure]:
+    """Shrink the failing test in path; returns the smallest failure found."""
+    with open(path, 'rb') as f:
+        input_data = f.read()
+    failure = check_input(solution, slow, input_data, timeout, checker)
+    if failure is None:
+        print(f'{path} does not fail any more')
+        return None
+    print(f'{path}: {failure.reason}; {len(input_data)} bytes, '
+          f'{count_lines(input_data)} lines')
+    shrinker = Shrinker(solution, slow, checker, failure, hint, timeout, jobs, budget)
+    failure = shrinker.shrink()
+    if shrinker.budget.exhausted():
+        print('out of budget; keeping the smallest test so far')
+    saved = save_minimized(path, failure)
+    print(f'saved to {saved}: {len(failure.input_data)} bytes '
+          f'({shrinker.budget.used} runs in {shrinker.budget.elapsed:.1f}s)')
+    return failure
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('tests', nargs='*',
+                        help='failing tests (default: every failK in the directory)')
+    parser.add_argument('--hint', type=parse_hint, default=None,
+                        help='what the first line counts: lines or tokens[:position]')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of candidates run at once (default: all cores)')
+    parser.add_argument('-t', '--time-limit', type=float, default=None,
+                        help='stop shrinking each test after this many seconds')
+    parser.add_argument('-n', '--max-runs', type=int, default=None,
+                        help='stop shrinking each test after this many candidates')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds each program gets on each candidate')
+    add_checker_arguments(parser)
+    args = parser.parse_args()
+
+    directory = os.path.dirname(os.path.abspath(args.source))
+    tests = args.tests or find_failures(directory)
+    if not tests:
+        print(f'no failing tests in {directory}')
+        return 1
+    solution = solution_command(args.source)
+    slow = find_program(directory, 'slow')
+    for name, command in [('solution', solution), ('slow', slow)]:
+        if command is None:
+            print(f'error: {name} not found or did not compile')
+            return 1
+    checker = checker_from_args(args, directory)
+    if checker is None:
+        print('checker did not compile')
+        return 1
+
+    for path in tests:
+        shrink_test(path, solution, slow, checker, args.hint, args.timeout,
+                    args.processes, Budget(args.time_limit, args.max_runs))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
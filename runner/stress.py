@@ -0,0 +1,286 @@
+"""
+Stress testing: generate random tests and compare a solution with a slow
+(but correct) one until they disagree, using all cores.
+
+The problem directory needs, next to the solution:
+gen  - prints a random test; called as `gen <seed>`
+slow - the brute force solution
+Each of these can be a .cpp, .c or .py file, or an executable.
+
+Python programs are run through fork servers (see runner/forkserver.py),
+which saves starting Python and importing for every test; pass
+--no-fork-server to start them from scratch instead.
+
+Outputs are compared by a checker (see runner/checker.py): token by token
+by default, or by a special judge named checker in the problem directory.
+
+Each worker process gets its own seeds (worker i of N runs seeds
+start + i, start + i + N, ...), so a run is reproducible. The first
+mismatch stops every worker, and the failing test is saved as failK, with
+the two outputs in failK.a and failK.slow.
+
+Usage: python3 -m cp_helper.runner.stress path/to/solution.cpp
+"""
+
+
+import argparse
+from dataclasses import dataclass
+import multiprocessing
+import os
+import queue
+import signal
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from .. import tracing
+from ..tracing import span
+from .build import PYTHON, find_program, solution_command
+from .checker import Checker, TokenChecker, add_checker_arguments, checker_from_args
+from .forkserver import run_python
+
+
+DEFAULT_TIMEOUT = 10.0  # seconds, for each program on each test
+REPORT_INTERVAL = 1.0  # seconds between progress lines
+
+
+@dataclass
+class Failure:
+    seed: int
+    reason: str
+    input_data: bytes
+    output: bytes  # of the solution
+    expected: bytes  # of slow
+
+
+def run_program(command: list[str], input_data: bytes, timeout: float,
+                fork_server=False) -> tuple[Optional[bytes], str]:
+    """
+    Returns (stdout, '') or (None, reason) if the program failed. With
+    fork_server, Python programs are run through their fork server.
+    """
+    if fork_server and command[0] == PYTHON and command[1].endswith('.py'):
+        with span('run', program=os.path.basename(command[1]), fork_server=True):
+            code, output = run_python(command[1], input_data, timeout, command[2:])
+        if code is None:
+            return (None, 'time limit exceeded')
+        if code != 0:
+            return (None, f'exit code {code}')
+        return (output, '')
+    try:
+        with span('run', program=os.path.basename(command[-1])):
+            res = subprocess.run(
+                command,
+                input=input_data,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                timeout=timeout,
+            )
+    except subprocess.TimeoutExpired:
+        return (None, 'time limit exceeded')
+    if res.returncode != 0:
+        return (None, f'exit code {res.returncode}')
+    return (res.stdout, '')
+
+
+def check_input(solution: list[str], slow: list[str], input_data: bytes,
+                timeout: float, checker: Checker, seed=0,
+                fork_server=False) -> Optional[Failure]:
+    expected, reason = run_program(slow, input_data, timeout, fork_server)
+    if expected is None:
+        return Failure(seed, f'slow: {reason}', input_data, b'', b'')
+    output, reason = run_program(solution, input_data, timeout, fork_server)
+    if output is None:
+        return Failure(seed, f'solution: {reason}', input_data, b'', expected)
+    result = checker.check_bytes(input_data, output, expected)
+    if not result.ok:
+        reason = 'wrong answer'
+        if result.message:
+            reason += f' ({result.message})'
+        return Failure(seed, reason, input_data, output, expected)
+    return None
+
+
+def check_seed(gen: list[str], solution: list[str], slow: list[str],
+               seed: int, timeout: float, checker: Checker,
+               fork_server=False) -> Optional[Failure]:
+    input_data, reason = run_program([*gen, str(seed)], b'', timeout, fork_server)
+    if input_data is None:
+        # a broken generator isn't a failed test, but it should still stop
+        return Failure(seed, f'generator: {reason}', b'', b'', b'')
+    return check_input(solution, slow, input_data, timeout, checker, seed, fork_server)
+
+
+def _terminated(signum, frame) -> None:
+    # raised wherever the worker is, so that the program it is running is
+    # killed on the way out (subprocess.run and ForkServer.run see to it)
+    raise SystemExit(1)
+
+
+def worker(gen: list[str], solution: list[str], slow: list[str],
+           first_seed: int, step: int, max_tests: Optional[int],
+           timeout: float, checker: Checker, fork_server: bool,
+           tests_claimed, tests_done, stop, failures, spans) -> None:
+    signal.signal(signal.SIGTERM, _terminated)
+    # a forked worker starts with a copy of the parent's spans, and exits
+    # without running atexit, so its own go back to the parent in spans
+    tracing.take()
+    seed = first_seed
+    while not stop.is_set():
+        # claim a test so that workers don't overshoot max_tests
+        with tests_claimed.get_lock():
+            if max_tests is not None and tests_claimed.value >= max_tests:
+                break
+            tests_claimed.value += 1
+        failure = check_seed(gen, solution, slow, seed, timeout, checker, fork_server)
+        with tests_done.get_lock():
+            tests_done.value += 1
+        if failure is not None:
+            failures.put(failure)
+            stop.set()
+            break
+        seed += step
+    if spans is not None:
+        spans.put(tracing.take())
+
+
+def save_failure(directory: str, failure: Failure) -> str:
+    k = 1
+    while os.path.exists(os.path.join(directory, f'fail{k}')):
+        k += 1
+    path = os.path.join(directory, f'fail{k}')
+    with open(path, 'wb') as f:
+        f.write(failure.input_data)
+    with open(f'{path}.a', 'wb') as f:
+        f.write(failure.output)
+    with open(f'{path}.slow', 'wb') as f:
+        f.write(failure.expected)
+    return path
+
+
+def stress_test(source: str, processes: Optional[int] = None, seed=1,
+                max_tests: Optional[int] = None,
+                time_limit: Optional[float] = None,
+                timeout=DEFAULT_TIMEOUT,
+                checker: Optional[Checker] = None,
+                fork_server=True) -> Optional[Failure]:
+    """
+    Stress test the solution in source against gen and slow in the same
+    directory. Stops at the first failure, after max_tests tests or after
+    time_limit seconds, whichever comes first. Returns the first failure,
+    if any. Python programs are run through fork servers (see
+    runner/forkserver.py) unless fork_server is False.
+    """
+    directory = os.path.dirname(os.path.abspath(source))
+    solution = solution_command(source)
+    gen = find_program(directory, 'gen')
+    slow = find_program(directory, 'slow')
+    for name, command in [('solution', solution), ('gen', gen), ('slow', slow)]:
+        if command is None:
+            print(f'error: {name} not found or did not compile')
+            return None
+    if checker is None:
+        checker = TokenChecker()
+
+    if processes is None:
+        processes = os.cpu_count() or 1
+    tests_claimed = multiprocessing.Value('q', 0)
+    tests_done = multiprocessing.Value('q', 0)  # finished
+    stop = multiprocessing.Event()
+    failures = multiprocessing.Queue()
+    spans = multiprocessing.Queue() if tracing.ENABLED else None
+    workers = [
+        multiprocessing.Process(
+            target=worker,
+            args=(gen, solution, slow, seed + i, processes, max_tests,
+                  timeout, checker, fork_server, tests_claimed, tests_done, stop,
+                  failures, spans),
+            daemon=True,
+        )
+        for i in range(processes)
+    ]
+
+    start = time.perf_counter()
+    for p in workers:
+        p.start()
+    failure = None
+    try:
+        while any(p.is_alive() for p in workers):
+            try:
+                failure = failures.get(timeout=REPORT_INTERVAL)
+                break
+            except queue.Empty:
+                pass
+            elapsed = time.perf_counter() - start
+            print(f'{tests_done.value} tests in {elapsed:.1f}s '
+                  f'({tests_done.value / elapsed:.1f} tests/s)')
+            if time_limit is not None and elapsed >= time_limit:
+                break
+    except KeyboardInterrupt:
+        print('interrupted')
+    stop.set()
+    if failure is None:
+        # a worker may have failed right as the others finished
+        try:
+            failure = failures.get_nowait()
+        except queue.Empty:
+            pass
+    if spans is not None:
+        # before joining: a worker can't exit until what it put is read
+        for _ in workers:
+            try:
+                tracing.add(spans.get(timeout=timeout))
+            except queue.Empty:
+                break
+    for p in workers:
+        p.join(timeout=timeout)
+        if p.is_alive():
+            p.terminate()
+
+    elapsed = time.perf_counter() - start
+    print(f'{tests_done.value} tests in {elapsed:.1f}s with {processes} '
+          f'processes ({tests_done.value / elapsed:.1f} tests/s)')
+    if failure is None:
+        print('no differences found')
+        return None
+    path = save_failure(directory, failure)
+    print(f'seed {failure.seed} failed: {failure.reason}; test saved to {path}')
+    return failure
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='number of worker processes (default: all cores)')
+    parser.add_argument('--seed', type=int, default=1, help='first seed')
+    parser.add_argument('-n', '--max-tests', type=int, default=None)
+    parser.add_argument('-t', '--time-limit', type=float, default=None,
+                        help='stop after this many seconds')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds each program gets on each test')
+    parser.add_argument('--no-fork-server', action='store_true',
+                        help='start Python programs from scratch for every test')
+    add_checker_arguments(parser)
+    args = parser.parse_args()
+
+    checker = checker_from_args(args, os.path.dirname(os.path.abspath(args.source)))
+    if checker is None:
+        print('checker did not compile')
+        return 1
+    failure = stress_test(
+        args.source,
+        processes=args.processes,
+        seed=args.seed,
+        max_tests=args.max_tests,
+        time_limit=args.time_limit,
+        timeout=args.timeout,
+        checker=checker,
+        fork_server=not args.no_fork_server,
+    )
+    return 0 if failure is None else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
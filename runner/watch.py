@@ -0,0 +1,232 @@
+"""
+Watch a problem directory and rerun the samples whenever something changes.
+
+Changes are picked up with inotify on Linux (through ctypes, so nothing
+needs installing) and by polling modification times elsewhere. A save
+usually comes as a burst of events (editors write a temporary file and
+rename it), so nothing happens until there have been no events for
+DEBOUNCE seconds. Then the solution is rebuilt (through the build cache, so
+only a real change costs a compilation) and every sample is rerun in
+parallel, as in runner/samples.py. If anything changes while the samples
+are running, the runs are killed and started over.
+
+What is watched: the solution, every local header it includes, the samples
+(inN, outN), problem.json and the checker.
+
+Usage: python3 -m cp_helper.runner.watch path/to/solution.cpp
+"""
+
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import sys
+import threading
+import time
+from typing import Optional
+
+from .build import local_includes
+from .checker import add_checker_arguments, checker_from_args
+from .samples import DEFAULT_TIMEOUT, print_results, run_samples
+
+
+DEBOUNCE = 0.1  # seconds without changes before rerunning
+POLL_INTERVAL = 0.25  # seconds between scans, when polling
+
+WATCHED_NAME = re.compile(r'(in|out)\d+|problem\.json|checker(\.cpp|\.c|\.py)?')
+
+# from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+IN_CLOEXEC = 0o2000000
+INOTIFY_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct('iIII')  # wd, mask, cookie, len; then the name
+
+
+class InotifyWatcher:
+    """Changed files in some directories, from inotify."""
+
+    def __init__(self):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.add_watch = libc.inotify_add_watch
+        self.rm_watch = libc.inotify_rm_watch
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        self.directories: dict[int, str] = dict()  # by watch descriptor
+
+    def watch(self, directories: set[str]) -> None:
+        for wd, directory in list(self.directories.items()):
+            if directory not in directories:
+                self.rm_watch(self.fd, wd)
+                del self.directories[wd]
+        for directory in directories - set(self.directories.values()):
+            wd = self.add_watch(self.fd, os.fsencode(directory), INOTIFY_MASK)
+            if wd >= 0:
+                self.directories[wd] = directory
+
+    def changes(self, timeout: Optional[float]) -> set[str]:
+        """Files that changed, waiting at most timeout seconds for any."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 1 << 16)
+        changed: set[str] = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                # events were lost; assume everything changed
+                changed.update(self.directories.values())
+            elif wd in self.directories:
+                changed.add(os.path.join(self.directories[wd], os.fsdecode(name)))
+        return changed
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changed files in some directories, from modification times."""
+
+    def __init__(self):
+        self.directories: set[str] = set()
+        self.snapshot: dict[str, tuple[int, int]] = dict()
+
+    def scan(self) -> dict[str, tuple[int, int]]:
+        snapshot = dict()
+        for directory in self.directories:
+            try:
+                entries = os.scandir(directory)
+            except OSError:
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def watch(self, directories: set[str]) -> None:
+        self.directories = set(directories)
+        self.snapshot = self.scan()
+
+    def changes(self, timeout: Optional[float]) -> set[str]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            snapshot = self.scan()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed:
+                return changed
+            if deadline is not None and time.monotonic() >= deadline:
+                return set()
+            delay = POLL_INTERVAL
+            if deadline is not None:
+                delay = min(delay, deadline - time.monotonic())
+            time.sleep(max(0.0, delay))
+
+    def close(self) -> None:
+        pass
+
+
+def make_watcher(polling=False):
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):  # AttributeError: no inotify in libc
+            pass
+    return PollingWatcher()
+
+
+def watched_files(source: str) -> set[str]:
+    return {os.path.abspath(source), *local_includes(source)}
+
+
+def is_relevant(path: str, files: set[str]) -> bool:
+    return path in files or WATCHED_NAME.fullmatch(os.path.basename(path)) is not None
+
+
+def run_once(source: str, args: argparse.Namespace, cancel: threading.Event,
+             changed_at: Optional[float]) -> None:
+    directory = os.path.dirname(os.path.abspath(source))
+    checker = checker_from_args(args, directory)
+    if checker is None:
+        print('checker did not compile')
+        return
+    results = run_samples(source, timeout=args.timeout, checker=checker, cancel=cancel)
+    if cancel.is_set():
+        return
+    if results is not None:
+        print_results(results)
+    if changed_at is not None:
+        print(f'{time.perf_counter() - changed_at:.3f}s from the change to the verdict')
+    print(f'[{time.strftime("%H:%M:%S")}] watching for changes; Ctrl+C to stop')
+
+
+def watch(source: str, args: argparse.Namespace, polling=False) -> None:
+    watcher = make_watcher(polling)
+    files = watched_files(source)
+    watcher.watch({os.path.dirname(file) for file in files})
+    cancel = threading.Event()
+    changed_at: Optional[float] = None
+    try:
+        while True:
+            if sys.stdout.isatty():
+                print('\033[2J\033[H', end='')  # clear the screen
+            cancel = threading.Event()
+            runner = threading.Thread(target=run_once,
+                                      args=(source, args, cancel, changed_at),
+                                      daemon=True)
+            runner.start()
+
+            while not any(is_relevant(path, files) for path in watcher.changes(None)):
+                pass
+            changed_at = time.perf_counter()
+            while watcher.changes(DEBOUNCE):
+                pass
+            cancel.set()
+            runner.join()
+
+            # the includes may have changed too
+            files = watched_files(source)
+            watcher.watch({os.path.dirname(file) for file in files})
+    except KeyboardInterrupt:
+        cancel.set()
+    finally:
+        watcher.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('source', help='the solution file')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds before a sample is killed')
+    parser.add_argument('--poll', action='store_true',
+                        help='poll for changes instead of using inotify')
+    add_checker_arguments(parser)
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.source):
+        print(f'{args.source} does not exist')
+        return 1
+    watch(args.source, args, polling=args.poll)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
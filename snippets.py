@@ -0,0 +1,287 @@
+"""
+Building .vscode-linux/algorithms.code-snippets from the algorithms library.
+
+Every .h, .hpp and .cpp file under algorithms/ (except debug/) becomes a
+snippet: graphs/link_cut_tree.h becomes "Link Cut Tree" with the prefix
+linkcuttree, and its body is the file minus what every solution already
+has at the top: #pragma once, local includes, <bits/stdc++.h> and using
+namespace std.
+
+Builds are incremental. An index in the cache directory keeps each source
+file's size, modification time, hash and serialized snippet: files whose
+size and modification time are unchanged aren't read, files whose hash is
+unchanged aren't serialized again, and the snippets file is only written
+(atomically) if it changed. Rebuilding after editing one algorithm takes
+about as long as reading that one file.
+
+The index also answers lookups: by prefix, and by keyword (the words of the
+name, the directories, and the classes, structs and namespaces defined).
+
+Usage:
+    python3 -m cp_helper.snippets build [--algorithms DIR] [-o FILE]
+    python3 -m cp_helper.snippets find seg
+    python3 -m cp_helper.snippets find flow --keyword
+"""
+
+
+import argparse
+from bisect import bisect_left
+from dataclasses import asdict, dataclass
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from typing import Optional
+
+from .judges.cache import CACHE_DIR, atomic_write_text
+
+
+PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+# next to the problem directories, like ../algorithms/debug/debug.h in the
+# C++ template
+DEFAULT_ALGORITHMS = os.path.join(os.path.dirname(PACKAGE_DIR), 'algorithms')
+DEFAULT_OUTPUT = os.path.join(PACKAGE_DIR, '.vscode-linux', 'algorithms.code-snippets')
+INDEX_DIR = os.path.join(CACHE_DIR, 'snippets')
+INDEX_VERSION = 1
+
+SOURCE_EXTENSIONS = ['.h', '.hpp', '.cpp']
+EXCLUDED_DIRECTORIES = ['debug']
+SCOPE = 'cpp'
+
+# what every solution has already; other includes (e.g. for pb_ds) stay
+HEADER_LINE = re.compile(
+    r'\s*(#\s*pragma\s+once|#\s*include\s*("[^"]*"|<bits/stdc\+\+\.h>)|using\s+namespace\s+std\s*;)?\s*')
+DEFINITION = re.compile(r'\b(?:class|struct|namespace)\s+([A-Za-z_]\w*)')
+WORD = re.compile(r'[a-z0-9]+')
+
+
+@dataclass
+class IndexEntry:
+    path: str  # relative to the algorithms directory
+    size: int
+    mtime_ns: int
+    sha256: str
+    name: str
+    prefix: str
+    keywords: list[str]
+    snippet: str  # serialized, as it appears in the snippets file
+
+
+def snippet_name(path: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return ' '.join(word.capitalize() for word in stem.split('_') if word)
+
+
+def snippet_prefix(path: str) -> str:
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return stem.replace('_', '').lower()
+
+
+def snippet_body(text: str) -> list[str]:
+    lines = text.replace('\r\n', '\n').split('\n')
+    start = 0
+    while start < len(lines) and HEADER_LINE.fullmatch(lines[start]):
+        start += 1
+    end = len(lines)
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    return lines[start:end]
+
+
+def serialize(name: str, prefix: str, body: list[str]) -> str:
+    """One snippet, laid out like the rest of the snippets file."""
+    return (
+        f'    {json.dumps(name)}: {{\n'
+        f'        "scope": {json.dumps(SCOPE)},\n'
+        f'        "prefix": {json.dumps(prefix)},\n'
+        f'        "body": [{",".join(json.dumps(line) for line in body)}],\n'
+        f'        "description": {json.dumps(name)},\n'
+        f'    }}'
+    )
+
+
+def keywords(path: str, text: str) -> list[str]:
+    words = set(WORD.findall(snippet_name(path).lower()))
+    words.update(part.lower() for part in os.path.dirname(path).split(os.sep) if part)
+    words.update(name.lower() for name in DEFINITION.findall(text))
+    return sorted(words)
+
+
+def find_sources(algorithms: str) -> list[str]:
+    """Every source file under algorithms, relative to it, sorted."""
+    sources = []
+    for directory, subdirectories, files in os.walk(algorithms):
+        subdirectories[:] = [
+            d for d in subdirectories
+            if not d.startswith('.') and d not in EXCLUDED_DIRECTORIES
+        ]
+        for file in files:
+            if os.path.splitext(file)[1] in SOURCE_EXTENSIONS:
+                sources.append(os.path.relpath(os.path.join(directory, file), algorithms))
+    sources.sort()
+    return sources
+
+
+def index_path(algorithms: str) -> str:
+    key = hashlib.sha256(os.path.abspath(algorithms).encode()).hexdigest()[:16]
+    return os.path.join(INDEX_DIR, f'{key}.json')
+
+
+class SnippetIndex:
+    """The snippets of one algorithms directory, by source file."""
+
+    def __init__(self, entries: Optional[dict[str, IndexEntry]] = None):
+        self.entries = entries or dict()
+        self._prefixes: Optional[list[tuple[str, str]]] = None
+        self._keywords: Optional[dict[str, list[str]]] = None
+
+    @classmethod
+    def load(cls, path: str) -> 'SnippetIndex':
+        try:
+            with open(path) as f:
+                data = json.load(f)
+            if data.get('version') != INDEX_VERSION:
+                return cls()
+            return cls({e['path']: IndexEntry(**e) for e in data['entries']})
+        except (FileNotFoundError, ValueError, KeyError, TypeError):
+            return cls()
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = dict(version=INDEX_VERSION,
+                    entries=[asdict(e) for e in self.entries.values()])
+        atomic_write_text(path, json.dumps(data))
+
+    def by_prefix(self, query: str) -> list[IndexEntry]:
+        """Snippets whose prefix starts with query."""
+        if self._prefixes is None:
+            self._prefixes = sorted((e.prefix, e.path) for e in self.entries.values())
+        query = query.lower()
+        found = []
+        for prefix, path in self._prefixes[bisect_left(self._prefixes, (query, '')):]:
+            if not prefix.startswith(query):
+                break
+            found.append(self.entries[path])
+        return found
+
+    def by_keyword(self, query: str) -> list[IndexEntry]:
+        """Snippets with every word of query among their keywords."""
+        if self._keywords is None:
+            self._keywords = dict()
+            for e in self.entries.values():
+                for keyword in e.keywords:
+                    self._keywords.setdefault(keyword, []).append(e.path)
+        paths: Optional[set[str]] = None
+        for word in WORD.findall(query.lower()):
+            matches = set(self._keywords.get(word, []))
+            paths = matches if paths is None else paths & matches
+        return [self.entries[path] for path in sorted(paths or [])]
+
+
+@dataclass
+class BuildStats:
+    snippets: int
+    read: int  # source files read because their size or time changed
+    serialized: int  # snippets serialized because their contents changed
+    written: bool  # whether the snippets file changed
+    seconds: float
+
+
+def build(algorithms: str = DEFAULT_ALGORITHMS,
+          output: str = DEFAULT_OUTPUT) -> BuildStats:
+    start = time.perf_counter()
+    path = index_path(algorithms)
+    old = SnippetIndex.load(path)
+    index = SnippetIndex()
+    read = serialized = 0
+    for source in find_sources(algorithms):
+        st = os.stat(os.path.join(algorithms, source))
+        entry = old.entries.get(source)
+        if entry is not None and (entry.size, entry.mtime_ns) == (st.st_size, st.st_mtime_ns):
+            index.entries[source] = entry
+            continue
+        with open(os.path.join(algorithms, source), 'rb') as f:
+            data = f.read()
+        read += 1
+        sha256 = hashlib.sha256(data).hexdigest()
+        if entry is None or entry.sha256 != sha256:
+            text = data.decode(errors='replace')
+            name = snippet_name(source)
+            prefix = snippet_prefix(source)
+            entry = IndexEntry(source, 0, 0, sha256, name, prefix, keywords(source, text),
+                               serialize(name, prefix, snippet_body(text)))
+            serialized += 1
+        entry.size = st.st_size
+        entry.mtime_ns = st.st_mtime_ns
+        index.entries[source] = entry
+
+    # snippets are keyed by name, so files with the same name (in
+    # different directories) get the directory added
+    counts: dict[str, int] = dict()
+    for entry in index.entries.values():
+        counts[entry.name] = counts.get(entry.name, 0) + 1
+    snippets = []
+    for entry in index.entries.values():
+        if counts[entry.name] == 1:
+            snippets.append(entry.snippet)
+            continue
+        with open(os.path.join(algorithms, entry.path)) as f:
+            body = snippet_body(f.read())
+        name = f'{entry.name} ({os.path.dirname(entry.path) or "."})'
+        snippets.append(serialize(name, entry.prefix, body))
+    text = '{\n' + '\n    ,\n'.join(snippets) + '\n    }'
+
+    try:
+        with open(output) as f:
+            written = f.read() != text
+    except FileNotFoundError:
+        written = True
+    if written:
+        atomic_write_text(output, text)
+    if read or len(index.entries) != len(old.entries):
+        index.save(path)
+    return BuildStats(len(snippets), read, serialized, written,
+                      time.perf_counter() - start)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('build', help='update the snippets file')
+    p.add_argument('--algorithms', default=DEFAULT_ALGORITHMS)
+    p.add_argument('-o', '--output', default=DEFAULT_OUTPUT)
+    p = sub.add_parser('find', help='look up snippets')
+    p.add_argument('query')
+    p.add_argument('--keyword', action='store_true',
+                   help='match keywords instead of prefixes')
+    p.add_argument('--algorithms', default=DEFAULT_ALGORITHMS)
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.algorithms):
+        print(f'{args.algorithms} is not a directory')
+        return 1
+    if args.command == 'build':
+        stats = build(args.algorithms, args.output)
+        print(f'{stats.snippets} snippets; {stats.read} files read, '
+              f'{stats.serialized} serialized; '
+              f'{args.output} {"updated" if stats.written else "unchanged"} '
+              f'({stats.seconds * 1000:.1f} ms)')
+        return 0
+
+    index = SnippetIndex.load(index_path(args.algorithms))
+    if not index.entries:
+        print('no index yet; run build first')
+        return 1
+    found = index.by_keyword(args.query) if args.keyword else index.by_prefix(args.query)
+    for entry in found:
+        print(f'{entry.prefix:<20} {entry.name:<24} {entry.path}')
+    if not found:
+        print('no snippets found')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+Fast input and output for Python solutions. template.py gets a copy of
+everything after the imports in place of FASTIO, and imports the same.
+
+All of stdin is read at once, on first use, and split into tokens a chunk
+at a time. The read_* functions and the iterators all take the next tokens,
+in order. What is written with write is printed all at once at exit, or by
+flush (e.g. for interactive problems).
+"""
+
+import atexit
+from itertools import chain, islice
+import sys
+
+_CHUNK = 1 << 16  # bytes split at a time
+_data = None  # all of stdin
+_pos = 0  # where the next chunk starts
+_chunk = iter(())  # the tokens left in the current chunk
+_out = []
+
+
+def _next_chunk():
+    global _data, _pos, _chunk
+    if _data is None:
+        _data = sys.stdin.buffer.read()
+    if _pos >= len(_data):
+        return False
+    # end the chunk at whitespace, so that no token is cut in two
+    end = min(_pos + _CHUNK, len(_data))
+    while end < len(_data) and not _data[end:end + 1].isspace():
+        end += 1
+    _chunk = iter(_data[_pos:end].split())
+    _pos = end
+    return True
+
+
+def _chunks():
+    while True:
+        current = _chunk
+        yield current
+        # a read_* call may have moved on to the next chunk meanwhile; what
+        # it left there comes first
+        if _chunk is current and not _next_chunk():
+            return
+
+
+def tokens():
+    """The remaining tokens, as bytes."""
+    # chain takes the tokens out of _chunk itself, so whatever it leaves
+    # there is still next in line for everything else
+    return chain.from_iterable(_chunks())
+
+
+def read_token():
+    for token in _chunk:
+        return token
+    while _next_chunk():
+        for token in _chunk:
+            return token
+    raise EOFError
+
+
+# the loops take the common case, a token left in the chunk, without a call
+
+
+def read_str():
+    for token in _chunk:
+        return token.decode()
+    return read_token().decode()
+
+
+def read_int():
+    for token in _chunk:
+        return int(token)
+    return int(read_token())
+
+
+def read_float():
+    for token in _chunk:
+        return float(token)
+    return float(read_token())
+
+
+def read_ints(n):
+    return list(map(int, islice(tokens(), n)))
+
+
+def read_floats(n):
+    return list(map(float, islice(tokens(), n)))
+
+
+def ints():
+    return map(int, tokens())
+
+
+def floats():
+    return map(float, tokens())
+
+
+def strs():
+    return (token.decode() for token in tokens())
+
+
+def read_int_array(n=None):
+    """
+    The next n integers (default: all the rest) as a NumPy int64 array, or
+    a list without NumPy. All the rest is fastest: NumPy parses the bytes
+    without splitting them into tokens first.
+    """
+    global _data, _pos
+    try:
+        import numpy as np
+    except ImportError:
+        return list(ints()) if n is None else read_ints(n)
+    if n is not None:
+        return np.array(list(islice(tokens(), n)), dtype=np.int64)
+    if _data is None:
+        _data = sys.stdin.buffer.read()
+    head = np.array(list(_chunk), dtype=np.int64)
+    rest = np.fromstring(_data[_pos:], dtype=np.int64, sep=' ')
+    _pos = len(_data)
+    return np.concatenate([head, rest])
+
+
+def write(*values, sep=' ', end='\n'):
+    _out.append(sep.join(map(str, values)) + end)
+
+
+def flush():
+    sys.stdout.write(''.join(_out))
+    sys.stdout.flush()
+    _out.clear()
+
+
+atexit.register(flush)
@@ -10,11 +10,13 @@ Comments about problem:
 """
 
 
+import atexit
 from dataclasses import dataclass
+from itertools import chain, islice
 from pprint import pprint
 import sys
 
-input = sys.stdin.readline
+FASTIO
 
 
 def main():
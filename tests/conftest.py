@@ -0,0 +1,22 @@
+"""
+The tests import the repository as the cp_helper package, whatever the
+directory is called, and never touch the real cache.
+"""
+
+
+import importlib.util
+import os
+import sys
+import tempfile
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ['CP_HELPER_CACHE_DIR'] = tempfile.mkdtemp(prefix='cp_helper_test_cache_')
+os.environ.pop('CP_HELPER_TRACE', None)
+
+if 'cp_helper' not in sys.modules:
+    spec = importlib.util.spec_from_loader('cp_helper', loader=None, is_package=True)
+    package = importlib.util.module_from_spec(spec)
+    package.__path__ = [ROOT]
+    sys.modules['cp_helper'] = package
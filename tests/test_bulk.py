@@ -0,0 +1,85 @@
+import json
+import os
+
+import pytest
+
+from cp_helper.judges import bulk
+from cp_helper.judges.bulk import Manifest, ManifestEntry, bulk_import
+from cp_helper.judges.judge import Judge, Limits
+
+
+class Stub(Judge):
+    """Problems 'ok*' have one sample, 'down*' can't be downloaded."""
+    name = 'Stub'
+    fetched: list[str] = []
+
+    @staticmethod
+    def link(problem_id):
+        if problem_id.startswith('bad'):
+            raise ValueError(f'not a problem ID: {problem_id}')
+        return f'stub://{problem_id}'
+
+    @classmethod
+    def fetch_problem(cls, link, required=False):
+        cls.fetched.append(link)
+        if 'down' in link:
+            raise RuntimeError(f'could not download {link}')
+        return ([f'input {link}\n'], [f'output {link}\n']), Limits()
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    Stub.fetched = []
+    return tmp_path
+
+
+def entries(path) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_imports_and_records(workdir):
+    manifest = Manifest('m.jsonl')
+    assert bulk_import(Stub, ['ok1', 'ok2'], manifest, workers=2)
+    assert (workdir / 'ok1' / 'in1').read_text() == 'input stub://ok1\n'
+    assert (workdir / 'ok1' / 'out1').read_text() == 'output stub://ok1\n'
+    assert os.path.isfile(workdir / 'ok1' / 'ok1.cpp')
+    assert sorted(e['problem_id'] for e in entries('m.jsonl')) == ['ok1', 'ok2']
+    assert all(e['status'] == 'done' and e['inputs'] == 1 for e in entries('m.jsonl'))
+
+
+def test_failures_dont_stop_the_rest(workdir):
+    manifest = Manifest('m.jsonl')
+    assert not bulk_import(Stub, ['bad1', 'down1', 'ok1'], manifest, workers=2)
+    status = {e['problem_id']: e['status'] for e in entries('m.jsonl')}
+    assert status == dict(bad1='failed', down1='failed', ok1='done')
+    assert 'not a problem ID' in manifest.entries['bad1'].error
+    assert not os.path.exists(workdir / 'down1' / 'down1.cpp')
+
+
+def test_resume(workdir):
+    bulk_import(Stub, ['ok1', 'down1'], Manifest('m.jsonl'))
+    Stub.fetched = []
+    # a new run only retries what failed
+    bulk_import(Stub, ['ok1', 'down1', 'ok2'], Manifest('m.jsonl'))
+    assert sorted(Stub.fetched) == ['stub://down1', 'stub://ok2']
+
+
+def test_manifest_survives_a_cut_off_line(workdir):
+    entry = ManifestEntry('ok1', 'done', 1, 1, None, 0.0)
+    with open('m.jsonl', 'w') as f:
+        f.write(json.dumps(entry.__dict__) + '\n{"problem_id": "ok2", "sta')
+    manifest = Manifest('m.jsonl')
+    assert manifest.done('ok1') and not manifest.done('ok2')
+
+
+def test_present_problems_are_skipped_unless_overwriting(workdir):
+    os.makedirs('ok1')
+    (workdir / 'ok1' / 'ok1.cpp').write_text('// mine\n')
+    assert bulk_import(Stub, ['ok1'], Manifest('m.jsonl'))
+    assert Stub.fetched == []
+    assert (workdir / 'ok1' / 'ok1.cpp').read_text() == '// mine\n'
+    assert bulk_import(Stub, ['ok1'], Manifest('m.jsonl'), overwrite=True)
+    assert Stub.fetched == ['stub://ok1']
+    assert (workdir / 'ok1' / 'ok1.cpp').read_text() != '// mine\n'
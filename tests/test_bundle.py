@@ -0,0 +1,111 @@
+import shutil
+
+import pytest
+
+from cp_helper.runner.bundle import GraphCache, bundle, check
+
+LIBRARY = '''#pragma once
+#include <bits/stdc++.h>
+using namespace std;
+
+enum Color { RED, GREEN, BLUE };
+
+enum class Shape { CIRCLE, SQUARE };
+
+long long mul(long long a, long long b) { return a * b; }
+#define SQ(x) mul(x, x)
+
+struct Unused {
+    int value;
+};
+
+int unused_function(int x) { return x + 1; }
+
+template <class T>
+T twice(T x) { return 2 * x; }
+'''
+
+SOLUTION = '''#include <bits/stdc++.h>
+using namespace std;
+#include "lib.h"
+
+#ifdef _DEBUG
+#include "debug.h"
+#else
+#define debug(...) 42
+#endif
+
+int main() {
+    int c = GREEN;
+    debug(c);
+    cout << SQ(c) << ' ' << twice(3) << '\\n';
+}
+'''
+
+
+@pytest.fixture
+def solution(tmp_path):
+    (tmp_path / 'lib.h').write_text(LIBRARY)
+    (tmp_path / 'debug.h').write_text('#error the debug header is not for submissions\n')
+    path = tmp_path / 'a.cpp'
+    path.write_text(SOLUTION)
+    return str(path)
+
+
+def test_drops_unused_sections(solution, tmp_path):
+    text, stats = bundle(solution, cache=GraphCache(str(tmp_path / 'graph.json')))
+    for kept in ['enum Color', 'long long mul', 'T twice']:
+        assert kept in text
+    for dropped in ['Shape', 'Unused', 'unused_function', 'debug', '#pragma once']:
+        assert dropped not in text
+    assert text.count('#include <bits/stdc++.h>') == 1
+    assert stats.files == 2
+    assert stats.dropped == 3
+    if shutil.which('g++') is not None:
+        assert check(text)
+
+
+def test_cache_is_reused(solution, tmp_path):
+    path = str(tmp_path / 'graph.json')
+    first, _ = bundle(solution, cache=GraphCache(path))
+    cache = GraphCache(path)
+    second, _ = bundle(solution, cache=cache)
+    assert first == second
+    assert not cache.changed
+
+
+def test_keep_unused(solution, tmp_path):
+    text, stats = bundle(solution, drop_unused=False,
+                         cache=GraphCache(str(tmp_path / 'graph.json')))
+    assert 'unused_function' in text
+    assert stats.dropped == 0
+
+
+DECLARATIONS = '''#pragma once
+#include <bits/stdc++.h>
+using namespace std;
+
+const int N = 10, M = 20;
+int arr[100], brr[100];
+map<int, int> seen, counts;
+typedef struct { int x, y; } Point;
+
+template <class T>
+T larger(T a, T b) { return a < b ? b : a; }
+struct Unused { int value; };
+'''
+
+
+def test_every_declarator_is_kept(tmp_path):
+    (tmp_path / 'lib.h').write_text(DECLARATIONS)
+    source = tmp_path / 'a.cpp'
+    source.write_text('#include "lib.h"\n\nint main() {\n'
+                      '    brr[0] = M;\n    counts[1] = larger(2, 3);\n'
+                      '    Point p{1, 2};\n    cout << brr[0] + p.y << endl;\n}\n')
+    text, stats = bundle(str(source), cache=GraphCache(str(tmp_path / 'graph.json')))
+    for kept in ['M = 20', 'brr[100]', 'counts;', 'Point;', 'T larger']:
+        assert kept in text
+    assert 'Unused' not in text
+    assert stats.dropped == 1
+    if shutil.which('g++') is not None:
+        assert check(text)
@@ -0,0 +1,101 @@
+import http.server
+import threading
+
+import pytest
+
+from cp_helper.judges import cache
+from cp_helper.judges.cache import HttpCache
+from cp_helper.judges.judge import scrape_html
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock that only moves when told to."""
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'time', lambda: now[0])
+    return now
+
+
+def test_fresh_and_stale(tmp_path, clock):
+    c = HttpCache(str(tmp_path), ttl=60, max_bytes=1 << 20)
+    assert c.fresh('http://a/') is None
+    c.store('http://a/', 'page', etag='"v1"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT')
+    assert c.fresh('http://a/') == 'page'
+    assert c.fresh('http://a/', max_age=0) is None
+    clock[0] += 61
+    assert c.fresh('http://a/') is None
+    assert c.validators('http://a/') == {
+        'If-None-Match': '"v1"',
+        'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT',
+    }
+    # a 304 makes it fresh again
+    assert c.revalidated('http://a/') == 'page'
+    assert c.fresh('http://a/') == 'page'
+    assert c.validators('http://b/') == {}
+    assert c.revalidated('http://b/') is None
+
+
+def test_least_recently_used_is_evicted(tmp_path, clock):
+    body = 'x' * 100
+    c = HttpCache(str(tmp_path), ttl=60, max_bytes=1 << 20)
+    c.store('http://probe/', body)
+    size = c._read_entry('http://probe/').size
+    c.clear()
+
+    c = HttpCache(str(tmp_path), ttl=60, max_bytes=3 * size)
+    for name in 'abc':
+        clock[0] += 1
+        c.store(f'http://{name}/', body)
+    clock[0] += 1
+    assert c.fresh('http://a/') == body  # now b is the least recently used
+    clock[0] += 1
+    c.store('http://d/', body)
+    assert c.fresh('http://b/') is None
+    for name in 'acd':
+        assert c.fresh(f'http://{name}/') == body
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    etag = '"v1"'
+    requests: list = []
+
+    def do_GET(self):
+        self.requests.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == self.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = f'page {self.etag}'.encode()
+        self.send_response(200)
+        self.send_header('ETag', self.etag)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.requests = []
+    _Handler.etag = '"v1"'
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_scrape_html_revalidates(server):
+    url = f'{server}/revalidate'
+    assert scrape_html(url) == 'page "v1"'
+    assert scrape_html(url) == 'page "v1"'  # fresh: no request
+    assert _Handler.requests == [None]
+    assert scrape_html(url, max_age=0) == 'page "v1"'  # 304
+    assert _Handler.requests == [None, '"v1"']
+    _Handler.etag = '"v2"'
+    assert scrape_html(url, max_age=0) == 'page "v2"'
+    assert scrape_html(url) == 'page "v2"'
+    assert _Handler.requests == [None, '"v1"', '"v1"']
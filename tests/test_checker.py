@@ -0,0 +1,81 @@
+import pytest
+
+from cp_helper.runner import checker
+from cp_helper.runner.checker import CheckOptions, TokenChecker, compare
+
+
+def check(output: bytes, expected: bytes, **options):
+    return compare(output, expected, CheckOptions(**options))
+
+
+def test_tokens_ignore_whitespace():
+    assert check(b'1 2\n3\n', b'1\n2   3').ok
+    assert check(b'', b'\n\n').ok
+
+
+def test_tokens_report_the_first_difference():
+    result = check(b'1 2\n3 4 5\n', b'1 2\n3 6 5\n')
+    assert not result.ok
+    assert (result.token, result.line) == (4, 2)
+    assert "expected '6', found '4'" in result.message
+
+
+def test_missing_and_extra_tokens():
+    result = check(b'1 2', b'1 2 3')
+    assert not result.ok and 'found end of output' in result.message
+    result = check(b'1 2 3', b'1 2')
+    assert not result.ok and 'expected end of output' in result.message
+
+
+@pytest.mark.parametrize('found, expected, options, ok', [
+    (b'0.333333', b'0.3333333333', dict(abs_eps=1e-6), True),
+    (b'0.3333', b'0.3333333333', dict(abs_eps=1e-6), False),
+    (b'1000001', b'1000000', dict(rel_eps=1e-6), True),
+    (b'1000002', b'1000000', dict(rel_eps=1e-6), False),
+    (b'1e-7', b'0', dict(abs_eps=1e-6), True),
+    (b'nan', b'nan', dict(abs_eps=1e-6), True),  # equal as tokens
+    (b'abc', b'abd', dict(abs_eps=1.0), False),
+    (b'0.5', b'0.6', dict(), False),
+])
+def test_eps(found, expected, options, ok):
+    assert check(found, expected, **options).ok == ok
+
+
+def test_ignore_case():
+    assert not check(b'YES\n', b'yes\n').ok
+    assert check(b'YES\nNo\n', b'yes\nno\n', ignore_case=True).ok
+
+
+def test_lines():
+    assert not check(b'1 2\n3\n', b'1\n2 3\n', whitespace='lines').ok
+    # trailing spaces and blank lines don't matter
+    assert check(b'1 2  \n3\n\n\n', b'1 2\n3', whitespace='lines').ok
+    result = check(b'1 2\n3 4\n', b'1 2 3\n4\n', whitespace='lines')
+    assert not result.ok and result.line == 1
+    assert 'end of line' in result.message
+
+
+def test_exact():
+    assert check(b'1 2\n', b'1 2\n', whitespace='exact').ok
+    result = check(b'1 2\n3 \n', b'1 2\n3\n', whitespace='exact')
+    assert not result.ok
+    assert result.message == 'outputs differ at byte 6 (line 2)'
+
+
+def test_positions_across_chunks(monkeypatch):
+    monkeypatch.setattr(checker, 'CHUNK', 7)
+    common = b''.join(b'%d %d\n' % (i, i * i) for i in range(100))
+    result = check(common + b'12 345\n', common + b'12 346\n')
+    assert (result.token, result.line) == (202, 101)
+    assert check(common, common.replace(b'\n', b' ')).ok
+
+
+def test_files(tmp_path):
+    paths = [tmp_path / name for name in ['in', 'out', 'ans', 'empty']]
+    for path, data in zip(paths, [b'', b'1.0 2\n', b'1 2\n', b'']):
+        path.write_bytes(data)
+    inp, out, ans, empty = map(str, paths)
+    tokens = TokenChecker(CheckOptions(abs_eps=1e-9))
+    assert tokens.check_files(inp, out, ans).ok
+    assert not tokens.check_files(inp, empty, ans).ok
+    assert tokens.check_files(inp, empty, empty).ok
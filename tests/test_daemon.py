@@ -0,0 +1,108 @@
+import builtins
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+import time
+
+import pytest
+
+from cp_helper import daemon
+from conftest import ROOT
+
+# the daemon, with `run NAME` replaced by a few commands that print and ask
+SERVER = textwrap.dedent('''
+    import importlib.util, sys, threading, time
+    spec = importlib.util.spec_from_loader('cp_helper', loader=None, is_package=True)
+    package = importlib.util.module_from_spec(spec)
+    package.__path__ = [sys.argv[1]]
+    sys.modules['cp_helper'] = package
+    from cp_helper import daemon
+
+    def run_command(args):
+        if args.source == 'echo':
+            print('to stdout')
+            print('to stderr', file=sys.stderr)
+            worker = threading.Thread(target=print, args=('from a thread',))
+            worker.start()
+            worker.join()
+            return 3
+        if args.source == 'ask':
+            name = input('name? ')
+            print(f'hi {name}')
+            return 0
+        if args.source == 'slow':
+            time.sleep(1)
+            print('done')
+            return 0
+        raise ValueError(args.source)
+
+    daemon.run_command = run_command
+    sys.exit(daemon.serve())
+''')
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    path = str(tmp_path / 'd.sock')
+    monkeypatch.setattr(daemon, 'SOCKET_PATH', path)
+    env = dict(os.environ, CP_HELPER_SOCKET=path)
+    process = subprocess.Popen([sys.executable, '-c', SERVER, ROOT], env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.monotonic() + 30
+    while not os.path.exists(path):
+        assert process.poll() is None and time.monotonic() < deadline
+        time.sleep(0.05)
+    yield process
+    if process.poll() is None:
+        process.kill()
+    process.wait()
+
+
+def request(argv: list[str], answers=()) -> list[dict]:
+    answers = list(answers)
+    with daemon.connect() as sock:
+        conn = daemon._Connection(sock)
+        conn.send(argv=argv, cwd=os.getcwd())
+        messages = []
+        while not messages or 'exit' not in messages[-1]:
+            messages.append(conn.receive())
+            if 'prompt' in messages[-1]:
+                conn.send(answer=answers.pop(0))
+    return messages
+
+
+def test_output_is_routed_to_the_client(server):
+    assert request(['run', 'echo']) == [
+        dict(out='to stdout'), dict(out='\n'),
+        dict(err='to stderr'), dict(err='\n'),
+        dict(out='from a thread'), dict(out='\n'),
+        dict(exit=3),
+    ]
+    assert request(['ping']) == [dict(exit=0)]
+
+
+def test_prompts_are_answered(server):
+    assert request(['run', 'ask'], answers=['ann']) == [
+        dict(prompt='name? '), dict(out='hi ann'), dict(out='\n'), dict(exit=0),
+    ]
+
+
+def test_send_command(server, capsys, monkeypatch):
+    monkeypatch.setattr(builtins, 'input', lambda prompt: 'bob')
+    with daemon.connect() as sock:
+        assert daemon.send_command(sock, ['run', 'ask']) == 0
+    assert capsys.readouterr().out == 'hi bob\n'
+
+
+def test_stop_waits_for_the_running_command(server):
+    slow = []
+    client = threading.Thread(target=lambda: slow.extend(request(['run', 'slow'])))
+    client.start()
+    time.sleep(0.3)
+    assert request(['stop']) == [dict(out='daemon stopped\n'), dict(exit=0)]
+    client.join(timeout=10)
+    assert slow[-2:] == [dict(out='\n'), dict(exit=0)]
+    assert server.wait(timeout=10) == 0
+    assert not os.path.exists(daemon.SOCKET_PATH)
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+TEMPLATES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'templates')
+
+
+def run(code: str, input_data: bytes) -> str:
+    """Run code after `from fastio import *`, the way a solution would."""
+    script = f'import sys\nsys.path.insert(0, {TEMPLATES!r})\nfrom fastio import *\n{code}'
+    res = subprocess.run([sys.executable, '-c', script], input=input_data,
+                         stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+    return res.stdout.decode()
+
+
+NUMBERS = list(range(40000))  # about 230 KB, so several chunks
+INPUT = ' '.join(map(str, NUMBERS)).encode() + b'\n'
+
+
+def test_read_int():
+    assert run('print(sum(read_int() for _ in range(40000)))', INPUT) == f'{sum(NUMBERS)}\n'
+
+
+@pytest.mark.parametrize('read', ['read_int()', 'int(read_token())', 'read_ints(1)[0]'])
+def test_iterator_mixed_with_reads(read):
+    # a long-lived iterator and read_* calls, across every chunk boundary
+    code = '\n'.join([
+        'it = ints()',
+        'got = []',
+        'for i in range(20000):',
+        f'    got.append(next(it)); got.append({read})',
+        'write(got == list(range(40000)))',
+    ])
+    assert run(code, INPUT) == 'True\n'
+
+
+def test_tokens_are_not_cut_at_chunk_ends():
+    data = b'\n'.join(str(10 ** 17 + i).encode() for i in range(20000)) + b'\n'
+    assert run('write(list(ints()) == [10 ** 17 + i for i in range(20000)])', data) == 'True\n'
+
+
+def test_read_int_array():
+    pytest.importorskip('numpy')
+    assert run('read_int(); write(int(read_int_array().sum()))', INPUT) == f'{sum(NUMBERS)}\n'
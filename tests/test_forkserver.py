@@ -0,0 +1,61 @@
+import os
+import sys
+
+import pytest
+
+from cp_helper.runner.forkserver import ForkServer, close_servers, get_server, run_python
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'memfd_create') or sys.platform != 'linux',
+                                reason='the fork server is for Linux')
+
+
+def write_solution(tmp_path, code: str) -> str:
+    path = tmp_path / 'a.py'
+    path.write_text(code)
+    return str(path)
+
+
+def test_runs_solution(tmp_path):
+    source = write_solution(tmp_path, 'print(sum(map(int, input().split())))\n')
+    assert run_python(source, b'1 2\n', timeout=10) == (0, b'3\n')
+
+
+def test_waits_for_threads(tmp_path):
+    source = write_solution(tmp_path, '\n'.join([
+        'import sys, threading, time',
+        'def main():',
+        '    time.sleep(0.2)',
+        '    print(int(sys.stdin.readline()) * 2)',
+        'sys.setrecursionlimit(1 << 20)',
+        'threading.stack_size(1 << 26)',
+        'threading.Thread(target=main).start()',
+    ]) + '\n')
+    assert run_python(source, b'21\n', timeout=10) == (0, b'42\n')
+
+
+def test_exit_code_and_timeout(tmp_path):
+    source = write_solution(tmp_path, 'import sys, time\nif input() == "loop":\n'
+                                      '    time.sleep(60)\nsys.exit(3)\n')
+    assert run_python(source, b'stop\n', timeout=10) == (3, b'')
+    assert run_python(source, b'loop\n', timeout=0.5) == (None, b'')
+
+
+def test_server_cleans_up_after_its_client(tmp_path):
+    source = write_solution(tmp_path, 'print(1)\n')
+    server = ForkServer(source)
+    # what happens when the process that started it is killed
+    server.process.stdin.close()
+    server.process.wait(timeout=5)
+    assert not os.path.exists(server.directory)
+
+
+def test_dead_server_is_replaced(tmp_path):
+    source = write_solution(tmp_path, 'print(1)\n')
+    server = get_server(source)
+    server.process.kill()
+    server.process.wait(timeout=5)
+    replacement = get_server(source)
+    assert replacement is not server and replacement.alive()
+    assert not os.path.exists(server.directory)
+    close_servers()
+    assert not os.path.exists(replacement.directory)
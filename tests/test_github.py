@@ -0,0 +1,96 @@
+import os
+
+import pytest
+
+from cp_helper.benchmarks.servers import FakeGitHub
+from cp_helper.judges import github, judge
+from cp_helper.judges.codeforces import Codeforces
+from cp_helper.judges.github import (
+    commit_files,
+    git_blob_sha,
+    load_index,
+    sync_solutions,
+    upload_solutions,
+)
+
+
+@pytest.fixture
+def fake_github(monkeypatch, tmp_path):
+    monkeypatch.setenv('GITHUB_USERNAME', 'someone')
+    monkeypatch.setenv('GITHUB_TOKEN', 'token')
+    judge.get_session.cache_clear()  # for the credentials
+    monkeypatch.setattr(github, 'INDEX_DIR', str(tmp_path / 'index'))
+    with FakeGitHub() as server:
+        monkeypatch.setattr(judge, 'GITHUB_API_URL', server.url)
+        yield server
+
+
+def write_solutions(directory, count: int) -> None:
+    for k in range(count):
+        os.makedirs(directory / f'{k}A')
+        (directory / f'{k}A' / f'{k}A.cpp').write_text(f'// solution {k}\n')
+
+
+def test_commit_files(fake_github):
+    files = {'codeforces/1A.cpp': 'int main() {}\n', 'codeforces/1B.py': 'print(1)\n'}
+    sha = commit_files('cp-solutions', files, 'message')
+    assert sha is not None and fake_github.head == sha
+    assert fake_github.files == {path: git_blob_sha(content) for path, content in files.items()}
+    assert fake_github.requests == 6
+
+
+def test_commit_files_on_a_known_head(fake_github):
+    sha = commit_files('cp-solutions', {'a.cpp': ''}, 'message',
+                       branch='main', head_sha=fake_github.head)
+    assert fake_github.head == sha
+    assert fake_github.requests == 4
+
+
+def test_sync_solutions(fake_github, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_solutions(tmp_path / 'cf', 3)
+    assert sync_solutions(Codeforces, ['cf'])
+    assert sorted(fake_github.files) == [f'codeforces/{k}A.cpp' for k in range(3)]
+
+    # nothing changed: the repo and the branch head, and no commit
+    before, head = fake_github.requests, fake_github.head
+    assert sync_solutions(Codeforces, ['cf'])
+    assert fake_github.requests - before == 2
+    assert fake_github.head == head
+
+    # only the changed file is committed, on top of the known head
+    (tmp_path / 'cf' / '1A' / '1A.cpp').write_text('// better\n')
+    files = dict(fake_github.files)
+    before = fake_github.requests
+    assert sync_solutions(Codeforces, ['cf'])
+    assert fake_github.requests - before == 2 + 4
+    assert fake_github.files['codeforces/1A.cpp'] == git_blob_sha('// better\n')
+    assert {path: sha for path, sha in fake_github.files.items()
+            if path != 'codeforces/1A.cpp'} == {
+        path: sha for path, sha in files.items() if path != 'codeforces/1A.cpp'}
+
+
+def test_sync_dry_run(fake_github, tmp_path, monkeypatch, capsys):
+    monkeypatch.chdir(tmp_path)
+    write_solutions(tmp_path / 'cf', 2)
+    assert sync_solutions(Codeforces, ['cf'], dry_run=True)
+    assert fake_github.files == {}
+    assert '2 local solutions; 2 new or changed' in capsys.readouterr().out
+
+
+def test_uploads_keep_the_index_current(fake_github, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    write_solutions(tmp_path / 'cf', 3)
+    assert sync_solutions(Codeforces, ['cf'])
+
+    (tmp_path / 'cf' / '0A' / '0A.cpp').write_text('// better\n')
+    assert upload_solutions([(Codeforces, 'cf/0A/0A.cpp')], delete_local=False)
+    (tmp_path / 'cf' / '1A' / '1A.cpp').write_text('// better\n')
+    assert Codeforces.upload_solution('cf/1A/1A.cpp', delete_local=False)
+    index = load_index(Codeforces.github_repo)
+    assert index.commit == fake_github.head and index.files == fake_github.files
+
+    # so a sync has nothing to list or upload
+    before = fake_github.requests
+    assert sync_solutions(Codeforces, ['cf'])
+    assert fake_github.requests - before == 2
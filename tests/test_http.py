@@ -0,0 +1,33 @@
+import pytest
+
+from cp_helper.judges import http
+
+
+def test_loopback_has_no_budget():
+    assert http.budget_for('127.0.0.1') is None
+    assert http.budget_for('localhost') is None
+    assert http.get_host('http://127.0.0.1:8000/x').bucket is None
+
+
+def test_judges_have_budgets(monkeypatch):
+    monkeypatch.setattr(http, 'THROTTLE', True)
+    assert http.budget_for('codeforces.com') == http.HOST_BUDGETS['codeforces.com']
+    assert http.budget_for('m1.codeforces.com') == http.HOST_BUDGETS['codeforces.com']
+    assert http.budget_for('example.com') == http.DEFAULT_BUDGET
+    monkeypatch.setattr(http, 'THROTTLE', False)
+    assert http.budget_for('codeforces.com') is None
+
+
+def test_trial_ends_on_any_error(monkeypatch):
+    breaker = http.CircuitBreaker(threshold=1, cooldown=0.0)
+    monkeypatch.setattr(http, 'get_host', lambda url: http.Host(None, breaker))
+    breaker.record(False)
+
+    def fail(*args, **kwargs):
+        raise ValueError('not a network error')
+    monkeypatch.setattr(http.requests.Session, 'request', fail)
+    session = http.Session()
+    for _ in range(2):
+        with pytest.raises(ValueError):
+            session.get('http://example.invalid/')
+        assert not breaker.trial
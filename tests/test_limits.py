@@ -0,0 +1,72 @@
+import subprocess
+import sys
+
+import pytest
+
+from cp_helper.judges.judge import Limits
+from cp_helper.runner import limits
+from cp_helper.runner.limits import run_limited
+
+pytestmark = pytest.mark.skipif(sys.platform != 'linux', reason='limits are measured on Linux')
+
+
+def run(tmp_path, code: str, time=None, memory=None, **kwargs):
+    source = tmp_path / 'a.py'
+    source.write_text(code)
+    with open(tmp_path / 'out', 'w') as out, open(tmp_path / 'err', 'w') as err:
+        return run_limited([sys.executable, str(source)], subprocess.DEVNULL, out, err,
+                           Limits(time, memory), **kwargs)
+
+
+def test_ok(tmp_path):
+    result = run(tmp_path, 'print(42)\n', time=2, memory=256)
+    assert (result.verdict, result.returncode, result.warnings) == ('OK', 0, [])
+    assert (tmp_path / 'out').read_text() == '42\n'
+    assert 0 < result.max_rss < 256
+
+
+def test_runtime_error(tmp_path):
+    result = run(tmp_path, 'import sys\nsys.exit(3)\n', time=2, memory=256)
+    assert (result.verdict, result.returncode) == ('RE', 3)
+
+
+def test_time_limit(tmp_path):
+    spin = 'import time\nwhile time.process_time() < 1: pass\n'
+    result = run(tmp_path, spin, time=0.5)
+    assert result.verdict == 'TLE' and result.cpu > 0.5
+    result = run(tmp_path, 'import time\ntime.sleep(60)\n', timeout=0.5)
+    assert result.verdict == 'TLE' and result.wall < 30
+
+
+def test_memory_limit(tmp_path):
+    grow = 'blocks = []\nwhile True: blocks.append(bytearray(1 << 20))\n'
+    result = run(tmp_path, grow, memory=64)
+    assert result.verdict == 'MLE'
+    assert 'MemoryError' in (tmp_path / 'err').read_text()
+
+
+def test_near_limit_warnings(tmp_path):
+    spin = 'import time\nwhile time.process_time() < 0.9: pass\n'
+    result = run(tmp_path, spin, time=1)
+    assert result.verdict == 'OK'
+    assert [w.split(':')[0] for w in result.warnings] == ['close to the time limit']
+
+    fill = 'blocks = [bytearray(1 << 20) for _ in range(170)]\n'
+    result = run(tmp_path, fill, memory=200)
+    assert result.verdict == 'OK' and result.max_rss >= 160
+    assert [w.split(':')[0] for w in result.warnings] == ['close to the memory limit']
+
+
+@pytest.mark.parametrize('launcher', [
+    # dies before it starts the solution
+    'import sys\nsys.exit(1)\n',
+    # starts it but dies before reporting how it went
+    'import json, os, sys\n'
+    'fd = json.loads(sys.argv[1])[0]\n'
+    'os.write(fd, b"%d\\n" % os.getpid())\n'
+    'os._exit(1)\n',
+])
+def test_launcher_dies(tmp_path, monkeypatch, launcher):
+    monkeypatch.setattr(limits, 'LAUNCHER', launcher)
+    result = run(tmp_path, 'print(42)\n', time=2)
+    assert (result.verdict, result.returncode) == ('RE', 1)
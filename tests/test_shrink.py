@@ -0,0 +1,59 @@
+from typing import Optional
+
+import pytest
+
+from cp_helper.runner.checker import TokenChecker
+from cp_helper.runner.shrink import Budget, Shrinker, join_lines, split_lines
+from cp_helper.runner.stress import Failure
+
+
+class PredicateShrinker(Shrinker):
+    """Fails when predicate holds for the lines, without running anything."""
+
+    def __init__(self, lines: list[bytes], predicate, budget: Optional[Budget] = None):
+        failure = Failure(0, 'wrong answer', join_lines(lines), b'', b'')
+        super().__init__([], [], TokenChecker(), failure, jobs=2, budget=budget)
+        self.predicate = predicate
+        self.runs = 0
+
+    def _evaluate(self, data: bytes) -> Optional[Failure]:
+        self.runs += 1
+        if self.predicate(split_lines(data)):
+            return Failure(0, 'wrong answer', data, b'', b'')
+        return None
+
+
+def has_3_and_7(lines: list[bytes]) -> bool:
+    return b'3' in lines and b'7' in lines
+
+
+def sum_at_least_20(lines: list[bytes]) -> bool:
+    return sum(int(line) for line in lines) >= 20
+
+
+@pytest.mark.parametrize('predicate', [has_3_and_7, sum_at_least_20])
+def test_ddmin_is_1_minimal(predicate):
+    lines = [str(k).encode() for k in range(16)]
+    shrinker = PredicateShrinker(lines, predicate)
+    result = shrinker.ddmin(shrinker.lines, join_lines)
+    assert predicate(result)
+    for i in range(len(result)):
+        assert not predicate(result[:i] + result[i + 1:])
+    assert shrinker.best.input_data == join_lines(result)
+    assert shrinker.runs == shrinker.budget.used
+
+
+def test_ddmin_finds_the_pair():
+    shrinker = PredicateShrinker([str(k).encode() for k in range(16)], has_3_and_7)
+    assert shrinker.ddmin(shrinker.lines, join_lines) == [b'3', b'7']
+
+
+@pytest.mark.parametrize('evaluations', [0, 1, 5, 12])
+def test_ddmin_respects_the_budget(evaluations):
+    lines = [str(k).encode() for k in range(64)]
+    shrinker = PredicateShrinker(lines, has_3_and_7, Budget(evaluations=evaluations))
+    result = shrinker.ddmin(shrinker.lines, join_lines)
+    assert shrinker.runs == shrinker.budget.used <= evaluations
+    # whatever it got to still fails
+    assert has_3_and_7(result)
+    assert shrinker.budget.exhausted()
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+import sys
+import time
+
+import pytest
+
+from cp_helper.runner import stress
+from cp_helper.runner.checker import TokenChecker
+from cp_helper.runner.stress import stress_test
+
+pytestmark = pytest.mark.skipif(sys.platform != 'linux', reason='uses /proc')
+
+GEN = 'import sys\nseed = int(sys.argv[1])\nprint(seed % 10, 1)\n'
+SLOW = 'a, b = map(int, input().split())\nprint(a + b)\n'
+
+
+@pytest.fixture
+def problem(tmp_path):
+    (tmp_path / 'gen.py').write_text(GEN)
+    (tmp_path / 'slow.py').write_text(SLOW)
+    return tmp_path
+
+
+def test_no_differences(problem, capsys):
+    (problem / 'a.py').write_text(SLOW)
+    assert stress_test(str(problem / 'a.py'), processes=2, max_tests=7) is None
+    out = capsys.readouterr().out
+    assert out.splitlines()[-2].startswith('7 tests in ')
+    assert 'no differences found' in out
+    assert not os.path.exists(problem / 'fail1')
+
+
+@pytest.mark.parametrize('fork_server', [True, False])
+def test_first_failure_is_saved(problem, fork_server):
+    (problem / 'a.py').write_text('a, b = map(int, input().split())\n'
+                                  'print(a + b + (a == 7))\n')
+    failure = stress_test(str(problem / 'a.py'), processes=2, max_tests=100,
+                          fork_server=fork_server)
+    assert failure.seed == 7 and failure.reason.startswith('wrong answer')
+    assert (failure.input_data, failure.output, failure.expected) == (b'7 1\n', b'9\n', b'8\n')
+    assert (problem / 'fail1').read_bytes() == b'7 1\n'
+    assert (problem / 'fail1.a').read_bytes() == b'9\n'
+    assert (problem / 'fail1.slow').read_bytes() == b'8\n'
+
+
+def test_broken_generator_stops(problem):
+    (problem / 'gen.py').write_text('import sys\nsys.exit(2)\n')
+    (problem / 'a.py').write_text(SLOW)
+    failure = stress_test(str(problem / 'a.py'), processes=1, max_tests=10)
+    assert failure.reason == 'generator: exit code 2'
+
+
+@pytest.mark.parametrize('fork_server', [True, False])
+def test_terminated_worker_kills_its_program(problem, fork_server):
+    pid_file = problem / 'pid'
+    (problem / 'slow.py').write_text(
+        f'import os, time\nopen({str(pid_file)!r}, "w").write(str(os.getpid()))\n'
+        'time.sleep(60)\n')
+    solution = stress.solution_command(str(problem / 'slow.py'))
+    gen = stress.find_program(str(problem), 'gen')
+    process = multiprocessing.Process(target=stress.worker, args=(
+        gen, solution, solution, 1, 1, None, 60.0, TokenChecker(), fork_server,
+        multiprocessing.Value('q', 0), multiprocessing.Value('q', 0),
+        multiprocessing.Event(), multiprocessing.Queue(), None))
+    process.start()
+    deadline = time.monotonic() + 30
+    while not pid_file.exists() or not pid_file.read_text():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    pid = int(pid_file.read_text())
+    process.terminate()
+    process.join(timeout=10)
+    assert process.exitcode == 1
+    deadline = time.monotonic() + 10
+    while _running(pid):
+        assert time.monotonic() < deadline, 'the program was left running'
+        time.sleep(0.05)
+
+
+def _running(pid: int) -> bool:
+    try:
+        with open(f'/proc/{pid}/stat') as f:
+            return f.read().split(')')[-1].split()[0] != 'Z'
+    except FileNotFoundError:
+        return False
+
@@ -0,0 +1,251 @@
+"""
+Timing the phases of every command, to see where the time goes.
+
+Off unless CP_HELPER_TRACE is set:
+CP_HELPER_TRACE=1           write traces to <cache dir>/traces
+CP_HELPER_TRACE=trace.json  write the trace to that file (the daemon
+                            overwrites it with each command)
+
+Each phase (a span) becomes a complete event in Chrome's trace event
+format, which chrome://tracing, ui.perfetto.dev and speedscope can open.
+When the command finishes, the trace is written and a table of the phases
+is printed to standard error: how many times each ran, for how long in
+total, and its self time (not counting the spans inside it on the same
+thread).
+
+Code is instrumented with `with span('name', key=value) as s:` (s.set adds
+more arguments, like a status code) or the @traced('name') decorator.
+When tracing is off, traced returns the function itself and span returns
+the same do-nothing object every time, so instrumented code doesn't pay
+for it.
+
+Requests made through the sessions in judges/judge.py are split further,
+by hooks into urllib3: http.tcp is the DNS lookup and TCP connection,
+http.connect adds the TLS handshake, http.request is sending the request
+and waiting for the response headers, and what is left of the outer http
+or github span is mostly reading the body.
+"""
+
+
+import atexit
+from collections import defaultdict
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from typing import Callable, Optional
+
+
+SETTING = os.getenv('CP_HELPER_TRACE', '')
+ENABLED = SETTING not in ['', '0']
+
+_events: list[dict] = []
+_thread_names: dict[int, str] = dict()
+_origin = time.perf_counter()
+
+
+class Span:
+    __slots__ = ['name', 'args', 'start']
+
+    def __init__(self, name: str, args: dict):
+        self.name = name
+        self.args = args
+
+    def set(self, **args) -> None:
+        self.args.update(args)
+
+    def __enter__(self) -> 'Span':
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        end = time.perf_counter()
+        tid = threading.get_ident()
+        event = dict(
+            name=self.name,
+            cat=self.name.split('.', 1)[0],
+            ph='X',
+            ts=(self.start - _origin) * 1e6,
+            dur=(end - self.start) * 1e6,
+            pid=os.getpid(),
+            tid=tid,
+        )
+        if exc_type is not None:
+            self.args['error'] = exc_type.__name__
+        if self.args:
+            event['args'] = self.args
+        _events.append(event)  # atomic, so fine from any thread
+        if tid not in _thread_names:
+            _thread_names[tid] = threading.current_thread().name
+        return False
+
+
+class _NoSpan:
+    __slots__ = []
+
+    def set(self, **args) -> None:
+        pass
+
+    def __enter__(self) -> '_NoSpan':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        return False
+
+
+_NO_SPAN = _NoSpan()
+
+
+if ENABLED:
+    def span(name: str, **args) -> Span:
+        return Span(name, args)
+
+    def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+        def decorator(function: Callable) -> Callable:
+            label = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with Span(label, dict()):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+else:
+    def span(name: str, **args) -> _NoSpan:
+        return _NO_SPAN
+
+    def traced(name: Optional[str] = None) -> Callable[[Callable], Callable]:
+        return lambda function: function
+
+
+def trace_session(session, name: str) -> None:
+    """Put every request of a requests session in a span called name."""
+    if not ENABLED:
+        return
+    _hook_urllib3()
+    request = session.request
+
+    def traced_request(method, url, *args, **kwargs):
+        with span(name, method=method, url=url) as s:
+            res = request(method, url, *args, **kwargs)
+            s.set(status=res.status_code)
+            if not kwargs.get('stream'):
+                s.set(bytes=len(res.content))
+            return res
+    session.request = traced_request
+
+
+@functools.lru_cache(maxsize=None)
+def _hook_urllib3() -> None:
+    from urllib3 import connection, connectionpool
+
+    def wrap(cls, attribute: str, name: str) -> None:
+        method = getattr(cls, attribute)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with span(name, host=self.host):
+                return method(self, *args, **kwargs)
+        setattr(cls, attribute, wrapper)
+
+    wrap(connection.HTTPConnection, '_new_conn', 'http.tcp')
+    wrap(connection.HTTPConnection, 'connect', 'http.connect')
+    wrap(connection.HTTPSConnection, 'connect', 'http.connect')
+    wrap(connectionpool.HTTPConnectionPool, '_make_request', 'http.request')
+
+
+def summary(events: list[dict]) -> str:
+    """A table of the spans by name, with their total and self times."""
+    count: dict[str, int] = defaultdict(int)
+    total: dict[str, float] = defaultdict(float)
+    self_time: dict[str, float] = defaultdict(float)
+    longest: dict[str, float] = defaultdict(float)
+    by_thread: dict[tuple[int, int], list[dict]] = defaultdict(list)
+    for e in events:
+        by_thread[e['pid'], e['tid']].append(e)
+    for thread_events in by_thread.values():
+        thread_events.sort(key=lambda e: (e['ts'], -e['dur']))
+        # spans still open, as [end, name, time in spans inside it]
+        stack: list[list] = []
+        for e in thread_events + [None]:
+            while stack and (e is None or stack[-1][0] <= e['ts']):
+                end, name, inside = stack.pop()
+                self_time[name] -= inside
+            if e is None:
+                break
+            name = e['name']
+            count[name] += 1
+            total[name] += e['dur']
+            self_time[name] += e['dur']
+            longest[name] = max(longest[name], e['dur'])
+            if stack:
+                stack[-1][2] += e['dur']
+            stack.append([e['ts'] + e['dur'], name, 0.0])
+
+    wall = (max(e['ts'] + e['dur'] for e in events) - min(e['ts'] for e in events)) / 1e3
+    width = max(len(name) for name in count)
+    lines = [f'{"phase":<{width}} {"count":>6} {"total ms":>10} {"self ms":>10} '
+             f'{"max ms":>9}',
+             f'{"(wall)":<{width}} {"":>6} {wall:>10.1f}']
+    for name in sorted(count, key=lambda name: self_time[name], reverse=True):
+        lines.append(f'{name:<{width}} {count[name]:>6} {total[name] / 1e3:>10.1f} '
+                     f'{self_time[name] / 1e3:>10.1f} {longest[name] / 1e3:>9.1f}')
+    return '\n'.join(lines) + '\n'
+
+
+def trace_path() -> str:
+    if SETTING != '1' and not os.path.isdir(SETTING):
+        return SETTING
+    # imported here because judges/cache.py is traced itself
+    from .judges.cache import CACHE_DIR
+    directory = os.path.join(CACHE_DIR, 'traces') if SETTING == '1' else SETTING
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'trace_{time.strftime("%Y%m%d-%H%M%S")}_{os.getpid()}.json')
+
+
+def take() -> list[dict]:
+    """
+    Remove the spans so far and return them, so that a worker process can
+    send them to its parent to add to its trace.
+    """
+    events = _events[:]
+    del _events[:len(events)]
+    return events
+
+
+def add(events: list[dict]) -> None:
+    """Add spans from take in another process to this process's trace."""
+    _events.extend(events)
+
+
+def flush() -> Optional[str]:
+    """
+    Write the spans so far as a trace and print their table, then start
+    over. Returns the path of the trace, if there were any spans.
+    """
+    if not _events:
+        return None
+    events = take()
+    metadata = [
+        dict(name='thread_name', ph='M', pid=os.getpid(), tid=tid, args=dict(name=name))
+        for tid, name in _thread_names.items()
+    ]
+    path = trace_path()
+    # not atomic_write_text, which would add a span of its own
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(dict(
+            traceEvents=metadata + events,
+            displayTimeUnit='ms',
+            otherData=dict(command=' '.join(sys.argv)),
+        ), f, default=str)
+    os.replace(tmp, path)
+    sys.stderr.write(summary(events))
+    sys.stderr.write(f'trace written to {path}\n')
+    return path
+
+
+if ENABLED:
+    atexit.register(flush)